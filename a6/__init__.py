@@ -3,9 +3,12 @@ from .escaper import unescaper
 from .rdadebug import compute_check
 from .rdadebug import rda_debug_frame
 from .rdadebug import read_word
+from .rdadebug import read_block
 from .rdadebug import write_register_int8
 from .rdadebug import read_register_int8
 from .rdadebug import write_block
+from .rdadebug import RdaFrame
+from .rdadebug import RdaStreamDecoder
 from .a6commands import h2p_command
 from .a6commands import set_uart_to_host
 from .a6commands import set_uart_to_normal
@@ -17,10 +20,46 @@ from .serialio import send_uart_setup
 from .serialio import fetch_memory_address
 from .serialio import send_ate_command
 from .serialio import send_cps_command
+from .serialio import dmo_connect
+from .serialio import submit_command
+from .serialio import read_register
 from .serialio import atecps_resp_read
 from .serialio import read_mem_range
+from .serialio import read_mem_burst
+from .serialio import read_mem_blocks
+from .serialio import write_mem_range
+from .serialio import probe_block_read
 from .serialio import get_chan_info
 from .serialio import get_freq_err
 from .serialio import parse_freq_err_resp
 from .serialio import set_freq_err
 from .serialio import SerialIO
+from .serialio import ReadTimeout
+from .serialio import CommandTimeout
+from .cache import ReadCache
+from .stats import LinkStats
+from .capture import Capture
+from .capture import Replay
+from .pointercache import PointerCache
+from .baudrate import AutoBaud
+from .dumpfile import DumpFile
+from .dumpfile import dump_to_file
+from .dumpstore import DumpStore
+from .dumpstore import merge_stores
+from .simulator import SimulatedRadio
+from .simulator import SimulatedSerial
+from .simulator import LinkModel
+from .asyncserialio import AsyncSerialIO
+from .fleet import run_fleet
+from .codeplug import export_codeplug
+from .codeplug import iter_codeplug
+from .codeplug import set_chan_info
+from .codeplug import set_chan_name
+from .codeplug import upload_channels
+from .script import parse_script
+from .script import run_script
+from .telemetry import Telemetry
+from .scanner import ChannelScanner
+from .daemon import RadioDaemon
+from .daemon import RadioClient
+from .daemon import connect_daemon
@@ -107,9 +107,10 @@ class CPSFrame:
     length = 0
     type = 0
     content = bytes([])
-    def __init__(self, msg):
-        eprint(msg.hex())
-        if (msg[-1].to_bytes(1, 'big') != compute_check(msg[1:-2])):
+    def __init__(self, msg, verbosity=0):
+        if verbosity > 0:
+            eprint(msg.hex())
+        if len(msg) < 8 or msg[-1].to_bytes(1, 'big') != compute_check(msg[1:-2]):
             self.check_fail = True
             eprint('CPS frame check failed')
             return
@@ -144,8 +145,8 @@ class ChanInfoFrame(CPSFrame):
      \tcpsInst.chanInfo.nTxCtdcs=%d\n 
      \tcpsInst.chanInfo.nRxGrpListIdx=%d\n"
     """
-    def __init__(self, msg):
-        super().__init__(msg)
+    def __init__(self, msg, verbosity=0):
+        super().__init__(msg, verbosity)
         self.index = int.from_bytes(self.content[0:2], 'little')
         self.chantype = self.content[2]
         self.rxFreq = int.from_bytes(self.content[4:8], 'little')
@@ -163,6 +164,13 @@ class ChanInfoFrame(CPSFrame):
         self.txctdcs = int.from_bytes(self.content[1:2], 'big')
         self.rxGroupIdx = int.from_bytes(self.content[1:2], 'big')
         self.vox = int.from_bytes(self.content[1:2], 'big')
+    def as_dict(self):
+        """ return the decoded fields as a dict suitable for CSV or JSON
+        """
+        return {'index': self.index, 'chantype': self.chantype,
+                'rxfreq': self.rxFreq, 'txfreq': self.txFreq,
+                'tx_contact': self.txContactIndex, 'color_code': self.colorCode,
+                'timeslot': self.timeslot, 'polite': self.polite}
     def __repr__(self):
         return 'packet length {} type {} is_ok {} index {} chantype {} rxfreq {} txfreq {}'.format(
             self.length, self.type, self.is_ok, self.index, self.chantype, self.rxFreq, self.txFreq)
\ No newline at end of file
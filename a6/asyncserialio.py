@@ -0,0 +1,339 @@
+import asyncio
+import concurrent.futures
+from .eprint import eprint
+from .a6commands import ChanInfoFrame
+from .a6commands import ate_command
+from .a6commands import cps_command
+from .a6commands import h2p_command
+from .capture import RX
+from .capture import TX
+from .rdadebug import RdaStreamDecoder
+from .rdadebug import read_register_int8
+from .rdadebug import read_word
+from .rdadebug import write_block
+from .serialio import COMMAND_TIMEOUT
+from .serialio import CommandTimeout
+from .serialio import H2P_REGISTER
+from .serialio import READ_WINDOW
+from .serialio import ReadTimeout
+from .serialio import open_port
+from .serialio import parse_freq_err_resp
+from .stats import LinkStats
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+class AsyncSerialIO:
+    """ asyncio connection to a radio
+
+    A background task reads the port and resolves the future of each
+    outstanding request by the sequence number of its reply, so many
+    reads can be in flight at once and other I/O can share the event
+    loop.  Use it as an async context manager:
+
+        async with AsyncSerialIO('/dev/ttyUSB0') as radio:
+            print(await radio.get_freq_err())
+    """
+    def __init__(self, port, baudrate=921600, verbosity=0, timeout=0.1,
+                 window=READ_WINDOW, retries=25, capture=None):
+        """ Initialize the connection
+
+        @param port: serial port name or url, or an already open port
+        @param baudrate: baud rate
+        @param verbosity: verbosity level
+        @param timeout: time to wait for a reply before asking again in s
+        @param window: most requests in flight at once
+        @param retries: attempts per request before giving up
+        @param capture: Capture recording everything written and read,
+        closed along with the port
+        """
+        if not 0 < window < 255:
+            raise ValueError('window must be between 1 and 254')
+        self.port = port
+        self.sio = open_port(port, baudrate, timeout)
+        self.verbosity = verbosity
+        self.timeout = timeout
+        self.retries = retries
+        self.decoder = RdaStreamDecoder()
+        self.stats = LinkStats()
+        self.capture = capture
+        self._window = window
+        self._slots = None
+        self._command_lock = None
+        self._pending = {}
+        self._seq = 0
+        self._closing = False
+        self._reader = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.connected = False
+        self._ate_cps_addr = 0
+        self._ate_cps_resp_addr = 0
+        self._uart_resp_addr = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        """ Start the background reader
+        """
+        self._slots = asyncio.Semaphore(self._window)
+        self._command_lock = asyncio.Lock()
+        self._closing = False
+        self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+        if self.verbosity > 0:
+            eprint("AsyncSerialIO: {} started".format(self.port))
+
+    async def close(self):
+        """ Stop the background reader and close the port and capture
+        """
+        self._closing = True
+        if self._reader is not None:
+            await self._reader
+            self._reader = None
+        self._executor.shutdown()
+        self.sio.close()
+        if self.capture is not None:
+            self.capture.close()
+
+    def _read_chunk(self):
+        return self.sio.read(self.sio.in_waiting or 1)
+
+    async def _read_loop(self):
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            data = await loop.run_in_executor(self._executor, self._read_chunk)
+            if not data:
+                continue
+            if self.verbosity > 0:
+                eprint("read  : ", data.hex())
+            self.stats.received(data)
+            if self.capture is not None:
+                self.capture.record(RX, data)
+            for frame in self.decoder.feed(data):
+                future = self._pending.pop(frame.seq, None)
+                if future is not None and not future.done():
+                    future.set_result(frame)
+
+    def write(self, msg, frames=1):
+        """ Write a message to the serial port
+
+        @param msg: message
+        @param frames: number of debug frames in the message
+        """
+        if self.verbosity > 0:
+            eprint("write : ", msg.hex())
+        self.stats.sent(len(msg), frames)
+        if self.capture is not None:
+            self.capture.record(TX, msg)
+        self.sio.write(msg)
+
+    def _next_seq(self):
+        # skip numbers that still wait for their reply
+        while True:
+            self._seq = self._seq % 255 + 1
+            if self._seq not in self._pending:
+                return self._seq
+
+    def link_stats(self):
+        """ return the link counters as a dict suitable for JSON
+        """
+        return self.stats.as_dict(self.decoder)
+
+    async def _request(self, build, kind):
+        """ Send a request and wait for the reply with its sequence number
+
+        @param build: function making the frame for a sequence number
+        @param kind: name the round trip time is recorded under
+        @return: the RdaFrame received
+        """
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            for _ in range(self.retries):
+                seq = self._next_seq()
+                future = loop.create_future()
+                self._pending[seq] = future
+                sent = loop.time()
+                self.write(build(seq))
+                try:
+                    frame = await asyncio.wait_for(future, self.timeout)
+                    self.stats.round_trip(kind, loop.time() - sent)
+                    return frame
+                except asyncio.TimeoutError:
+                    continue
+                finally:
+                    self._pending.pop(seq, None)
+        raise ReadTimeout('no response from {}'.format(self.port))
+
+    async def _read(self, build, kind, length):
+        """ Request until a reply of the expected length arrives
+
+        @param build: function making the frame for a sequence number
+        @param kind: name the round trip time is recorded under
+        @param length: bytes of content the reply must have
+        @return: the content
+        """
+        for _ in range(self.retries):
+            frame = await self._request(build, kind)
+            if len(frame.content) == length:
+                return frame.content
+        raise ReadTimeout('no valid {} reply from {}'.format(kind, self.port))
+
+    async def fetch_memory_address(self, addr):
+        """ Read a memory word
+
+        @param addr: address to read
+        @return: the word in bytes
+        """
+        return await self._read(lambda seq: read_word(addr, seq), 'read_word', 4)
+
+    async def read_register(self, addr):
+        """ Read an internal debug register
+
+        @param addr: register number
+        @return: the register value
+        """
+        content = await self._read(lambda seq: read_register_int8(addr, seq), 'register', 1)
+        return content[0]
+
+    async def read_mem_range(self, begin, end):
+        """ Read a memory range with up to window reads in flight
+
+        @param begin: start address
+        @param end: end address
+        @return: the data in bytes
+        """
+        words = await asyncio.gather(*(self.fetch_memory_address(addr)
+                                       for addr in range(begin, end, 4)))
+        return b''.join(words)
+
+    async def _pointer(self, addr):
+        return int.from_bytes(await self.fetch_memory_address(addr), 'little')
+
+    async def ate_cps_addr(self):
+        """ return the address of the ate command
+        """
+        if self._ate_cps_addr == 0:
+            self._ate_cps_addr = await self._pointer(0x81c00270)
+        return self._ate_cps_addr
+
+    async def ate_cps_resp_addr(self):
+        """ return the address of the ate command response
+        """
+        if self._ate_cps_resp_addr == 0:
+            self._ate_cps_resp_addr = await self._pointer(0x81c00264)
+        return self._ate_cps_resp_addr
+
+    async def uart_resp_addr(self):
+        """ return the address of the cps command response
+        """
+        if self._uart_resp_addr == 0:
+            self._uart_resp_addr = await self._pointer(0x81c0026c)
+        return self._uart_resp_addr
+
+    async def submit_command(self, frame, resp_addr, timeout=COMMAND_TIMEOUT, kind='command'):
+        """ Hand a command to the ATE/CPS function and wait for the reply
+
+        This follows serialio.submit_command.  Callers must hold the
+        command lock so the mailbox is not shared.
+
+        @param frame: write_block frame holding the command
+        @param resp_addr: address of the first word of the response
+        @param timeout: longest time to wait for the radio in s
+        @param kind: name the round trip time is recorded under
+        @return: True if a reply was written
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout
+        self.write(h2p_command(0))
+        self.write(write_block(resp_addr, bytes(4)))
+        self.write(frame)
+        self.write(h2p_command(0xa5))
+        while await self.read_register(H2P_REGISTER) == 0xa5:
+            if loop.time() > deadline:
+                raise CommandTimeout('radio did not take the command')
+        while await self.fetch_memory_address(resp_addr) == bytes(4):
+            if loop.time() > deadline:
+                return False
+        self.stats.round_trip(kind, loop.time() - start)
+        return True
+
+    async def send_ate_command(self, msg, timeout=COMMAND_TIMEOUT):
+        """ Send an AT command and return its response
+
+        @param msg: command to send
+        @param timeout: longest time to wait for the radio in s
+        @return: the response in bytes
+        """
+        addr = await self.ate_cps_addr()
+        resp_addr = await self.ate_cps_resp_addr()
+        async with self._command_lock:
+            if not await self.submit_command(ate_command(msg, addr), resp_addr - 4, timeout, 'ate'):
+                raise CommandTimeout('no reply to {}'.format(msg))
+            return await self.atecps_resp_read()
+
+    async def send_cps_command(self, msg, timeout=COMMAND_TIMEOUT):
+        """ Send a CPS command and return its response
+
+        @param msg: bytes to write
+        @param timeout: longest time to wait for the radio in s
+        @return: the response in bytes
+        """
+        addr = await self.ate_cps_addr()
+        resp_addr = await self.uart_resp_addr()
+        async with self._command_lock:
+            if not await self.submit_command(cps_command(msg, addr), resp_addr, timeout, 'cps'):
+                raise CommandTimeout('no reply to CPS command {}'.format(msg.hex()))
+            return await self.uart_resp_read()
+
+    async def atecps_resp_read(self):
+        """ Read the response from an ATECPS command
+
+        @return: response from ATECPS command
+        """
+        resp_addr = await self.ate_cps_resp_addr()
+        length = int.from_bytes(await self.fetch_memory_address(resp_addr - 4), 'little')
+        return await self.read_mem_range(resp_addr, resp_addr + length)
+
+    async def uart_resp_read(self):
+        """ Read the response from a CPS command
+
+        @return: response from CPS command
+        """
+        resp_addr = await self.uart_resp_addr()
+        first = await self.fetch_memory_address(resp_addr)
+        return first + await self.read_mem_range(resp_addr + 4, resp_addr + first[1])
+
+    async def get_chan_info(self, channel=0):
+        """ Get the channel info
+
+        @param channel: channel number
+        @return: the ChanInfoFrame
+        """
+        cmd = bytes([0, 0x12]) + channel.to_bytes(1, 'little')
+        return ChanInfoFrame(await self.send_cps_command(cmd), self.verbosity)
+
+    async def dmo_connect(self):
+        """ Open the ATE session unless this connection already has
+
+        @return: the response, None if it was not sent
+        """
+        if self.connected:
+            return None
+        resp = await self.send_ate_command("AT+DMOCONNECT")
+        self.connected = True
+        return resp
+
+    async def get_freq_err(self):
+        """ Get the frequency error from the Radio
+
+        @return: frequency error in Hz
+        """
+        await self.dmo_connect()
+        resp = await self.send_ate_command("AT+GETFREQERR")
+        return parse_freq_err_resp(resp.split(b'\x00')[0].decode('utf-8'))
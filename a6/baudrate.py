@@ -0,0 +1,205 @@
+import json
+import os
+import time
+from .a6commands import read_uart_to_host
+from .cachefile import cache_path
+from .cachefile import path_lock
+from .cachefile import write_json
+from .serialio import send_uart_setup
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+BAUDRATES = (921600, 460800, 230400, 115200)
+AUTO = 'auto'
+# seconds a saved rate is trusted before faster ones are tried again
+REPROBE = 24 * 3600
+
+
+def default_path():
+    """ return the file the chosen baud rates are kept in by default
+    """
+    return cache_path('baudrates.json')
+
+def baudrate_arg(value):
+    """ argparse type of a baud rate that may also be auto
+
+    @param value: the argument
+    @return: the baud rate or AUTO
+    """
+    return AUTO if value == AUTO else int(value)
+
+def adapter_key(port):
+    """ Identify the USB serial adapter behind a port
+
+    @param port: serial port name or url, or an already open port
+    @return: vendor, product and serial number of the adapter, the port
+    name if it is not a USB device, or None for ports that are not
+    named such as a SimulatedSerial
+    """
+    if not isinstance(port, str):
+        return None
+    try:
+        from serial.tools import list_ports
+        device = os.path.realpath(port)
+        for info in list_ports.comports():
+            if info.vid is not None and device in (info.device, os.path.realpath(info.device)):
+                return '{:04x}:{:04x}:{}'.format(info.vid, info.pid, info.serial_number or '')
+    except (ImportError, OSError):
+        pass
+    return port
+
+
+class AutoBaud:
+    """ Baud rate chosen by probing the radio
+
+    Each candidate rate is tried with knocks, the fastest one whose
+    replies pass their check often enough is used and saved for the
+    adapter, which is tried first the next time.  Once the saved rate
+    is older than reprobe seconds all rates are tried again from the
+    fastest down, so a slow rate picked on a bad day does not stick.
+    While the connection is in use SerialIO hands its decoder counters
+    to update, which steps down to the next slower rate for the rest
+    of the session when too many replies fail their check.
+    """
+    def __init__(self, path=None, rates=BAUDRATES, knocks=16, max_failures=0.05,
+                 window=256, reprobe=REPROBE):
+        """ Initialize the negotiation
+
+        @param path: JSON file, default_path() by default
+        @param rates: candidate baud rates
+        @param knocks: knocks sent per rate
+        @param max_failures: largest fraction of failed replies accepted
+        @param window: replies counted before checking the failure rate
+        during a session
+        @param reprobe: seconds after which faster rates than the saved
+        one are tried again
+        """
+        self.path = path or default_path()
+        self.rates = sorted(rates, reverse=True)
+        self.knocks = knocks
+        self.max_failures = max_failures
+        self.window = window
+        self.reprobe = reprobe
+        # shared with every AutoBaud of the file, one per connection
+        self.lock = path_lock(self.path)
+        self._mark = None
+
+    def load(self):
+        """ Read the file
+
+        @return: dict with the baud rate of each adapter and the time
+        it was saved
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, port, rate):
+        """ Remember the baud rate for the adapter of a port
+
+        @param port: serial port name
+        @param rate: baud rate
+        """
+        key = adapter_key(port)
+        if key is None:
+            return
+        with self.lock:
+            data = self.load()
+            data[key] = {'rate': rate, 'time': time.time()}
+            write_json(self.path, data)
+
+    def saved(self, port):
+        """ Look up the baud rate saved for the adapter of a port
+
+        @param port: serial port name
+        @return: the baud rate and the time it was saved, None and 0
+        when nothing is saved
+        """
+        key = adapter_key(port)
+        entry = self.load().get(key) if key is not None else None
+        if not isinstance(entry, dict):
+            # older files kept the bare rate
+            entry = {'rate': entry}
+        return entry.get('rate'), entry.get('time', 0)
+
+    def probe(self, uart, rate):
+        """ Knock at one baud rate
+
+        The probe stops as soon as more knocks have failed than
+        max_failures allows.
+
+        @param uart: the SerialIO
+        @param rate: baud rate
+        @return: True if enough knocks were answered
+        """
+        uart.baudrate = rate
+        allowed = int(self.knocks * self.max_failures)
+        failed = 0
+        for _ in range(self.knocks):
+            uart.write(read_uart_to_host())
+            uart.flush()
+            answered = False
+            data = uart.receive()
+            while data and not answered:
+                for frame in uart.decoder.feed(data):
+                    if frame.seq == 1 and frame.content == b'\x80':
+                        answered = True
+                data = b'' if answered else uart.receive()
+            if not answered:
+                failed += 1
+                if failed > allowed:
+                    return False
+        return True
+
+    def negotiate(self, uart):
+        """ Pick the fastest baud rate the link carries cleanly
+
+        The rate saved for the adapter is tried first, then the others
+        from the fastest down.  A saved rate older than reprobe is not
+        preferred, all rates are tried from the fastest down instead.
+
+        @param uart: the SerialIO
+        @return: the baud rate chosen
+        """
+        saved, stamp = self.saved(uart.port)
+        stale = time.time() - stamp >= self.reprobe
+        rates = [saved] if saved in self.rates and not stale else []
+        rates += [rate for rate in self.rates if rate not in rates]
+        for rate in rates:
+            if self.probe(uart, rate):
+                if rate != saved or stale:
+                    self.save(uart.port, rate)
+                self._mark = None
+                return rate
+        raise IOError('no baud rate answered on {}'.format(uart.port))
+
+    def update(self, uart):
+        """ Step down when replies fail their check too often
+
+        The slower rate is not saved, the next connection starts again
+        from the rate negotiate found.
+
+        @param uart: the SerialIO
+        @return: True if the baud rate was changed
+        """
+        decoder = uart.decoder
+        if self._mark is None:
+            self._mark = (decoder.frames, decoder.check_failures)
+            return False
+        frames = decoder.frames - self._mark[0]
+        failures = decoder.check_failures - self._mark[1]
+        if frames + failures < self.window:
+            return False
+        self._mark = (decoder.frames, decoder.check_failures)
+        if failures <= self.max_failures * (frames + failures):
+            return False
+        slower = [rate for rate in self.rates if rate < uart.baudrate]
+        if not slower:
+            return False
+        uart.baudrate = slower[0]
+        send_uart_setup(uart)
+        self._mark = (decoder.frames, decoder.check_failures)
+        return True
@@ -0,0 +1,168 @@
+import collections
+from .escaper import unescaper
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+CACHE_WORDS = 4096
+# pointers to the ATE/CPS mailbox and response buffers set up at boot
+POINTER_TABLE = (0x81c00260, 0x81c00280)
+REBOOT_REGISTER = 0x0
+
+
+class ReadCache:
+    """ Cache of memory words read from a radio
+
+    Only words inside a declared region are kept, and the least
+    recently used ones are evicted once max_words are held.  The cache
+    watches every frame written to the radio: a write_block drops the
+    words it overwrites, a register write drops everything outside the
+    static regions since it may start firmware code such as an ATE or
+    CPS command, and a reboot drops everything.
+    """
+    def __init__(self, max_words=CACHE_WORDS):
+        """ Initialize the cache
+
+        @param max_words: most words held at once
+        """
+        self.max_words = max_words
+        self.regions = []
+        self.words = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __repr__(self):
+        return 'ReadCache words {} hits {} misses {} invalidations {}'.format(
+            len(self.words), self.hits, self.misses, self.invalidations)
+
+    def add_region(self, begin, end, static=False):
+        """ Declare a memory range cacheable
+
+        @param begin: start address
+        @param end: end address
+        @param static: the firmware never changes it, like ROM or the
+        pointer table, so only writes from the host and reboots drop it
+        """
+        self.regions.append((begin & ~3, end, static))
+
+    def region(self, addr):
+        """ Find the region holding a word
+
+        @param addr: address of the word
+        @return: the (begin, end, static) region or None
+        """
+        for region in self.regions:
+            if region[0] <= addr < region[1]:
+                return region
+        return None
+
+    def cacheable(self, begin, end):
+        """ return True if a whole range lies in one region
+        """
+        region = self.region(begin)
+        return region is not None and end <= region[1]
+
+    def get(self, addr):
+        """ Look up one word
+
+        @param addr: word address
+        @return: the word in bytes, or None when it is not cached
+        """
+        word = self.words.get(addr)
+        if word is None:
+            if self.region(addr) is not None:
+                self.misses += 1
+            return None
+        self.words.move_to_end(addr)
+        self.hits += 1
+        return word
+
+    def lookup(self, begin, end):
+        """ Look up a range of words
+
+        @param begin: start address
+        @param end: end address
+        @return: the data in bytes, or None unless every word is cached
+        """
+        if not self.cacheable(begin, end):
+            return None
+        words = []
+        for addr in range(begin, end, 4):
+            word = self.words.get(addr)
+            if word is None:
+                self.misses += 1
+                return None
+            words.append(word)
+        for addr in range(begin, end, 4):
+            self.words.move_to_end(addr)
+        self.hits += 1
+        return b''.join(words)
+
+    def store(self, begin, data):
+        """ Keep the cacheable words of data read from begin
+
+        @param begin: word aligned start address
+        @param data: the data read
+        """
+        if len(data) > 4 * self.max_words:
+            return
+        for offset in range(0, len(data) - 3, 4):
+            addr = begin + offset
+            if self.region(addr) is None:
+                continue
+            self.words[addr] = data[offset:offset + 4]
+            self.words.move_to_end(addr)
+        while len(self.words) > self.max_words:
+            self.words.popitem(last=False)
+
+    def invalidate(self, begin, end):
+        """ Drop every word overlapping a range
+
+        @param begin: start address
+        @param end: end address
+        """
+        for addr in range(begin & ~3, end, 4):
+            if self.words.pop(addr, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_volatile(self):
+        """ Drop the words outside the static regions
+        """
+        for addr in list(self.words):
+            region = self.region(addr)
+            if region is None or not region[2]:
+                del self.words[addr]
+                self.invalidations += 1
+
+    def clear(self):
+        """ Drop everything
+        """
+        self.invalidations += len(self.words)
+        self.words.clear()
+
+    def observe(self, msg):
+        """ Invalidate whatever the frames in a written message change
+
+        @param msg: frames written to the radio, escaped as on the wire
+        """
+        # reads are the bulk of the traffic and carry no write command,
+        # the command bytes are never escaped so the raw message is
+        # searched and only unescaped when a write may be in it
+        if not self.words or (b'\x83' not in msg and b'\x84' not in msg):
+            return
+        msg = unescaper(msg)
+        pos = 0
+        while pos + 5 <= len(msg) and msg[pos] == 0xad:
+            length = int.from_bytes(msg[pos + 1:pos + 3], 'big')
+            payload = msg[pos + 5:pos + 3 + length]
+            cmd = msg[pos + 4]
+            if cmd == 0x83:
+                addr = int.from_bytes(payload[0:4], 'little')
+                self.invalidate(addr, addr + len(payload) - 4)
+            elif cmd == 0x84:
+                if int.from_bytes(payload[0:4], 'little') == REBOOT_REGISTER:
+                    self.clear()
+                else:
+                    self.invalidate_volatile()
+            pos += length + 4
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import threading
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def cache_path(name):
+    """ return the path of a file in the a6tools cache directory
+
+    @param name: file name
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'a6tools', name)
+
+def path_lock(path):
+    """ return the lock every writer of a file in this process shares
+
+    @param path: file name
+    """
+    key = os.path.abspath(path)
+    with _locks_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+def write_json(path, data):
+    """ Replace a JSON file in one step
+
+    The data goes to a temporary file with a unique name next to the
+    target, which is then renamed over it, so readers never see half a
+    file and concurrent writers do not share a temporary file.
+
+    @param path: file name
+    @param data: object to write
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.',
+                               suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
@@ -0,0 +1,260 @@
+import atexit
+import collections
+import struct
+import threading
+import time
+from .a6commands import CPSFrame
+from .a6commands import ChanInfoFrame
+from .escaper import unescaper
+from .rdadebug import RdaStreamDecoder
+from .stats import LinkStats
+from .stats import count_frames
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+MAGIC = b'A6CAP'
+VERSION = 1
+# magic, version, wall clock time of the start
+HEADER = struct.Struct('<5sBd')
+# seconds since the start, direction, length of the data that follows
+RECORD = struct.Struct('<dBI')
+TX = 0
+RX = 1
+CAPTURE_CHUNKS = 65536
+
+
+class Capture:
+    """ Binary capture of the traffic on a serial port
+
+    The connection hands every chunk it writes or reads to record,
+    which only stamps it and appends it to a bounded buffer.  A
+    background thread writes the buffer to the file, so capturing
+    costs the transfer loop almost nothing.  Chunks arriving while
+    the buffer is full are counted in dropped and not stored.
+    """
+    def __init__(self, path, max_chunks=CAPTURE_CHUNKS, interval=0.05):
+        """ Start a capture
+
+        @param path: file to write
+        @param max_chunks: most chunks buffered before dropping
+        @param interval: time between writes to the file in s
+        """
+        self.path = path
+        self.max_chunks = max_chunks
+        self.interval = interval
+        self.chunks = collections.deque()
+        self.dropped = 0
+        self.start = time.monotonic()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, direction, data):
+        """ Stamp and buffer a chunk
+
+        @param direction: TX or RX
+        @param data: the bytes
+        """
+        if len(self.chunks) >= self.max_chunks:
+            self.dropped += 1
+            return
+        self.chunks.append((time.monotonic() - self.start, direction, bytes(data)))
+
+    def _drain(self):
+        chunks = self.chunks
+        out = bytearray()
+        while chunks:
+            stamp, direction, data = chunks.popleft()
+            out += RECORD.pack(stamp, direction, len(data))
+            out += data
+        if out:
+            self.file.write(out)
+            self.file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._drain()
+
+    def close(self):
+        """ Write what is buffered and close the file
+        """
+        if self.file.closed:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._drain()
+        self.file.close()
+        atexit.unregister(self.close)
+
+
+def read_capture(path):
+    """ Read a capture file
+
+    A record cut short by a crash ends the capture.
+
+    @param path: file written by Capture
+    @return: generator of (seconds since the start, direction, bytes)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a capture file'.format(path))
+        while True:
+            record = f.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            stamp, direction, length = RECORD.unpack(record)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield stamp, direction, data
+
+
+class Replay:
+    """ Rebuild a session from captured traffic
+
+    Host frames and radio replies go through their own
+    RdaStreamDecoder.  Replies are matched to requests by sequence
+    number, which gives the round trip times and a model of the radio
+    memory holding everything read or written.  ATE and CPS commands
+    are found by their mailbox writes, and when the next one starts
+    their response is decoded from the memory model.
+    """
+    def __init__(self):
+        self.tx = RdaStreamDecoder()
+        self.rx = RdaStreamDecoder()
+        self.stats = LinkStats()
+        self.memory = {}
+        self.pending = {}
+        self.commands = []
+        self.frames = []
+        self._resp_addr = None
+        self._command = None
+
+    def feed(self, stamp, direction, data):
+        """ Process one captured chunk
+
+        @param stamp: seconds since the start
+        @param direction: TX or RX
+        @param data: the bytes
+        @return: list of the commands completed by this chunk
+        """
+        done = []
+        if direction == TX:
+            self.stats.sent(len(data), count_frames(unescaper(data)))
+            for frame in self.tx.feed(data):
+                done += self._host_frame(stamp, frame)
+        else:
+            self.stats.received(data)
+            for frame in self.rx.feed(data):
+                self._reply(stamp, frame)
+        return done
+
+    def finish(self):
+        """ End the session
+
+        @return: list with the last command if one was running
+        """
+        return self._finish_command()
+
+    def link_stats(self):
+        """ return the link counters rebuilt from the capture
+        """
+        return self.stats.as_dict(self.rx)
+
+    def _store(self, addr, data):
+        for offset, byte in enumerate(data):
+            self.memory[addr + offset] = byte
+
+    def _load(self, addr, length):
+        return bytes(self.memory.get(addr + offset, 0) for offset in range(length))
+
+    def _host_frame(self, stamp, frame):
+        # host frames carry the command where replies carry the seq
+        cmd = frame.seq
+        payload = frame.content
+        addr = int.from_bytes(payload[0:4], 'little')
+        self.frames.append((stamp, 'tx', cmd, addr))
+        if cmd == 0x02:
+            self.pending[payload[4]] = ('read_word', addr, stamp)
+        elif cmd == 0x03:
+            self.pending[payload[6]] = ('read_block', addr, stamp)
+        elif cmd == 0x04:
+            self.pending[payload[4]] = ('register', addr, stamp)
+        elif cmd == 0x83:
+            data = payload[4:]
+            if data[:1] == b'\xaa' or data[:3] == b'AT+':
+                done = self._finish_command()
+                self._command = {'time': stamp, 'kind': 'cps' if data[0] == 0xaa else 'ate',
+                                 'command': self._command_text(data),
+                                 'resp_addr': self._resp_addr, 'duration': None}
+                self._store(addr, data)
+                return done
+            if data == bytes(4):
+                # submit_command clears the first word of the response
+                self._resp_addr = addr
+            self._store(addr, data)
+        return []
+
+    def _command_text(self, data):
+        if data[0] == 0xaa:
+            return data[2:data[1] - 2].hex()
+        return data.split(b'\r')[0].decode('utf-8', 'replace')
+
+    def _reply(self, stamp, frame):
+        self.frames.append((stamp, 'rx', frame.seq, len(frame.content)))
+        request = self.pending.pop(frame.seq, None)
+        if request is None:
+            return
+        kind, addr, sent = request
+        self.stats.round_trip(kind, stamp - sent)
+        if kind == 'register':
+            return
+        self._store(addr, frame.content)
+        command = self._command
+        if (command is not None and command['duration'] is None
+                and addr == command['resp_addr'] and frame.content[:4] != bytes(4)):
+            command['duration'] = stamp - command['time']
+            self.stats.round_trip(command['kind'], command['duration'])
+
+    def _finish_command(self):
+        command, self._command = self._command, None
+        if command is None:
+            return []
+        addr = command.pop('resp_addr')
+        if addr is not None and command['duration'] is not None:
+            if command['kind'] == 'ate':
+                length = int.from_bytes(self._load(addr, 4), 'little')
+                resp = self._load(addr + 4, length)
+                command['response'] = [line.decode('utf-8', 'replace') for line in resp.split(b'\x00')]
+            else:
+                resp = self._load(addr, self._load(addr, 2)[1])
+                frame = CPSFrame(resp)
+                if not frame.check_fail and frame.type == 0x0012 and frame.is_ok:
+                    frame = ChanInfoFrame(resp)
+                command['response'] = repr(frame)
+        self.commands.append(command)
+        return [command]
+
+
+def replay_capture(path):
+    """ Replay a capture file
+
+    @param path: file written by Capture
+    @return: the Replay after the whole capture
+    """
+    replay = Replay()
+    for stamp, direction, data in read_capture(path):
+        replay.feed(stamp, direction, data)
+    replay.finish()
+    return replay
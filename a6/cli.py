@@ -0,0 +1,75 @@
+from .baudrate import AUTO
+from .baudrate import AutoBaud
+from .baudrate import baudrate_arg
+from .capture import Capture
+from .daemon import connect_daemon
+from .eprint import eprint
+from .pointercache import PointerCache
+from .serialio import SerialIO
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+def add_link_arguments(parser, daemon=False):
+    """ Add the serial link options the command line tools share
+
+    @param parser: the argparse.ArgumentParser of the tool
+    @param daemon: also offer --direct, for tools that go through a6d
+    when it serves the port
+    """
+    parser.add_argument('-p', '--port', default='/dev/ttyUSB0',
+                        type=str, help='serial port')
+    parser.add_argument('-b','--baudrate', default=None,
+                        type=baudrate_arg,
+                        help='baud rate, or auto for the fastest one that works, '
+                        'default 921600')
+    parser.add_argument('-v','--verbosity', default=0, action='count',
+                        help='print sent and received frames to stderr for debugging')
+    if daemon:
+        parser.add_argument('--direct', action='store_true',
+                            help='open the port even when a6d is serving it')
+    parser.add_argument('--stats', action='store_true',
+                        help='print link statistics to stderr when done')
+    parser.add_argument('--capture', metavar='FILE',
+                        help='record the serial traffic to FILE')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+
+def open_link(args, pointers=False):
+    """ Open the connection the link options ask for
+
+    @param args: parsed arguments of a parser given add_link_arguments
+    @param pointers: load and save the firmware pointers with a
+    PointerCache, for tools sending ATE/CPS commands
+    @return: the SerialIO, which closes the capture along with the port
+    """
+    return SerialIO(args.port, args.baudrate or 921600, args.verbosity,
+                    pointers=PointerCache() if pointers else None,
+                    capture=Capture(args.capture) if args.capture else None,
+                    autobaud=AutoBaud() if args.baudrate == AUTO else None)
+
+def connect_link(args, pointers=False):
+    """ Go through a6d when it serves the port, open the port otherwise
+
+    The daemon owns the serial link, so options about the link are
+    reported as ignored rather than silently dropped.
+
+    @param args: parsed arguments of a parser given add_link_arguments
+    with daemon=True
+    @param pointers: as for open_link
+    @return: the RadioClient and None, or None and the SerialIO
+    """
+    client = None if args.direct else connect_daemon(args.port)
+    if client is None:
+        return None, open_link(args, pointers)
+    ignored = [flag for flag, given in (('-b', args.baudrate is not None),
+                                        ('-v', args.verbosity),
+                                        ('--capture', args.capture)) if given]
+    if ignored:
+        eprint('a6d serves {}, ignoring {}; use --direct to open the port here'.format(
+            args.port, ' '.join(ignored)))
+    if args.stats:
+        eprint('--stats reports the link of a6d')
+    return client, None
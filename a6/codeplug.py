@@ -0,0 +1,253 @@
+import collections
+import csv
+import json
+import zlib
+from .a6commands import CPSFrame
+from .a6commands import ChanInfoFrame
+from .serialio import CommandTimeout
+from .serialio import get_uart
+from .serialio import send_cps_command
+from .serialio import send_uart_setup
+from .serialio import uart_resp_read
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+# section name: CPS command, frame class, most entries
+SECTIONS = collections.OrderedDict([
+    ('channels', (0x0012, ChanInfoFrame, 256)),
+    ('scanlists', (0x002a, CPSFrame, 32)),
+    ('groupcalls', (0x001e, CPSFrame, 256)),
+    ('keys', (0x0026, CPSFrame, 16)),
+])
+CSV_FIELDS = ['section', 'index', 'chantype', 'rxfreq', 'txfreq', 'tx_contact',
+              'color_code', 'timeslot', 'polite', 'content']
+CPS_RETRIES = 3
+SET_CHAN_INFO = 0x0011
+SET_CHAN_NAME = 0x0013
+CHAN_NAME_LENGTH = 16
+
+
+def _no_response(cmd_type, replied):
+    if not replied:
+        raise CommandTimeout('no reply to CPS command 0x{:04x}'.format(cmd_type))
+    raise IOError('no valid response to CPS command 0x{:04x}'.format(cmd_type))
+
+def get_cps_entry(cmd_type, index, frame_class=CPSFrame, uart=None):
+    """ Read one numbered entry with a CPS get command
+
+    @param cmd_type: CPS command such as 0x12 for GetChanInfo
+    @param index: entry number
+    @param frame_class: class to decode the response with
+    @param uart: connection to use, the last one opened by default
+    @return: the frame, or None when the radio has no such entry
+    """
+    uart = get_uart(uart)
+    cmd = cmd_type.to_bytes(2, 'big') + index.to_bytes(1, 'little')
+    replied = False
+    for _ in range(CPS_RETRIES):
+        if not send_cps_command(cmd, uart=uart):
+            continue
+        replied = True
+        resp = uart_resp_read(uart)
+        frame = CPSFrame(resp, uart.verbosity)
+        # a bad check or the reply to another command means try again
+        if frame.check_fail or frame.type != cmd_type:
+            continue
+        if not frame.is_ok:
+            return None
+        return frame if frame_class is CPSFrame else frame_class(resp)
+    _no_response(cmd_type, replied)
+
+def set_cps_entry(cmd_type, args, uart=None):
+    """ Write one entry with a CPS set command
+
+    @param cmd_type: CPS command such as 0x11 for SetChanInfo
+    @param args: the command arguments after the type
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio accepted the entry
+    """
+    uart = get_uart(uart)
+    cmd = cmd_type.to_bytes(2, 'big') + args
+    replied = False
+    for _ in range(CPS_RETRIES):
+        if not send_cps_command(cmd, uart=uart):
+            continue
+        replied = True
+        frame = CPSFrame(uart_resp_read(uart), uart.verbosity)
+        if frame.check_fail or frame.type != cmd_type:
+            continue
+        return frame.is_ok
+    _no_response(cmd_type, replied)
+
+def set_chan_info(content, uart=None):
+    """ Write a channel with SetChanInfo
+
+    @param content: the channel in the layout GetChanInfo returns, which
+    starts with the channel number
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio accepted the channel
+    """
+    return set_cps_entry(SET_CHAN_INFO, content, uart)
+
+def set_chan_name(index, name, uart=None):
+    """ Name a channel with SetChanName
+
+    @param index: channel number
+    @param name: the new name, cut or zero padded to CHAN_NAME_LENGTH
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio accepted the name
+    """
+    name = name.encode('utf-8')[:CHAN_NAME_LENGTH]
+    args = index.to_bytes(1, 'little') + name + bytes(CHAN_NAME_LENGTH - len(name))
+    return set_cps_entry(SET_CHAN_NAME, args, uart)
+
+def iter_codeplug(sections=None, gap=8, uart=None):
+    """ Read the codeplug entry by entry
+
+    The entries of each section are read in order until gap numbers in
+    a row are missing, so a few empty slots do not end a section.
+
+    @param sections: names from SECTIONS, all of them by default
+    @param gap: missing entries in a row that end a section
+    @param uart: connection to use, the last one opened by default
+    @return: generator of dicts with section, index and the content in
+    hex, plus the decoded fields of channels
+    """
+    uart = get_uart(uart)
+    for section in sections or SECTIONS:
+        cmd_type, frame_class, count = SECTIONS[section]
+        missing = 0
+        for index in range(count):
+            frame = get_cps_entry(cmd_type, index, frame_class, uart)
+            if frame is None:
+                missing += 1
+                if missing >= gap:
+                    break
+                continue
+            missing = 0
+            record = {'section': section, 'index': index}
+            if isinstance(frame, ChanInfoFrame):
+                record.update(frame.as_dict())
+            record['content'] = frame.content.hex()
+            yield record
+
+def export_codeplug(out, fmt='jsonl', sections=None, gap=8, setup=True, uart=None):
+    """ Write the codeplug to a file as it is read
+
+    Each record is written and flushed as soon as it arrives, so a
+    partial export is still usable.
+
+    @param out: text file to write to
+    @param fmt: 'jsonl' for one JSON object per line or 'csv'
+    @param sections: names from SECTIONS, all of them by default
+    @param gap: missing entries in a row that end a section
+    @param setup: send the UART setup sequence first
+    @param uart: connection to use, the last one opened by default
+    @return: number of records written
+    """
+    uart = get_uart(uart)
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, CSV_FIELDS, restval='')
+        writer.writeheader()
+        write = writer.writerow
+    elif fmt == 'jsonl':
+        write = lambda record: out.write(json.dumps(record) + '\n')
+    else:
+        raise ValueError('unknown format {}'.format(fmt))
+    if setup and not send_uart_setup(uart):
+        raise IOError('radio did not answer the UART setup')
+    count = 0
+    for record in iter_codeplug(sections, gap, uart):
+        write(record)
+        out.flush()
+        count += 1
+    return count
+
+def load_codeplug(f):
+    """ Read records written by export_codeplug in JSON lines format
+
+    @param f: text file to read
+    @return: list of record dicts
+    """
+    return [json.loads(line) for line in f if line.strip()]
+
+def channel_checksums(records):
+    """ Checksum the content of every channel record
+
+    @param records: codeplug records, other sections are skipped
+    @return: dict of channel number to the CRC-32 of its content
+    """
+    return {record['index']: zlib.crc32(bytes.fromhex(record['content']))
+            for record in records if record['section'] == 'channels'}
+
+def read_checksums(path):
+    """ Load channel checksums saved by write_checksums
+
+    @param path: file name
+    @return: dict of channel number to checksum, empty if there is no
+    such file
+    """
+    try:
+        with open(path) as f:
+            return {int(index): checksum for index, checksum in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+
+def write_checksums(path, checksums):
+    """ Save channel checksums so the next upload need not read them
+
+    @param path: file name
+    @param checksums: dict of channel number to checksum
+    """
+    with open(path, 'w') as f:
+        json.dump({str(index): checksums[index] for index in sorted(checksums)}, f)
+
+def diff_channels(target, current):
+    """ Find the channels that have to be written
+
+    @param target: codeplug records to end up with
+    @param current: dict of channel number to checksum on the radio
+    @return: list of the target channel records that differ
+    """
+    wanted = channel_checksums(target)
+    return [record for record in target if record['section'] == 'channels'
+            and current.get(record['index']) != wanted[record['index']]]
+
+def upload_channels(target, current=None, verify=True, gap=8, setup=True, uart=None):
+    """ Write the channels that differ from the radio
+
+    The channels on the radio are read unless their checksums are
+    given, for instance saved by an earlier upload.  Only
+    changed channels are sent, then just those are read back and their
+    checksums compared, so current must match the radio for the
+    result to be complete.
+
+    @param target: codeplug records to end up with
+    @param current: dict of channel number to checksum on the radio,
+    filled in when empty and updated with the channels written
+    @param verify: read the written channels back
+    @param gap: missing entries in a row that end the channel section
+    @param setup: send the UART setup sequence first
+    @param uart: connection to use, the last one opened by default
+    @return: list of the channel numbers written
+    """
+    uart = get_uart(uart)
+    if setup and not send_uart_setup(uart):
+        raise IOError('radio did not answer the UART setup')
+    if current is None:
+        current = {}
+    if not current:
+        current.update(channel_checksums(iter_codeplug(['channels'], gap, uart)))
+    changed = diff_channels(target, current)
+    for record in changed:
+        if not set_chan_info(bytes.fromhex(record['content']), uart):
+            raise IOError('radio refused channel {}'.format(record['index']))
+    wanted = channel_checksums(changed)
+    if verify:
+        for index, checksum in wanted.items():
+            frame = get_cps_entry(0x0012, index, CPSFrame, uart)
+            if frame is None or zlib.crc32(frame.content) != checksum:
+                raise IOError('channel {} did not verify'.format(index))
+    current.update(wanted)
+    return sorted(wanted)
@@ -0,0 +1,234 @@
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from .a6commands import ChanInfoFrame
+from .script import run_command
+from .script import run_script
+from .serialio import COMMAND_TIMEOUT
+from .serialio import get_freq_err
+from .serialio import port_name
+from .serialio import read_mem_range
+from .serialio import send_uart_setup
+from .serialio import set_freq_err
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+def socket_path(port):
+    """ return the socket a daemon for a port listens on by default
+
+    @param port: serial port name or url
+    @return: the socket path
+    """
+    return os.path.join(tempfile.gettempdir(), 'a6-{}.sock'.format(port_name(port)))
+
+# request name: function of the connection and the request arguments
+OPS = {
+    'ping': lambda uart: port_name(uart.port),
+    'stats': lambda uart: uart.link_stats(),
+    'read': lambda uart, begin, end: read_mem_range(begin, end, uart).hex(),
+    'command': lambda uart, command, timeout=COMMAND_TIMEOUT: run_command(command, timeout, uart),
+    'script': lambda uart, commands, timeout=COMMAND_TIMEOUT: list(run_script(commands, timeout, uart)),
+    'get_freq_err': lambda uart: get_freq_err(uart),
+    'set_freq_err': lambda uart, freqerr: set_freq_err(freqerr, uart),
+}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """ Answer the requests of one client, one JSON object per line
+    """
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            reply = self.server.dispatch(line)
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class RadioDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Share one radio connection over a Unix socket
+
+    The daemon owns the SerialIO, so the UART setup, the firmware
+    pointers and the ATE session are paid for once and stay warm for
+    every client.  Requests are JSON lines like
+    {"op": "read", "begin": 2181038080, "end": 2181038336} and each one
+    is answered by {"ok": true, "result": ...} or
+    {"ok": false, "error": "..."}.  Requests from all clients are run
+    one at a time so several tools can share the radio.
+    """
+    daemon_threads = True
+
+    def __init__(self, uart, path=None, setup=True):
+        """ Initialize the daemon
+
+        @param uart: the SerialIO to share
+        @param path: socket path, socket_path of the port by default
+        @param setup: send the UART setup sequence and read the
+        firmware pointers now
+        """
+        self.uart = uart
+        self.lock = threading.Lock()
+        path = path or socket_path(uart.port)
+        if os.path.exists(path):
+            client = connect_daemon(path=path)
+            if client is not None:
+                client.close()
+                raise RuntimeError('a daemon is already listening on {}'.format(path))
+            # left behind by a daemon that did not shut down
+            os.remove(path)
+        if setup:
+            if not send_uart_setup(uart):
+                raise IOError('radio did not answer the UART setup')
+            # the pointers stay in the read cache from now on
+            uart.ate_cps_addr
+            uart.uart_resp_addr
+        super().__init__(path, RequestHandler)
+
+    def dispatch(self, line):
+        """ Run one request
+
+        @param line: the request as a JSON line
+        @return: the reply dict
+        """
+        try:
+            request = json.loads(line)
+            op = OPS[request.pop('op')]
+            with self.lock:
+                return {'ok': True, 'result': op(self.uart, **request)}
+        except Exception as e:
+            return {'ok': False, 'error': '{}: {}'.format(type(e).__name__, e)}
+
+    def server_close(self):
+        """ Stop listening and remove the socket
+        """
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class RadioClient:
+    """ Client of a RadioDaemon
+
+    The methods mirror the functions of the same name in a6 but run in
+    the daemon.
+    """
+    def __init__(self, path):
+        """ Connect to a daemon
+
+        @param path: socket path
+        """
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.rfile = self.sock.makefile('rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Disconnect from the daemon
+        """
+        self.rfile.close()
+        self.sock.close()
+
+    def call(self, op, **args):
+        """ Run a request in the daemon
+
+        @param op: name of the request in OPS
+        @param args: arguments of the request
+        @return: the result
+        """
+        self.sock.sendall(json.dumps(dict(args, op=op)).encode('utf-8') + b'\n')
+        line = self.rfile.readline()
+        if not line:
+            raise IOError('daemon closed the connection')
+        reply = json.loads(line)
+        if not reply['ok']:
+            raise IOError(reply['error'])
+        return reply['result']
+
+    def read_mem_range(self, begin, end):
+        """ Read a memory range
+
+        @param begin: start address
+        @param end: end address
+        @return: the data in bytes
+        """
+        return bytes.fromhex(self.call('read', begin=begin, end=end))
+
+    def run_command(self, command, timeout=COMMAND_TIMEOUT):
+        """ Run one AT or hex CPS command
+
+        @param command: AT command, or a CPS command in hex
+        @param timeout: longest time to wait for the reply in s
+        @return: dict with the command, ok and the response
+        """
+        return self.call('command', command=command, timeout=timeout)
+
+    def run_script(self, commands, timeout=COMMAND_TIMEOUT):
+        """ Run AT and CPS commands in one session
+
+        @param commands: list of AT commands or CPS commands in hex
+        @param timeout: longest time to wait for each reply in s
+        @return: list of dicts like run_command
+        """
+        return self.call('script', commands=commands, timeout=timeout)
+
+    def get_chan_info(self, channel=0):
+        """ Get the channel info
+
+        @param channel: channel number
+        @return: the ChanInfoFrame
+        """
+        result = self.run_command('0012' + channel.to_bytes(1, 'little').hex())
+        if not result['ok']:
+            raise IOError('radio did not answer GetChanInfo for channel {}'.format(channel))
+        return ChanInfoFrame(bytes.fromhex(result['response']))
+
+    def link_stats(self):
+        """ return the link counters of the daemon's connection
+        """
+        return self.call('stats')
+
+    def get_freq_err(self):
+        """ Get the frequency error from the Radio
+
+        @return: frequency error in Hz
+        """
+        return self.call('get_freq_err')
+
+    def set_freq_err(self, freqerr):
+        """ Set the frequency error on the Radio
+
+        @param freqerr: frequency error parameter
+        @return: the response lines
+        """
+        return self.call('set_freq_err', freqerr=freqerr)
+
+
+def connect_daemon(port=None, path=None):
+    """ Connect to the daemon serving a port if there is one
+
+    @param port: serial port name or url
+    @param path: socket path, socket_path of the port by default
+    @return: a RadioClient, or None when no daemon is listening
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    path = path or socket_path(port)
+    try:
+        return RadioClient(path)
+    except OSError:
+        return None
@@ -0,0 +1,183 @@
+import mmap
+import os
+import struct
+from .serialio import get_uart
+from .serialio import read_mem_range
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+MAP_MAGIC = b'A6MP'
+MAP_VERSION = 1
+MAP_HEADER = struct.Struct('<4sBxxxII')
+DUMP_CHUNK = 0x1000
+
+
+class DumpFile:
+    """ Memory dump written in place to a preallocated file
+
+    The output file is memory mapped and each chunk goes straight to
+    its offset, so the file can be read while the dump is running.  A
+    sidecar file named like the output with .map appended holds a
+    header with the address range followed by one bit per word, set
+    once the word has been written.  Opening the same range again picks
+    up where an interrupted dump left off.
+    """
+    def __init__(self, path, begin, end):
+        """ Open or create the dump and its sidecar
+
+        @param path: output file name
+        @param begin: start address
+        @param end: end address, rounded up to a whole word
+        """
+        self.path = path
+        self.map_path = path + '.map'
+        self.begin = begin
+        self.words = max(0, (end - begin + 3) // 4)
+        self.end = begin + 4 * self.words
+        if self.words == 0:
+            raise ValueError('empty dump range')
+        header = MAP_HEADER.pack(MAP_MAGIC, MAP_VERSION, begin, self.end)
+        map_size = MAP_HEADER.size + (self.words + 7) // 8
+        if os.path.exists(self.map_path):
+            with open(self.map_path, 'rb') as f:
+                found = f.read(MAP_HEADER.size)
+            if found != header or os.path.getsize(self.map_path) != map_size:
+                raise ValueError('{} belongs to another dump'.format(self.map_path))
+            if not os.path.exists(path):
+                # the data is gone so the map means nothing
+                os.remove(self.map_path)
+        if not os.path.exists(self.map_path):
+            with open(self.map_path, 'wb') as f:
+                f.write(header)
+                f.truncate(map_size)
+        self._data_file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._data_file.truncate(4 * self.words)
+        self._map_file = open(self.map_path, 'r+b')
+        self.data = mmap.mmap(self._data_file.fileno(), 4 * self.words)
+        self._map = mmap.mmap(self._map_file.fileno(), map_size)
+        self.bitmap = memoryview(self._map)[MAP_HEADER.size:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Flush and close the dump
+        """
+        if self.data.closed:
+            return
+        self.flush()
+        self.bitmap.release()
+        self.data.close()
+        self._map.close()
+        self._data_file.close()
+        self._map_file.close()
+
+    def flush(self):
+        """ Write the data and then the bitmap to disk
+
+        The data goes first so a word is never marked done before it is
+        on disk.
+        """
+        self.data.flush()
+        self._map.flush()
+
+    def done(self, index):
+        """ return True if word index has been written
+        """
+        return bool(self.bitmap[index >> 3] & (1 << (index & 7)))
+
+    @property
+    def complete(self):
+        """ True when every word has been written
+        """
+        return self.words_done == self.words
+
+    @property
+    def words_done(self):
+        """ number of words written so far
+        """
+        return bin(int.from_bytes(self.bitmap, 'little')).count('1')
+
+    def missing(self):
+        """ Find the ranges still to be read
+
+        @return: list of (begin, end) address pairs
+        """
+        ranges = []
+        start = None
+        bitmap = self.bitmap.tobytes()
+        for pos, byte in enumerate(bitmap):
+            if byte == 0xff and start is None:
+                continue
+            if byte == 0 and start is not None:
+                continue
+            for bit in range(8):
+                index = 8 * pos + bit
+                if index >= self.words:
+                    break
+                if not byte & (1 << bit):
+                    if start is None:
+                        start = index
+                elif start is not None:
+                    ranges.append((self.begin + 4 * start, self.begin + 4 * index))
+                    start = None
+        if start is not None:
+            ranges.append((self.begin + 4 * start, self.end))
+        return ranges
+
+    def store(self, addr, data):
+        """ Write data read from addr and mark its words done
+
+        @param addr: word aligned address the data was read from
+        @param data: whole words of data
+        """
+        first = (addr - self.begin) // 4
+        count = len(data) // 4
+        if addr % 4 or len(data) % 4 or first < 0 or first + count > self.words:
+            raise ValueError('data does not fit the dump')
+        self.data[4 * first:4 * (first + count)] = data
+        for index in range(first, first + count):
+            self.bitmap[index >> 3] |= 1 << (index & 7)
+
+
+def dump_to_file(begin, end, path, chunk=DUMP_CHUNK, restart=False, progress=None,
+                 read=None, uart=None):
+    """ Dump a memory range to a file, resuming an earlier attempt
+
+    Only words not yet marked in the sidecar map are read.  The map is
+    flushed after every chunk, so at most one chunk is lost when the
+    link goes down.
+
+    @param begin: start address
+    @param end: end address
+    @param path: output file name
+    @param chunk: bytes read between checkpoints
+    @param restart: throw away an earlier attempt and start over
+    @param progress: function called with words done and total words
+    after each chunk
+    @param read: function of begin and end returning the memory, such
+    as the read_mem_range of a RadioClient, read_mem_range on uart by
+    default
+    @param uart: connection to use, the last one opened by default
+    @return: number of bytes read from the radio
+    """
+    if read is None:
+        uart = get_uart(uart)
+        read = lambda first, last: read_mem_range(first, last, uart)
+    if restart and os.path.exists(path + '.map'):
+        os.remove(path + '.map')
+    fetched = 0
+    with DumpFile(path, begin, end) as dump:
+        for first, last in dump.missing():
+            for addr in range(first, last, chunk):
+                data = read(addr, min(addr + chunk, last))
+                dump.store(addr, data)
+                dump.flush()
+                fetched += len(data)
+                if progress is not None:
+                    progress(dump.words_done, dump.words)
+    return fetched
@@ -0,0 +1,269 @@
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+STORE_MAGIC = b'A6DS'
+STORE_VERSION = 1
+# magic, version, offset of the index, number of segments
+STORE_HEADER = struct.Struct('<4sBxxxQI')
+# begin address, length, file offset, time written, label, sha256
+SEGMENT = struct.Struct('<IIQd16s32s')
+ALIGN = 16
+
+
+class Segment:
+    """ Index entry of one address range held in a DumpStore
+    """
+    def __init__(self, begin, length, offset, written, label, digest):
+        self.begin = begin
+        self.length = length
+        self.offset = offset
+        self.written = written
+        self.label = label
+        self.digest = digest
+
+    @property
+    def end(self):
+        return self.begin + self.length
+
+    def pack(self):
+        return SEGMENT.pack(self.begin, self.length, self.offset, self.written,
+                            self.label.encode('utf-8')[:16], self.digest)
+
+    @classmethod
+    def unpack(cls, data):
+        begin, length, offset, written, label, digest = SEGMENT.unpack(data)
+        return cls(begin, length, offset, written,
+                   label.rstrip(b'\x00').decode('utf-8', 'replace'), digest)
+
+    def as_dict(self):
+        """ return the segment as a dict suitable for JSON
+        """
+        return {'begin': self.begin, 'end': self.end, 'label': self.label,
+                'written': self.written, 'sha256': self.digest.hex()}
+
+
+class DumpStore:
+    """ Container of memory dumps tagged with their address ranges
+
+    Segments are appended to the file, each with its address range, a
+    label and a SHA-256 of its data, and are listed in an index that
+    the header points to.  A new segment is written after the old
+    index and the header is updated last, so an interrupted write
+    leaves the store as it was.  The file is memory mapped and only
+    the index is read on open, so any address is looked up without
+    loading the dumps.  Where segments overlap the one added last wins.
+    """
+    def __init__(self, path):
+        """ Open a store, creating it if it does not exist or is empty
+
+        @param path: file name
+        """
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, STORE_HEADER.size, 0))
+        self._file = open(path, 'r+b')
+        self._map = None
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Close the store
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _load(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index, count = STORE_HEADER.unpack_from(self._map)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            raise ValueError('{} is not a dump store'.format(self.path))
+        self.segments = [Segment.unpack(self._map[pos:pos + SEGMENT.size])
+                         for pos in range(index, index + count * SEGMENT.size, SEGMENT.size)]
+        self._index_end = index + count * SEGMENT.size
+        # non overlapping (begin, end, segment) pieces sorted by address
+        pieces = []
+        for segment in self.segments:
+            kept = []
+            for begin, end, owner in pieces:
+                if end <= segment.begin or begin >= segment.end:
+                    kept.append((begin, end, owner))
+                    continue
+                if begin < segment.begin:
+                    kept.append((begin, segment.begin, owner))
+                if end > segment.end:
+                    kept.append((segment.end, end, owner))
+            kept.append((segment.begin, segment.end, segment))
+            pieces = sorted(kept, key=lambda piece: piece[0])
+        self._pieces = pieces
+        self._starts = [piece[0] for piece in pieces]
+
+    def add(self, begin, data, label=''):
+        """ Append a segment
+
+        @param begin: address the data was read from
+        @param data: the memory
+        @param label: short name such as ram or rom, at most 16 bytes
+        @return: the Segment
+        """
+        if not data:
+            raise ValueError('empty segment')
+        offset = (self._index_end + ALIGN - 1) // ALIGN * ALIGN
+        segment = Segment(begin, len(data), offset, time.time(), label,
+                          hashlib.sha256(data).digest())
+        index = offset + len(data)
+        # some systems do not grow a file that is mapped
+        self._map.close()
+        self._map = None
+        self._file.seek(self._index_end)
+        self._file.write(bytes(offset - self._index_end))
+        self._file.write(data)
+        self._file.write(b''.join(s.pack() for s in self.segments + [segment]))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        # only now does the store change
+        self._file.seek(0)
+        self._file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, index,
+                                           len(self.segments) + 1))
+        self._file.flush()
+        self._load()
+        return segment
+
+    def data(self, segment):
+        """ return a memoryview of the data of a segment
+
+        The view has to be released before the store is added to or
+        closed.
+        """
+        return memoryview(self._map)[segment.offset:segment.offset + segment.length]
+
+    def ranges(self):
+        """ Find the address ranges held
+
+        @return: sorted list of (begin, end) pairs, adjacent pieces joined
+        """
+        ranges = []
+        for begin, end, _ in self._pieces:
+            if ranges and ranges[-1][1] == begin:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((begin, end))
+        return ranges
+
+    def covers(self, addr, length=1):
+        """ return True if every byte of the range is in the store
+        """
+        try:
+            self.read(addr, length)
+        except KeyError:
+            return False
+        return True
+
+    def read(self, addr, length):
+        """ Read memory by device address
+
+        @param addr: start address
+        @param length: number of bytes
+        @return: the data in bytes
+        @raise KeyError: if part of the range is not in the store
+        """
+        out = bytearray()
+        end = addr + length
+        i = bisect.bisect_right(self._starts, addr) - 1
+        while addr < end:
+            if i < 0 or i >= len(self._pieces) or not \
+                    self._pieces[i][0] <= addr < self._pieces[i][1]:
+                raise KeyError('0x{:08x} is not in {}'.format(addr, self.path))
+            begin, stop, segment = self._pieces[i]
+            take = min(end, stop) - addr
+            pos = segment.offset + addr - segment.begin
+            out += self._map[pos:pos + take]
+            addr += take
+            i += 1
+        return bytes(out)
+
+    def word(self, addr):
+        """ return the little endian word at an address
+        """
+        return int.from_bytes(self.read(addr, 4), 'little')
+
+    def verify(self):
+        """ Check the data of every segment against its hash
+
+        @return: list of the segments that do not match
+        """
+        return [segment for segment in self.segments
+                if hashlib.sha256(self.data(segment)).digest() != segment.digest]
+
+    def compact(self, path):
+        """ Write the memory held as one segment per contiguous range
+
+        Overlaps are resolved the way read does, and labels are kept
+        where a range comes from a single segment.
+
+        @param path: file name of the new store
+        @return: the new DumpStore
+        """
+        if os.path.abspath(path) == os.path.abspath(self.path):
+            raise ValueError('cannot compact a store into itself')
+        if os.path.exists(path):
+            os.remove(path)
+        out = DumpStore(path)
+        for begin, end in self.ranges():
+            labels = {owner.label for first, last, owner in self._pieces
+                      if begin <= first and last <= end}
+            out.add(begin, self.read(begin, end - begin),
+                    labels.pop() if len(labels) == 1 else '')
+        return out
+
+
+def merge_stores(path, sources):
+    """ Merge partial dumps into a store
+
+    A store already at path keeps its segments and is merged first, so
+    the sources win where they overlap it.
+
+    @param path: file name of the merged store
+    @param sources: file names of stores, later ones win where they
+    overlap earlier ones
+    @return: the merged DumpStore, compacted
+    """
+    sources = list(sources)
+    if os.path.exists(path) and os.path.getsize(path) and path not in sources:
+        sources.insert(0, path)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    fd, new = tempfile.mkstemp(dir=directory, suffix='.new')
+    os.close(fd)
+    os.remove(new)
+    try:
+        with DumpStore(tmp) as merged:
+            for source in sources:
+                with DumpStore(source) as store:
+                    for segment in store.segments:
+                        merged.add(segment.begin, store.data(segment), segment.label)
+            merged.compact(new).close()
+        os.replace(new, path)
+    finally:
+        os.remove(tmp)
+        if os.path.exists(new):
+            os.remove(new)
+    return DumpStore(path)
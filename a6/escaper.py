@@ -1,16 +1,26 @@
+ESCAPE = 0x5c
+SPECIAL = bytes([0x11, 0x13, 0x5c])
+ESCAPED = (b'\x5c\xee', b'\x5c\xec', b'\x5c\xa3')
+
 def escaper(msg):
     """ escape message
 
     this function escapes special characters in the message.  These
     are 0x5c, 0x11 and 0x13 which are '\' and XON and XOFF characters.
+    Each one is replaced by 0x5c followed by the character inverted.
 
     @param msg: the message to escape
     @return: the escaped message
 
     """
 
-    out = bytes(sum([[0x5c, 0xFF ^ x ] if x in [0x11, 0x13, 0x5c] else [x] for x in msg], []))
-    return out
+    msg = bytes(msg)
+    if len(msg.translate(None, SPECIAL)) == len(msg):
+        return msg
+    # the escape byte itself goes first so the escapes added for XON
+    # and XOFF are not escaped a second time
+    return msg.replace(b'\x5c', b'\x5c\xa3').replace(
+        b'\x11', b'\x5c\xee').replace(b'\x13', b'\x5c\xec')
 
 def unescaper(msg):
     """ unescape message
@@ -21,14 +31,29 @@ def unescaper(msg):
     @return: the unescaped message
     """
 
-    out = []
-    escape = False
-    for x in msg:
-        if x == 0x5c:
-            escape = True
-            continue
-        if escape:
-            x = 0x5c ^ x ^ 0xa3
-            escape = False
-        out.append(x)
+    msg = bytes(msg)
+    escapes = msg.count(ESCAPE)
+    if escapes == 0:
+        return msg
+    if escapes == sum(msg.count(pair) for pair in ESCAPED):
+        # only well formed escapes, undo them in bulk with the escaped
+        # escape byte last so it cannot start a new sequence
+        return msg.replace(b'\x5c\xee', b'\x11').replace(
+            b'\x5c\xec', b'\x13').replace(b'\x5c\xa3', b'\x5c')
+    # anything else follows the device rule of inverting the byte after
+    # an escape, which also drops repeated and trailing escape bytes
+    parts = msg.split(b'\x5c')
+    out = bytearray(len(msg))
+    view = memoryview(out)
+    first = parts[0]
+    pos = len(first)
+    view[:pos] = first
+    for part in parts[1:]:
+        # an empty part is a repeated or trailing escape byte
+        if part:
+            out[pos] = part[0] ^ 0xff
+            view[pos + 1:pos + len(part)] = part[1:]
+            pos += len(part)
+    view.release()
+    del out[pos:]
     return bytes(out)
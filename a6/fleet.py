@@ -0,0 +1,155 @@
+import concurrent.futures
+import time
+from .baudrate import AUTO
+from .baudrate import AutoBaud
+from .codeplug import read_checksums
+from .codeplug import upload_channels
+from .codeplug import write_checksums
+from .pointercache import shared_cache
+from .script import run_script
+from .serialio import SerialIO
+from .serialio import get_freq_err
+from .serialio import port_name
+from .serialio import read_mem_range
+from .serialio import set_freq_err
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+class FleetResult:
+    """ Outcome of a job on one radio
+    """
+    def __init__(self, port, ok, result=None, error=None, elapsed=0.0, stats=None):
+        self.port = port
+        self.ok = ok
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+        self.stats = stats
+
+    def as_dict(self):
+        """ return the result as a dict suitable for JSON
+        """
+        return {'port': self.port, 'ok': self.ok, 'result': self.result,
+                'error': self.error, 'elapsed': self.elapsed, 'stats': self.stats}
+
+    def __repr__(self):
+        return 'port {} ok {} elapsed {:.3f} result {} error {}'.format(
+            self.port, self.ok, self.elapsed, self.result, self.error)
+
+def dump_job(uart, begin, end, output):
+    """ Dump a memory range to a file
+
+    @param uart: connection to the radio
+    @param begin: start address
+    @param end: end address
+    @param output: file name, {name} is replaced by the port name
+    @return: dict with the file name and number of bytes
+    """
+    data = read_mem_range(begin, end, uart)
+    path = output.format(name=port_name(uart.port))
+    with open(path, 'wb') as f:
+        f.write(data)
+    return {'output': path, 'bytes': len(data)}
+
+def freq_fix_job(uart, current, target):
+    """ Correct the TCXO offset like freqoffset.py
+
+    @param uart: connection to the radio
+    @param current: measured transmit frequency in Hz
+    @param target: programmed frequency in Hz
+    @return: dict with the old and new frequency error
+    """
+    curerr = get_freq_err(uart)
+    newerr = curerr + target - current
+    if abs(newerr) > 2500:
+        raise ValueError("Desired offset exceeds maximum of 2500 Hz")
+    set_freq_err(int((newerr + 2500)/10), uart)
+    return {'previous': curerr, 'new': newerr}
+
+def at_script_job(uart, commands, timeout=1.0):
+    """ Run a list of AT or hex CPS commands in one session
+
+    @param uart: connection to the radio
+    @param commands: list of commands
+    @param timeout: longest time to wait for each reply in s
+    @return: list of dicts with each command and its response
+    """
+    return list(run_script(commands, timeout, uart))
+
+def upload_job(uart, target, checksums=None, verify=True):
+    """ Write the channels of a codeplug that differ on the radio
+
+    @param uart: connection to the radio
+    @param target: codeplug records to end up with
+    @param checksums: file caching the channel checksums of the radio,
+    {name} is replaced by the port name, None to read the radio
+    @param verify: read the written channels back
+    @return: dict with the channel numbers written
+    """
+    path = checksums.format(name=port_name(uart.port)) if checksums else None
+    current = read_checksums(path) if path else {}
+    written = upload_channels(target, current, verify, uart=uart)
+    if path:
+        write_checksums(path, current)
+    return {'written': written}
+
+JOBS = {
+    'dump': dump_job,
+    'freqfix': freq_fix_job,
+    'at': at_script_job,
+    'upload': upload_job,
+}
+
+def run_job(port, job, baudrate=921600, verbosity=0, pointers=None, **kwargs):
+    """ Open one radio and run a job on it
+
+    Errors are caught and reported in the result so one bad radio does
+    not stop the rest of the fleet.
+
+    @param port: serial port name or url, or an open port
+    @param job: name of the job in JOBS
+    @param baudrate: baud rate, or 'auto' to probe for the fastest
+    @param verbosity: verbosity level
+    @param pointers: file of a PointerCache to use, None for none
+    @param kwargs: arguments for the job
+    @return: FleetResult
+    """
+    start = time.monotonic()
+    uart = None
+    try:
+        cache = None if pointers is None else shared_cache(pointers)
+        autobaud = AutoBaud() if baudrate == AUTO else None
+        with SerialIO(port, baudrate, verbosity, pointers=cache, autobaud=autobaud) as uart:
+            result = JOBS[job](uart, **kwargs)
+    except Exception as e:
+        return FleetResult(str(port), False, error='{}: {}'.format(type(e).__name__, e),
+                           elapsed=time.monotonic() - start,
+                           stats=None if uart is None else uart.link_stats())
+    return FleetResult(str(port), True, result, elapsed=time.monotonic() - start,
+                       stats=uart.link_stats())
+
+def run_fleet(ports, job, workers=None, processes=False, per_port=None, **kwargs):
+    """ Run a job on many radios at once
+
+    Each radio gets its own connection in a worker thread, or a worker
+    process when processes is set which avoids sharing one interpreter
+    between many busy ports.
+
+    @param ports: list of serial ports
+    @param job: name of the job in JOBS
+    @param workers: number of workers, one per port by default
+    @param processes: use a process pool instead of threads
+    @param per_port: dict of port to extra job arguments for that port
+    @param kwargs: arguments for every job
+    @return: list of FleetResult in the order of ports
+    """
+    if job not in JOBS:
+        raise ValueError('unknown job {}'.format(job))
+    per_port = per_port or {}
+    pool = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+    with pool(max_workers=workers or len(ports) or 1) as executor:
+        futures = [executor.submit(run_job, port, job, **dict(kwargs, **per_port.get(port, {})))
+                   for port in ports]
+        return [future.result() for future in futures]
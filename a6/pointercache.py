@@ -0,0 +1,106 @@
+import json
+import threading
+from .cache import POINTER_TABLE
+from .cachefile import cache_path
+from .cachefile import path_lock
+from .cachefile import write_json
+from .serialio import read_mem_range
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+# pointer to the ATE/CPS mailbox, which tells firmware builds apart
+SIGNATURE = 0x81c00270
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def default_path():
+    """ return the file the pointer cache is kept in by default
+    """
+    return cache_path('pointers.json')
+
+def shared_cache(path=None):
+    """ return the PointerCache of a file shared by the whole process
+
+    @param path: JSON file, default_path() by default
+    """
+    path = path or default_path()
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = PointerCache(path)
+        return _shared[path]
+
+def firmware_key(uart):
+    """ Identify the firmware of a radio
+
+    The address of the ATE/CPS mailbox moves with every firmware
+    build, and the first command needs it anyway, so reading it costs
+    nothing extra.
+
+    @param uart: the SerialIO
+    @return: the mailbox address in hex
+    """
+    return read_mem_range(SIGNATURE, SIGNATURE + 4, uart=uart)[::-1].hex()
+
+
+class PointerCache:
+    """ Firmware pointer table kept on disk between connections
+
+    The pointer table only changes with the firmware.  It is saved per
+    firmware, identified by the mailbox pointer.  Before its first
+    ATE/CPS command a connection reads that one word and loads the rest
+    of the table into its read cache, and SerialIO only finds the
+    pointers again if that command fails.
+    """
+    def __init__(self, path=None):
+        """ Initialize the cache
+
+        @param path: JSON file, default_path() by default
+        """
+        self.path = path or default_path()
+        self.lock = path_lock(self.path)
+
+    def load(self):
+        """ Read the file
+
+        @return: dict with the pointer table of each firmware in hex
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data.setdefault('firmware', {})
+        return data
+
+    def preload(self, uart):
+        """ Put the saved pointer table for a radio into its read cache
+
+        @param uart: the SerialIO
+        @return: the table loaded, None if there was none
+        """
+        key = firmware_key(uart)
+        with self.lock:
+            data = self.load()
+        table = data['firmware'].get(key)
+        if table is None:
+            return None
+        table = bytes.fromhex(table)
+        uart.cache.store(POINTER_TABLE[0], table)
+        return table
+
+    def remember(self, uart):
+        """ Save the pointer table of a radio
+
+        @param uart: the SerialIO
+        @return: the firmware key
+        """
+        table = read_mem_range(*POINTER_TABLE, uart=uart)
+        key = firmware_key(uart)
+        with self.lock:
+            data = self.load()
+            data['firmware'][key] = table.hex()
+            write_json(self.path, data)
+        return key
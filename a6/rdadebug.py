@@ -1,5 +1,6 @@
 import functools
 import operator
+from .escaper import SPECIAL
 from .escaper import escaper
 from .escaper import unescaper
 from .eprint import eprint
@@ -7,6 +8,9 @@ from .eprint import eprint
 __author__ = "jhart99"
 __license__ = "MIT"
 
+MAX_FRAME_LENGTH = 0x1000
+FLOW_ID = 0xff
+
 def compute_check(msg):
     """ Compute the check value for a message
 
@@ -34,6 +38,47 @@ def rda_debug_frame(flow, cmd, message):
     check = compute_check(msg)
     return escaper(header + msglen + msg + check)
 
+class FrameTemplate:
+    """ Precomputed frame for a command with a fixed size payload
+
+    The header, length, flow and command bytes are escaped once and
+    their part of the check byte is kept, so building a frame only
+    folds the payload into the check and escapes the payload.  The
+    payload is passed as a little endian integer of up to 8 bytes.
+    """
+    def __init__(self, cmd, size, flow=FLOW_ID):
+        """ Initialize the template
+
+        @param cmd: command byte
+        @param size: payload bytes, at most 8
+        @param flow: flow id
+        """
+        if not 0 < size <= 8:
+            raise ValueError('payload must be 1 to 8 bytes')
+        self.size = size
+        self.prefix = escaper(bytes([0xad]) + (size + 2).to_bytes(2, 'big') + bytes([flow, cmd]))
+        self.check = flow ^ cmd
+
+    def build(self, payload):
+        """ make a frame
+
+        @param payload: the payload as a little endian integer
+        @return: the escaped frame
+        """
+        fold = payload ^ (payload >> 32)
+        fold ^= fold >> 16
+        fold ^= fold >> 8
+        check = (fold ^ self.check) & 0xff
+        data = (payload | check << 8 * self.size).to_bytes(self.size + 1, 'little')
+        if len(data.translate(None, SPECIAL)) != len(data):
+            data = escaper(data)
+        return self.prefix + data
+
+READ_WORD = FrameTemplate(0x02, 5)
+READ_BLOCK = FrameTemplate(0x03, 7)
+READ_REGISTER = FrameTemplate(0x04, 5)
+WRITE_REGISTER = FrameTemplate(0x84, 5)
+
 def read_word(addr, seq = 1):
     """ make a frame to read a word at a memory address
 
@@ -42,26 +87,36 @@ def read_word(addr, seq = 1):
 
     """
 
-    flow = bytes([0xff])
-    command = bytes([0x02])
-    if isinstance(addr, int):
-        addr = addr.to_bytes(4, 'little')
-    msg = addr + seq.to_bytes(1, 'big')
-    return rda_debug_frame(flow, command, msg)
+    if not isinstance(addr, int):
+        addr = int.from_bytes(addr, 'little')
+    return READ_WORD.build(addr | seq << 32)
+
+def read_block(addr, length, seq = 1):
+    """ make a frame to read a block of memory
+
+    this is the block counterpart of read_word in the way write_block
+    extends the single word write.  The reply carries the sequence
+    number followed by length bytes of memory.
+
+    """
 
+    if not isinstance(addr, int):
+        addr = int.from_bytes(addr, 'little')
+    return READ_BLOCK.build(addr | length << 32 | seq << 48)
+
+@functools.lru_cache(maxsize=256)
 def write_register_int8(addr, msg):
     """ write to a byte to an internal register
 
     this function creates a frame to do some device magic and these
-    frames are used in the preamble and finalizer commands.
+    frames are used in the preamble and finalizer commands.  The few
+    frames in use, like the h2p commands, are built once and cached.
 
     """
 
-    flow = bytes([0xff])
-    command = bytes([0x84])
-    msg = addr.to_bytes(4, 'little') + msg.to_bytes(1, 'little')
-    return rda_debug_frame(flow, command, msg)
+    return WRITE_REGISTER.build(addr | msg << 32)
 
+@functools.lru_cache(maxsize=256)
 def read_register_int8(addr, seq=1):
     """ make a frame containing a knock command
 
@@ -70,10 +125,7 @@ def read_register_int8(addr, seq=1):
 
     """
 
-    flow = bytes([0xff])
-    command = bytes([0x04])
-    msg = addr.to_bytes(4, 'little') + seq.to_bytes(1, 'big')
-    return rda_debug_frame(flow, command, msg)
+    return READ_REGISTER.build(addr | seq << 32)
 
 def write_block(addr, msg):
     """ make a frame containing a write command
@@ -102,8 +154,9 @@ class RdaFrame:
     seq = 0
     length = 0
     content = bytes([])
-    def __init__(self, msg):
-        msg = unescaper(msg)
+    def __init__(self, msg, escaped=True):
+        if escaped:
+            msg = unescaper(msg)
         if len(msg) <= 4:
             if(msg == b'\x11\x13'):
                 self.ack = True
@@ -119,3 +172,97 @@ class RdaFrame:
         self.content = msg[5:-1]
     def __repr__(self):
         return 'packet length {} seq {} content {} ack {} check {}'.format(self.length, self.seq, self.content, self.ack, self.check_fail)
+
+
+class RdaStreamDecoder:
+    """ Incremental decoder for received Frames
+
+    The serial port hands back whatever bytes have arrived, which may
+    be part of a frame, several frames or flow control acks.  This
+    class keeps the unfinished bytes between calls, undoes escapes
+    that straddle two reads and returns every complete frame.  Bytes
+    that cannot belong to a frame are skipped until the next header.
+    """
+    def __init__(self, max_length=MAX_FRAME_LENGTH):
+        """ Initialize the decoder
+
+        @param max_length: largest frame length accepted as genuine
+        """
+        self.max_length = max_length
+        self.frames = 0
+        self.acks = 0
+        self.check_failures = 0
+        self.discarded = 0
+        self._buf = bytearray()
+        self._escape = False
+
+    def reset(self):
+        """ Drop any partially received frame
+        """
+        self.discarded += len(self._buf)
+        self._buf.clear()
+        self._escape = False
+
+    def feed(self, data):
+        """ Decode a chunk of received bytes
+
+        @param data: bytes as read from the serial port
+        @return: list of the RdaFrame completed by this chunk
+        """
+        # XON/XOFF never appear inside an escaped frame
+        self.acks += data.count(b'\x11\x13')
+        data = data.translate(None, b'\x11\x13')
+        if not data:
+            return []
+        if self._escape:
+            self._buf.append(data[0] ^ 0xff)
+            data = data[1:]
+        self._escape = data.endswith(b'\x5c')
+        if self._escape:
+            data = data[:-1]
+        self._buf += unescaper(data)
+        return self._frames()
+
+    def _frames(self):
+        """ Cut the complete frames off the front of the buffer
+
+        @return: list of RdaFrame
+        """
+        frames = []
+        buf = self._buf
+        while buf:
+            start = buf.find(0xad)
+            if start < 0:
+                self.discarded += len(buf)
+                buf.clear()
+                break
+            if start > 0:
+                self.discarded += start
+                del buf[:start]
+            if len(buf) < 4:
+                break
+            length = int.from_bytes(buf[1:3], 'big')
+            if length < 2 or length > self.max_length or buf[3] != FLOW_ID:
+                # not a real header, resynchronize on the next one
+                self.discarded += 1
+                del buf[:1]
+                continue
+            end = length + 4
+            if len(buf) < end:
+                break
+            frame = RdaFrame(bytes(buf[:end]), escaped=False)
+            # a frame that lost a byte on the way swallows the header of
+            # the next one as its check byte, so wait to see what follows
+            if len(buf) == end and frame.check_fail and buf[-1] == 0xad:
+                break
+            if len(buf) > end and buf[end] != 0xad:
+                frame.check_fail = True
+            if frame.check_fail:
+                self.check_failures += 1
+                self.discarded += 1
+                del buf[:1]
+                continue
+            frames.append(frame)
+            self.frames += 1
+            del buf[:end]
+        return frames
@@ -0,0 +1,228 @@
+import collections
+import math
+import time
+from .a6commands import ate_command
+from .serialio import COMMAND_TIMEOUT
+from .serialio import CommandTimeout
+from .serialio import dmo_connect
+from .serialio import get_uart
+from .serialio import submit_command
+from .telemetry import parse_reply
+from .telemetry import read_ate_reply
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+RSSI = 'AT+DMORDRSSI'
+SWITCH = 'AT+DMOCHSWITCH={}'
+# a second reading further off than this means the dwell was too short
+SETTLE_TOLERANCE = 2.0
+MAX_DWELL = 0.05
+
+
+def parse_channels(text):
+    """ argparse type of a channel list such as 0-7,9,12
+
+    @param text: comma separated channels and ranges
+    @return: list of channel numbers
+    """
+    channels = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        channels += range(int(first), int(last or first) + 1)
+    return channels
+
+
+class ChannelActivity:
+    """ RSSI readings of one channel
+    """
+    def __init__(self, channel):
+        self.channel = channel
+        self.samples = 0
+        self.active = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, rssi, active):
+        """ Count a reading
+
+        @param rssi: RSSI in dBm
+        @param active: the reading was above the threshold
+        """
+        self.samples += 1
+        self.active += active
+        self.total += rssi
+        self.min = rssi if self.min is None else min(self.min, rssi)
+        self.max = rssi if self.max is None else max(self.max, rssi)
+        self.last = rssi
+
+    def as_dict(self):
+        """ return the activity as a dict suitable for JSON
+        """
+        return {'channel': self.channel, 'samples': self.samples, 'active': self.active,
+                'activity': self.active / self.samples if self.samples else None,
+                'min': self.min, 'max': self.max,
+                'mean': self.total / self.samples if self.samples else None,
+                'last': self.last}
+
+
+class ChannelScanner:
+    """ Sweep channels and measure their activity
+
+    The switch and RSSI frames are built once and handed to
+    submit_command directly, so a hop costs two command round trips and
+    the dwell.  The two commands cannot be pipelined: the ATE/CPS
+    mailbox holds a single command and the reply is written after the
+    h2p semaphore clears, so an RSSI command sent as soon as the switch
+    was taken would race the switch reply for the response buffer.
+    The RSSI command therefore follows the switch once the radio has
+    answered it and dwell has passed.  The dwell starts at
+    the settle time measured by calibrate.  Readings above the
+    threshold, and one channel per sweep, are read a second time once
+    max_dwell has passed: if the two differ the dwell was too short and
+    doubles, and a sweep where every second reading agreed shrinks it.
+    """
+    def __init__(self, channels, threshold=-100.0, dwell=0.0, max_dwell=MAX_DWELL,
+                 timeout=COMMAND_TIMEOUT, uart=None):
+        """ Initialize the scanner
+
+        @param channels: channel numbers to sweep in order
+        @param threshold: RSSI in dBm from which a channel counts as active
+        @param dwell: time between switching and reading the RSSI in s
+        @param max_dwell: longest dwell the adaptation goes to in s
+        @param timeout: longest time to wait for each reply in s
+        @param uart: connection to use, the last one opened by default
+        """
+        self.uart = get_uart(uart)
+        self.channels = list(channels)
+        self.threshold = threshold
+        self.dwell = dwell
+        self.max_dwell = max_dwell
+        self.timeout = timeout
+        self.activity = collections.OrderedDict(
+            (channel, ChannelActivity(channel)) for channel in self.channels)
+        self.sweeps = 0
+        self._frames = None
+        self._resp_addr = None
+
+    def _prepare(self):
+        if self._frames is None:
+            # also loads saved pointers before they are relied on
+            dmo_connect(self.timeout, uart=self.uart)
+            addr = self.uart.ate_cps_addr
+            self._frames = {channel: ate_command(SWITCH.format(channel), addr)
+                            for channel in self.channels}
+            self._frames[None] = ate_command(RSSI, addr)
+            self._resp_addr = self.uart.ate_cps_resp_length_addr
+
+    def _command(self, key):
+        if not submit_command(self._frames[key], self._resp_addr, self.timeout,
+                              self.uart, 'ate'):
+            raise CommandTimeout('radio did not answer {}'.format(
+                RSSI if key is None else SWITCH.format(key)))
+
+    def switch(self, channel):
+        """ Change the channel
+
+        @param channel: channel number
+        @return: time.monotonic() when the radio had switched
+        """
+        self._prepare()
+        self._command(channel)
+        return time.monotonic()
+
+    def rssi(self):
+        """ Read the RSSI of the current channel
+
+        @return: RSSI in dBm, None if the reply held no number
+        """
+        self._prepare()
+        self._command(None)
+        value = parse_reply(read_ate_reply(self.uart), RSSI, ('rssi',))[0]
+        return None if math.isnan(value) else value
+
+    def calibrate(self):
+        """ Measure the time the RSSI takes to settle after a switch
+
+        Hops between the first two channels and reads the RSSI for
+        max_dwell after each switch.  The dwell is set to the longest
+        time before the readings reached the value they ended at.
+
+        @return: the dwell in s
+        """
+        settle = 0.0
+        for channel in self.channels[:2] * 2:
+            switched = self.switch(channel)
+            readings = []
+            while not readings or readings[-1][0] - switched < self.max_dwell:
+                asked = time.monotonic()
+                readings.append((asked, self.rssi()))
+            final = readings[-1][1]
+            if final is None:
+                continue
+            settled = None
+            for asked, value in readings:
+                if value is None or abs(value - final) > SETTLE_TOLERANCE:
+                    settled = None
+                elif settled is None:
+                    settled = asked - switched
+            settle = max(settle, settled)
+        self.dwell = min(self.max_dwell, settle)
+        return self.dwell
+
+    def hop(self, channel, confirm=False):
+        """ Switch to a channel and take one reading
+
+        @param channel: channel number
+        @param confirm: read the RSSI a second time even if the channel
+        does not look active
+        @return: RSSI in dBm, None if the radio did not report it, and
+        whether a second reading agreed, None when there was none
+        """
+        switched = self.switch(channel)
+        wait = switched + self.dwell - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        value = self.rssi()
+        agreed = None
+        if value is not None and (confirm or value >= self.threshold):
+            # by max_dwell the reading has settled
+            wait = switched + self.max_dwell - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            again = self.rssi()
+            agreed = again is not None and abs(again - value) <= SETTLE_TOLERANCE
+            if not agreed:
+                self.dwell = min(self.max_dwell, max(2 * self.dwell, 0.002))
+                value = again
+        if value is not None:
+            self.activity[channel].add(value, value >= self.threshold)
+        return value, agreed
+
+    def sweep(self):
+        """ Hop over every channel once
+
+        Besides the channels that look active one channel per sweep, in
+        turn, is read twice so a dwell that is too short for quiet
+        channels is also noticed.
+
+        @return: dict of the RSSI read on each channel
+        """
+        readings = collections.OrderedDict()
+        confirmations = []
+        spot = self.channels[self.sweeps % len(self.channels)]
+        for channel in self.channels:
+            readings[channel], agreed = self.hop(channel, channel == spot)
+            if agreed is not None:
+                confirmations.append(agreed)
+        if confirmations and all(confirmations):
+            self.dwell *= 0.9
+        self.sweeps += 1
+        return readings
+
+    def summary(self):
+        """ return the activity of every channel as a list of dicts
+        """
+        return [activity.as_dict() for activity in self.activity.values()]
@@ -0,0 +1,78 @@
+from .serialio import COMMAND_TIMEOUT
+from .serialio import ate_resp_lines
+from .serialio import dmo_connect
+from .serialio import get_uart
+from .serialio import send_ate_command
+from .serialio import send_cps_command
+from .serialio import uart_resp_read
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+CONNECT = 'AT+DMOCONNECT'
+SAVE = 'AT+DMOSAVEPARAM'
+
+
+def parse_script(lines):
+    """ Pick the commands out of a script
+
+    Blank lines and everything after a # are ignored.
+
+    @param lines: iterable of lines such as an open file
+    @return: list of commands
+    """
+    commands = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if line:
+            commands.append(line)
+    return commands
+
+def run_command(command, timeout=COMMAND_TIMEOUT, uart=None):
+    """ Run one AT or hex CPS command
+
+    @param command: AT command, or a CPS command in hex
+    @param timeout: longest time to wait for the reply in s
+    @param uart: connection to use, the last one opened by default
+    @return: dict with the command, whether the radio replied and the
+    response lines for AT commands or the response in hex for CPS, None
+    when the radio did not reply
+    """
+    uart = get_uart(uart)
+    if command[0:3] == 'AT+':
+        ok = send_ate_command(command, timeout, uart)
+        response = ate_resp_lines(uart) if ok else None
+    else:
+        ok = send_cps_command(bytes.fromhex(command), timeout, uart)
+        response = uart_resp_read(uart).hex() if ok else None
+    return {'command': command, 'ok': ok, 'response': response}
+
+def run_script(commands, timeout=COMMAND_TIMEOUT, uart=None):
+    """ Run AT and CPS commands in one session
+
+    AT+DMOCONNECT is sent once before the first AT command and left out
+    afterwards.  AT+DMOSAVEPARAM is held back and sent once after the
+    last command, so the parameters are written to NVRAM only once.
+
+    @param commands: list of AT commands or CPS commands in hex
+    @param timeout: longest time to wait for each reply in s
+    @param uart: connection to use, the last one opened by default
+    @return: generator of the run_command dicts, in order, with the
+    deferred AT+DMOSAVEPARAM last
+    """
+    uart = get_uart(uart)
+    save = False
+    for command in commands:
+        name = command.split('=', 1)[0].upper()
+        if name == SAVE:
+            save = True
+            continue
+        if name == CONNECT:
+            yield {'command': command, 'ok': True, 'response': dmo_connect(timeout, uart=uart)}
+            continue
+        if command[0:3] == 'AT+':
+            dmo_connect(timeout, uart=uart)
+        yield run_command(command, timeout, uart)
+    if save:
+        dmo_connect(timeout, uart=uart)
+        yield run_command(SAVE, timeout, uart)
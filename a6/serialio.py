@@ -1,69 +1,161 @@
+import collections
+import os
 import serial
 import time
 import sys
 import re
+import select
 from .eprint import eprint
 from .a6commands import CPSFrame, h2p_command
 from .a6commands import ChanInfoFrame, h2p_command
 from .a6commands import ate_command
 from .a6commands import cps_command
 from .a6commands import read_uart_to_host
-from .rdadebug import RdaFrame
+from .cache import POINTER_TABLE
+from .capture import RX
+from .capture import TX
+from .cache import ReadCache
+from .rdadebug import RdaStreamDecoder
+from .rdadebug import read_block
+from .rdadebug import read_register_int8
 from .rdadebug import read_word
+from .rdadebug import write_block
+from .stats import LinkStats
+
+READ_WINDOW = 32
+BLOCK_SIZE = 256
+BLOCK_WINDOW = 4
+WRITE_CHUNK = 256
+PROBE_ADDR = 0x81c00264
+COMMAND_TIMEOUT = 1.0
+H2P_REGISTER = 0x5
+
+class ReadTimeout(TimeoutError):
+    """ The radio did not answer a read before its deadline
+    """
 
-class Singleton(object):
-    def __new__(cls, *args, **kwargs):
-        """ Singleton  class
+class CommandTimeout(TimeoutError):
+    """ The radio did not take or answer an ATE/CPS command in time
+    """
 
-        @param args:  arguments
-        @param kwargs: keyword arguments 
-        @return: object
-        """
-        it = cls.__dict__.get("__it__")
-        if it is not None:
-            return it
-        cls.__it__ = it = object.__new__(cls)
-        it.init(*args, **kwargs)
-        return it
-
-    def init(self, *args, **kwargs):
-        """
-        """
-        pass
+def open_port(port, baudrate=921600, timeout=0.1):
+    """ Open a serial port with the settings of the radio
+
+    @param port: serial port name or url, or an already open port
+    which is returned as is
+    @param baudrate: baud rate
+    @param timeout: read timeout in s
+    @return: the serial port
+    """
+    if not isinstance(port, str):
+        return port
+    return serial.serial_for_url(port, baudrate,
+        serial.EIGHTBITS, serial.PARITY_NONE, serial.STOPBITS_ONE,
+        xonxoff=True, rtscts=False, timeout=timeout)
+
+def port_name(port):
+    """ return a short name for a port to use in file names
+
+    @param port: serial port name or url
+    @return: the name
+    """
+    return os.path.basename(str(port).rstrip('/')) or 'radio'
+
+class SerialIO:
+    """ Connection to one radio
+
+    Every function in this module takes the connection to use as its
+    uart argument.  When it is left out the most recently opened
+    connection is used, which keeps single radio scripts short.
+    """
+    default = None
 
-class SerialIO(Singleton):
-    def init(self, port, baudrate=921600, verbosity=0, timeout=0.1):
+    def __init__(self, port, baudrate=921600, verbosity=0, timeout=0.1, cache=None,
+                 pointers=None, capture=None, autobaud=None):
         """ Initialize the serial port
 
-        @param port: serial port
-        @param baudrate: baud rate
+        @param port: serial port name or url, or an already open port
+        such as a SimulatedSerial
+        @param baudrate: baud rate, ignored with autobaud
         @param verbosity: verbosity level
+        @param timeout: longest wait for a reply to a request in s
+        @param cache: ReadCache to use, by default a new one holding
+        the firmware pointer table
+        @param pointers: PointerCache to load the firmware pointer table
+        of this radio from before the first ATE/CPS command
+        @param capture: Capture recording everything written and read,
+        closed along with the port
+        @param autobaud: AutoBaud choosing the baud rate by probing the
+        radio, which then also steps it down when replies fail
         """
         self.port = port
-        self.sio = serial.Serial(port, baudrate, 
-            serial.EIGHTBITS, serial.PARITY_NONE, serial.STOPBITS_ONE,
-            xonxoff=True, rtscts=False, timeout=timeout)
+        if autobaud is not None:
+            baudrate = autobaud.rates[0]
+        self.sio = open_port(port, baudrate, timeout)
         self.verbosity = verbosity
-        self._ate_cps_addr = 0
-        self._ate_cps_resp_addr = 0
-        self._ate_cps_resp_length_addr = 0
-        self._uart_resp_addr = 0
+        self.timeout = timeout
+        try:
+            self._fileno = self.sio.fileno()
+        except (AttributeError, OSError, ValueError, serial.SerialException):
+            # url ports, Windows and the simulator wait in their read
+            self._fileno = None
+        if cache is None:
+            cache = ReadCache()
+            cache.add_region(*POINTER_TABLE, static=True)
+        self.cache = cache
+        self._seq = 0
+        self.block_read = None
+        self.connected = False
+        self.decoder = RdaStreamDecoder()
+        self.stats = LinkStats()
+        self.capture = capture
+        self.autobaud = autobaud
+        if autobaud is not None:
+            autobaud.negotiate(self)
+        self.pointers = pointers
+        self.pointers_checked = pointers is None
+        self.preloaded = None
         self.sio.flush()
+        SerialIO.default = self
         if verbosity > 0:
             eprint("SerialIO: {} initialized".format(self.port))
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def __del__(self):
         """ Close the serial port
         """
+        # SerialIO.default holds on to the default connection, so only
+        # connections nobody uses any more get here; sio is missing when
+        # opening the port failed
+        if getattr(self, 'sio', None) is not None:
+            self.sio.close()
+
+    def close(self):
+        """ Close the serial port and capture and stop using it as the default
+        """
+        if SerialIO.default is self:
+            SerialIO.default = None
         self.sio.close()
+        if self.capture is not None:
+            self.capture.close()
 
-    def write(self, msg):
+    def write(self, msg, frames=1):
         """ Write a message to the serial port
 
         @param msg: message
+        @param frames: number of debug frames in the message
         """
         if self.verbosity > 0:
             eprint("write : ", msg.hex())
+        self.cache.observe(msg)
+        self.stats.sent(len(msg), frames)
+        if self.capture is not None:
+            self.capture.record(TX, msg)
         self.sio.write(msg)
 
     def read(self, nbytes):
@@ -72,9 +164,36 @@ class SerialIO(Singleton):
         @param nbytes: number of bytes
         @return: message
         """
-        data = self.sio.read(nbytes)
+        return self._received(self.sio.read(nbytes))
+
+    def receive(self, timeout=None):
+        """ Wait for bytes to arrive and read all of them
+
+        Ports with a file descriptor wait in select, which takes no CPU
+        and returns as soon as the first byte is in.  Other ports wait
+        in their own read for up to the timeout they were opened with.
+
+        @param timeout: longest wait in s, the port timeout by default
+        @return: the bytes, empty if nothing arrived in time
+        """
+        waiting = self.sio.in_waiting
+        if not waiting and self._fileno is not None:
+            ready, _, _ = select.select([self._fileno], [], [],
+                                        self.timeout if timeout is None else timeout)
+            if not ready:
+                return b''
+            waiting = self.sio.in_waiting
+        data = self.sio.read(waiting or 1)
+        if data and self.sio.in_waiting:
+            data += self.sio.read(self.sio.in_waiting)
+        return self._received(data)
+
+    def _received(self, data):
         if self.verbosity > 0:
             eprint("read  : ", data.hex())
+        self.stats.received(data)
+        if self.capture is not None and data:
+            self.capture.record(RX, data)
         return data
     
     def flush(self):
@@ -82,29 +201,69 @@ class SerialIO(Singleton):
         """
         self.sio.flush()
 
+    def link_stats(self):
+        """ return the link counters as a dict suitable for JSON
+        """
+        return self.stats.as_dict(self.decoder)
+
+    def next_seq(self):
+        """ return the next request sequence number
+
+        Sequence numbers rotate through 1-255 so that a late reply to an
+        earlier request is not mistaken for the current one.
+        """
+        self._seq = self._seq % 255 + 1
+        return self._seq
+
+    @property
+    def baudrate(self):
+        """ return the baud rate of the port
+        """
+        return self.sio.baudrate
+
+    @baudrate.setter
+    def baudrate(self, rate):
+        """ Change the baud rate, dropping anything received before
+        """
+        self.sio.baudrate = rate
+        self.sio.reset_input_buffer()
+        self.decoder.reset()
+
+    def link_check(self):
+        """ Let the AutoBaud of the connection step the rate down
+
+        @return: True if the baud rate was changed
+        """
+        if self.autobaud is None:
+            return False
+        return self.autobaud.update(self)
+
     @property
     def in_waiting(self):
         """ return the number of bytes in the serial port
         """
         return self.sio.in_waiting
 
+    @property
+    def out_waiting(self):
+        """ return the number of bytes still to be sent
+        """
+        return self.sio.out_waiting
+
+    def _pointer(self, addr):
+        return int.from_bytes(fetch_memory_address(addr, uart=self), byteorder='little')
+
     @property
     def ate_cps_addr(self):
         """ return the address of the ate command
         """
-        if self._ate_cps_addr == 0:
-            self._ate_cps_addr = fetch_memory_address(0x81c00270)
-            self._ate_cps_addr = int.from_bytes(self._ate_cps_addr, byteorder='little')
-        return self._ate_cps_addr
+        return self._pointer(0x81c00270)
 
     @property
     def ate_cps_resp_addr(self):
         """ return the address of the ate command response
         """
-        if self._ate_cps_resp_addr == 0:
-            self._ate_cps_resp_addr = fetch_memory_address(0x81c00264)
-            self._ate_cps_resp_addr = int.from_bytes(self._ate_cps_resp_addr, byteorder='little')
-        return self._ate_cps_resp_addr
+        return self._pointer(0x81c00264)
 
     @property
     def ate_cps_resp_length_addr(self):
@@ -116,226 +275,556 @@ class SerialIO(Singleton):
     def uart_resp_addr(self):
         """ return the address of the ate command response
         """
-        if self._uart_resp_addr == 0:
-            self._uart_resp_addr = fetch_memory_address(0x81c0026c)
-            self._uart_resp_addr = int.from_bytes(self._uart_resp_addr, byteorder='little')
-        return self._uart_resp_addr
+        return self._pointer(0x81c0026c)
+
 
+def get_uart(uart=None):
+    """ Pick the connection to use
 
+    @param uart: the SerialIO to use, None for the last one opened
+    @return: the SerialIO
+    """
+    if uart is not None:
+        return uart
+    if SerialIO.default is None:
+        raise RuntimeError('no serial port has been opened')
+    return SerialIO.default
 
-def write_flush_pause(msg, sleep = 0.07):
+def write_flush_pause(msg, sleep = 0.07, uart=None):
     """ Write out to serial and wait for the radio to process the command
 
     @param msg: bytes to write
-    @param sleep: time to sleep after writing in ms
+    @param sleep: time to sleep after writing in s
+    @param uart: connection to use, the last one opened by default
 
     """
-    uart = SerialIO()
+    uart = get_uart(uart)
     uart.write(msg)
     uart.flush()
-    time.sleep(0.07)
+    if sleep:
+        time.sleep(sleep)
+
+def read_register(addr, retries=25, uart=None):
+    """ Read an internal debug register
 
+    @param addr: register number
+    @param retries: number of attempts before giving up
+    @param uart: connection to use, the last one opened by default
+    @return: the register value
 
-def send_ate_command(msg):
+    """
+    uart = get_uart(uart)
+    for _ in range(retries):
+        seq = uart.next_seq()
+        sent = time.monotonic()
+        uart.write(read_register_int8(addr, seq))
+        uart.flush()
+        for frame in _replies(uart, sent + uart.timeout):
+            if frame.seq == seq and len(frame.content) == 1:
+                uart.stats.round_trip('register', time.monotonic() - sent)
+                return frame.content[0]
+    raise ReadTimeout('no response reading register 0x{:x}'.format(addr))
+
+def _replies(uart, deadline):
+    """ Decode received frames until the deadline
+
+    @param uart: the SerialIO
+    @param deadline: time.monotonic() to stop waiting at
+    @return: generator of the RdaFrame received
+    """
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        data = uart.receive(remaining)
+        if not data:
+            return
+        yield from uart.decoder.feed(data)
+
+def submit_command(frame, resp_addr, timeout=COMMAND_TIMEOUT, uart=None, kind='command'):
+    """ Hand a command to the ATE/CPS function and wait for the reply
+
+    The mailbox is written without pauses.  The h2p semaphore stays
+    at 0xA5 until the radio has taken the command, after which the
+    first word of the response, cleared beforehand, turns non-zero
+    once the reply has been written.
+
+    @param frame: write_block frame holding the command
+    @param resp_addr: address of the first word of the response
+    @param timeout: longest time to wait for the radio in s
+    @param uart: connection to use, the last one opened by default
+    @param kind: name the round trip time is recorded under
+    @return: True if a reply was written, False if the radio took the
+    command without replying
+
+    """
+    uart = get_uart(uart)
+    start = time.monotonic()
+    deadline = start + timeout
+    uart.write(h2p_command(0))
+    uart.write(write_block(resp_addr, bytes(4)))
+    uart.write(frame)
+    uart.write(h2p_command(0xa5))
+    uart.flush()
+    while read_register(H2P_REGISTER, uart=uart) == 0xa5:
+        if time.monotonic() > deadline:
+            raise CommandTimeout('radio did not take the command')
+    while fetch_memory_address(resp_addr, uart=uart) == bytes(4):
+        if time.monotonic() > deadline:
+            return False
+    uart.stats.round_trip(kind, time.monotonic() - start)
+    return True
+
+def send_ate_command(msg, timeout=COMMAND_TIMEOUT, uart=None):
     """ Send a command to the ATE/CPS function on the radio
 
     To send a command to the ATE or CPS software on the radio, it has
     to be surrounded by these h2p commands which clear the registers
     and then throw and interupt which causes the command to be
-    executed
+    executed.  This returns as soon as the radio has written its reply.
     
-    @param msg: bytes to write
+    @param msg: command to send
+    @param timeout: longest time to wait for the radio in s
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio replied
 
     """
-    uart = SerialIO()
-    write_flush_pause(h2p_command(0))
-    write_flush_pause(ate_command(msg, uart.ate_cps_addr))
-    write_flush_pause(h2p_command(0xa5))
+    uart = get_uart(uart)
+    return _send_command(lambda: ate_command(msg, uart.ate_cps_addr),
+                         lambda: uart.ate_cps_resp_length_addr, timeout, uart, 'ate')
 
-def send_cps_command(msg):
+def send_cps_command(msg, timeout=COMMAND_TIMEOUT, uart=None):
     """ Send a command to the ATE/CPS function on the radio
 
     To send a command to the ATE or CPS software on the radio, it has
     to be surrounded by these h2p commands which clear the registers
     and then throw and interupt which causes the command to be
-    executed
+    executed.  This returns as soon as the radio has written its reply.
 
     @param msg: bytes to write
+    @param timeout: longest time to wait for the radio in s
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio replied
 
     """
 
-    uart = SerialIO()
-    write_flush_pause(h2p_command(0))
-    write_flush_pause(cps_command(msg, uart.ate_cps_addr))
-    write_flush_pause(h2p_command(0xa5))
+    uart = get_uart(uart)
+    return _send_command(lambda: cps_command(msg, uart.ate_cps_addr),
+                         lambda: uart.uart_resp_addr, timeout, uart, 'cps')
+
+def _send_command(build, resp_addr, timeout, uart, kind):
+    """ Submit a command, loading saved pointers on first use
+
+    Before the first command the PointerCache loads the pointer table
+    saved for the firmware, or saves the table found for new firmware.
+    A saved table is trusted until the command fails, in which case
+    the pointers are read from the radio again, saved and the command
+    is sent once more.
+
+    @param build: function making the command frame
+    @param resp_addr: function returning the response address
+    @param timeout: longest time to wait for the radio in s
+    @param uart: the SerialIO
+    @param kind: name the round trip time is recorded under
+    @return: True if the radio replied
+    """
+    if uart.pointers_checked:
+        return submit_command(build(), resp_addr(), timeout, uart, kind)
+    uart.pointers_checked = True
+    uart.preloaded = uart.pointers.preload(uart)
+    if uart.preloaded is None:
+        uart.pointers.remember(uart)
+        return submit_command(build(), resp_addr(), timeout, uart, kind)
+    try:
+        if submit_command(build(), resp_addr(), timeout, uart, kind):
+            return True
+    except CommandTimeout:
+        pass
+    # the saved table may belong to other firmware
+    uart.cache.invalidate(*POINTER_TABLE)
+    uart.preloaded = None
+    uart.pointers.remember(uart)
+    return submit_command(build(), resp_addr(), timeout, uart, kind)
 
-def wait_on_read(retries=256, delay=0):
+def wait_on_read(timeout=None, uart=None):
     """ Wait until a read happens
 
-    This function waits until something is received from the serial or
-    will abort after a certain number of retries.
-
-    @param retries: number of retries before aborting
-    @param delay: time to sleep between retries
-    """
-
-    uart = SerialIO()
-    size = uart.in_waiting
-    countdown = retries
-    while size == 0 and countdown > 0:
-        size = uart.in_waiting
-        countdown -= 1
-        if delay: time.sleep(delay)
-    if countdown == 0:
-        # nothing received
-        return b''
-    if size > 0:
-        data = uart.read(size)
-    return data
+    This function blocks until something is received from the serial
+    port or the timeout runs out.
 
-def send_uart_setup():
+    @param timeout: longest wait in s, the port timeout by default
+    @param uart: connection to use, the last one opened by default
+    @return: the bytes received, empty if nothing arrived in time
+    """
+    return get_uart(uart).receive(timeout)
+
+def send_uart_setup(uart=None):
     """ Replays the initial UART setup sequence
 
     This sequence and timing is from the CPS software capture.
+
+    @param uart: connection to use, the last one opened by default
+    @return: True if the radio answered
     """
-    uart = SerialIO()
+    uart = get_uart(uart)
     knock_worked = False
     retries = 25
     while not knock_worked and retries > 0:
         uart.write(read_uart_to_host())
         uart.flush()
-        time.sleep(0.001)
-        data = wait_on_read()
-        response = RdaFrame(data)
-        if response.seq == 1 and response.content == b'\x80':
-            knock_worked = True
-        else:
+        data = wait_on_read(uart=uart)
+        for response in uart.decoder.feed(data):
+            if response.seq == 1 and response.content == b'\x80':
+                knock_worked = True
+        if not knock_worked:
             time.sleep(0.25)
         retries -= 1
     return knock_worked
 
-def fetch_memory_address(addr, seq=1):
-    """ Attempt to read a memory address and keep trying until it succeeds
+def fetch_memory_address(addr, seq=None, retries=25, uart=None):
+    """ Read a memory address, asking again until the radio answers
+
+    Each attempt waits for the reply for up to the timeout of the
+    port, so a radio that stopped answering ends the read after
+    retries attempts.
+
+    @param addr: address to read
+    @param seq: sequence number, by default the next one of the port
+    @param retries: number of attempts before giving up
+    @param uart: connection to use, the last one opened by default
+    @return: the word in bytes
 
     """
-    uart = SerialIO()
-    read_ok = False
-    retval = b''
-    retries = 25
-    while not read_ok:
-        frame = read_word(addr, seq)
+    uart = get_uart(uart)
+    word = uart.cache.get(addr)
+    if word is not None:
+        return word
+    if seq is None:
+        seq = uart.next_seq()
+    frame = read_word(addr, seq)
+    for attempts in range(1, retries + 1):
+        if attempts > 1:
+            uart.link_check()
+        sent = time.monotonic()
         uart.write(frame)
         uart.flush()
-        size = uart.in_waiting
-        i = retries
-        while size == 0 and i > 0:
-            time.sleep(0.001)
-            size = uart.in_waiting
-            i -= 1
-        if retries == 0:
-            continue
-        data = uart.read(size)
-        inbound_frame = RdaFrame(data)
-        read_ok = inbound_frame.seq == seq and not inbound_frame.check_fail
-        retval = inbound_frame.content
-    return retval
-
-def atecps_resp_read():
+        for inbound_frame in _replies(uart, sent + uart.timeout):
+            if inbound_frame.seq == seq:
+                retval = inbound_frame.content
+                uart.stats.round_trip('read_word', time.monotonic() - sent)
+                uart.stats.attempts.add(attempts)
+                if len(retval) == 4:
+                    uart.cache.store(addr, retval)
+                return retval
+    raise ReadTimeout('no response reading 0x{:08x}'.format(addr))
+
+def atecps_resp_read(uart=None):
     """ Read the response from an ATECPS command
 
+    @param uart: connection to use, the last one opened by default
     @return: response from ATECPS command
 
     """
-    uart = SerialIO()
-    length = fetch_memory_address(uart.ate_cps_resp_length_addr)
+    uart = get_uart(uart)
+    length = fetch_memory_address(uart.ate_cps_resp_length_addr, uart=uart)
     length = int.from_bytes(length, 'little')
-    response = read_mem_range(uart.ate_cps_resp_addr, uart.ate_cps_resp_addr + length)
+    response = read_mem_range(uart.ate_cps_resp_addr, uart.ate_cps_resp_addr + length, uart)
     return response
 
-def uart_resp_read():
+def ate_resp_lines(uart=None):
+    """ Read the response from an ATE command as lines of text
+
+    @param uart: connection to use, the last one opened by default
+    @return: list of response lines
+    """
+    return [line.decode('utf-8', 'replace') for line in atecps_resp_read(uart).split(b'\x00')]
+
+def dmo_connect(timeout=COMMAND_TIMEOUT, force=False, uart=None):
+    """ Open the ATE session unless this connection already has
+
+    The radio only takes AT commands after AT+DMOCONNECT, which has to
+    be sent once per connection rather than before every command.
+
+    @param timeout: longest time to wait for the radio in s
+    @param force: send AT+DMOCONNECT even if it was sent before
+    @param uart: connection to use, the last one opened by default
+    @return: the response lines, empty if it was not sent
+    """
+    uart = get_uart(uart)
+    if uart.connected and not force:
+        return []
+    if not send_ate_command("AT+DMOCONNECT", timeout, uart):
+        raise CommandTimeout('radio did not answer AT+DMOCONNECT')
+    uart.connected = True
+    return ate_resp_lines(uart)
+
+def uart_resp_read(uart=None):
     """ Read the response from an ATECPS command
 
+    @param uart: connection to use, the last one opened by default
     @return: response from ATECPS command
 
     """
-    uart = SerialIO()
-    length = fetch_memory_address(uart.uart_resp_addr)
+    uart = get_uart(uart)
+    length = fetch_memory_address(uart.uart_resp_addr, uart=uart)
     length = length[1]
-    response = read_mem_range(uart.uart_resp_addr, uart.uart_resp_addr + length)
+    response = read_mem_range(uart.uart_resp_addr, uart.uart_resp_addr + length, uart)
     return response
 
-def read_mem_range(begin, end):
+def read_mem_range(begin, end, uart=None):
     """ Read a memory range
 
+    Large ranges use block reads when the firmware supports them,
+    which is probed once per connection, and word reads otherwise.
+    Ranges in a cacheable region are served from the read cache when
+    possible.
+
     @param begin: start address
     @param end: end address
+    @param uart: connection to use, the last one opened by default
     @return: the data in bytes
 
     """
-    addr = begin
-    datalist = []
-    while addr < end:
-        data = fetch_memory_address(addr)
-        if len(data) == 4:
-            datalist.append(data)
-            addr = addr + 4
-    return b''.join(datalist)
+    uart = get_uart(uart)
+    data = uart.cache.lookup(begin, end)
+    if data is None:
+        data = _read_mem_range(begin, end, uart)
+        uart.cache.store(begin, data)
+    return data
+
+def _read_mem_range(begin, end, uart):
+    if end - begin >= 2 * BLOCK_SIZE:
+        if uart.block_read is None:
+            uart.block_read = probe_block_read(uart)
+        if uart.block_read:
+            try:
+                return read_mem_blocks(begin, end, uart=uart)
+            except TimeoutError:
+                # the firmware stopped answering block reads
+                uart.block_read = False
+    return read_mem_burst(begin, end, uart=uart)
+
+def probe_block_read(uart=None):
+    """ Find out whether the firmware answers block reads
+
+    A few words of the firmware pointer table are read both ways and
+    must match.  A reply of the wrong length, such as an error or a
+    single word, means the firmware does not know block reads.
 
-def read_mem_burst(sio, begin, end, offset=0, verbosity=0):
-    """ Read a limited memory range using a burst read
+    @param uart: connection to use, the last one opened by default
+    @return: True if block reads work
+
+    """
+    uart = get_uart(uart)
+    begin = PROBE_ADDR
+    for _ in range(2):
+        seq = uart.next_seq()
+        uart.write(read_block(begin, 16, seq))
+        uart.flush()
+        for frame in _replies(uart, time.monotonic() + uart.timeout):
+            if frame.seq != seq:
+                continue
+            if len(frame.content) != 16:
+                return False
+            return frame.content == read_mem_burst(begin, begin + 16, uart=uart)
+    return False
+
+def _read_pipelined(begin, end, size, build, window, retries, uart, kind):
+    """ Read a memory range with a window of requests in flight
+
+    The range is cut into pieces of size bytes, the last one possibly
+    shorter, each requested with its own sequence number.  Replies are
+    matched by sequence number and since the radio answers in order,
+    any outstanding request sent before a reply that arrives is
+    considered lost and is issued again along with pieces whose reply
+    failed the check or had the wrong length.  Every piece may be
+    issued again up to retries times.
+
+    @param begin: start address
+    @param end: end address, rounded up to a whole word
+    @param size: bytes per request
+    @param build: function of address, length and seq making the frame
+    @param window: number of requests kept in flight
+    @param retries: number of times a piece that got no reply or a
+    reply of the wrong length is issued again before giving up
+    @param uart: the SerialIO
+    @param kind: name the round trip times are recorded under
+    @return: the data in bytes
+
+    """
+    if not 0 < window < 255:
+        raise ValueError('window must be between 1 and 254')
+    total = max(0, (end - begin + 3) // 4 * 4)
+    count = (total + size - 1) // size
+    pieces = [b''] * count
+    todo = collections.deque(range(count))
+    inflight = collections.OrderedDict()
+    sent = {}
+    failures = [0] * count
+
+    def again(indices):
+        for index in indices:
+            failures[index] += 1
+            if failures[index] > retries:
+                raise ReadTimeout('no valid response reading 0x{:08x}'.format(
+                    begin + size * index))
+        todo.extendleft(reversed(indices))
+
+    while todo or inflight:
+        now = time.monotonic()
+        while todo and len(inflight) < window:
+            index = todo.popleft()
+            seq = uart.next_seq()
+            uart.write(build(begin + size * index, min(size, total - size * index), seq))
+            inflight[seq] = index
+            sent[seq] = now
+        uart.flush()
+        data = uart.receive()
+        if not data:
+            # everything in flight has been lost, start over with it
+            lost = list(inflight.values())
+            inflight.clear()
+            again(lost)
+            continue
+        now = time.monotonic()
+        for frame in uart.decoder.feed(data):
+            if frame.seq not in inflight:
+                continue
+            uart.stats.round_trip(kind, now - sent[frame.seq])
+            lost = []
+            while True:
+                reply_seq, index = inflight.popitem(last=False)
+                if reply_seq == frame.seq:
+                    break
+                lost.append(index)
+            if len(frame.content) == min(size, total - size * index):
+                pieces[index] = frame.content
+            else:
+                lost.append(index)
+            again(lost)
+        if uart.link_check():
+            # replies to the old rate will not arrive
+            todo.extendleft(reversed(inflight.values()))
+            inflight.clear()
+    return b''.join(pieces)
+
+def read_mem_burst(begin, end, window=READ_WINDOW, retries=25, uart=None):
+    """ Read a memory range using pipelined word reads
+
+    Up to window read_word frames are kept in flight at once.
 
-    @param sio: serial object
     @param begin: start address
     @param end: end address
-    @param offset: offset of the sequence number
-    @param verbosity: verbosity level
+    @param window: number of requests kept in flight
+    @param retries: number of times a piece is issued again before giving up
+    @param uart: connection to use, the last one opened by default
     @return: the data in bytes
+
     """
-    
-    if end - begin > 0x100:
-        raise ValueError('burst read only supports ranges of less than 256 bytes')
-    # the burst is in words of 4 bytes
-    burst = (end - begin) / 4
-    # preallocate the lists
-    recvflags = [False] * burst
-    recvdata = [0] * burst
-    i = 0
-    data = b''
-    while sum(recvflags) != burst:
-        while i < burst:
-            if not recvflags[i]:
-                sio.write(read_word(begin + 4 * i, i + offset + 1))
-            i += 1
-            size = sio.in_waiting
-            if size  > 0:
-                data += sio.read(size)
-        i = 0
-
-    return b''.join(recvdata)
-
-def get_chan_info(channel = 0):
+    return _read_pipelined(begin, end, 4, lambda addr, length, seq: read_word(addr, seq),
+                           window, retries, get_uart(uart), 'read_word')
+
+def read_mem_blocks(begin, end, block_size=BLOCK_SIZE, window=BLOCK_WINDOW,
+                    retries=25, uart=None):
+    """ Read a memory range using pipelined block reads
+
+    @param begin: start address
+    @param end: end address
+    @param block_size: bytes per request
+    @param window: number of requests kept in flight
+    @param retries: number of times a piece is issued again before giving up
+    @param uart: connection to use, the last one opened by default
+    @return: the data in bytes
+
+    """
+    return _read_pipelined(begin, end, block_size, read_block,
+                           window, retries, get_uart(uart), 'read_block')
+
+def _chunks(begin, length, size):
+    """ Cut a range into pieces that end on multiples of size
+
+    @return: list of (offset, length) pairs
+    """
+    pieces = []
+    offset = 0
+    while offset < length:
+        step = min(size - (begin + offset) % size, length - offset)
+        pieces.append((offset, step))
+        offset += step
+    return pieces
+
+def _read_unaligned(addr, length, uart):
+    """ Read length bytes from any address with whole word reads
+    """
+    first = addr & ~3
+    return read_mem_range(first, addr + length, uart)[addr - first:addr - first + length]
+
+def write_mem_range(begin, data, chunk=WRITE_CHUNK, verify=True, retries=3, uart=None):
+    """ Write a memory range using back to back block writes
+
+    The data is cut into write_block frames of up to chunk bytes
+    aligned to chunk and sent without waiting, since the radio does
+    not answer writes and XON/XOFF paces the link.  The range is then
+    read back with read_mem_range and only the chunks that differ are
+    written and read again.
+
+    @param begin: start address
+    @param data: bytes to write
+    @param chunk: most bytes per frame
+    @param verify: read the range back and fix mismatched chunks
+    @param retries: rounds of rewriting mismatched chunks before giving up
+    @param uart: connection to use, the last one opened by default
+    @return: number of chunks that had to be written again
+    """
+    uart = get_uart(uart)
+    todo = _chunks(begin, len(data), chunk)
+    rewritten = 0
+    for attempt in range(retries + 1):
+        uart.write(b''.join(write_block(begin + offset, data[offset:offset + length])
+                            for offset, length in todo), len(todo))
+        uart.flush()
+        if not verify:
+            return rewritten
+        # replies to the readback would queue behind the writes
+        while uart.out_waiting:
+            time.sleep(0.001)
+        if attempt == 0:
+            # one pipelined pass over the whole range
+            readback = _read_unaligned(begin, len(data), uart)
+            todo = [(offset, length) for offset, length in todo
+                    if readback[offset:offset + length] != data[offset:offset + length]]
+        else:
+            todo = [(offset, length) for offset, length in todo
+                    if _read_unaligned(begin + offset, length, uart)
+                    != data[offset:offset + length]]
+        if not todo:
+            return rewritten
+        rewritten += len(todo)
+    raise IOError('{} chunks did not verify, first at 0x{:08x}'.format(
+        len(todo), begin + todo[0][0]))
+
+def get_chan_info(channel = 0, uart=None):
     """ Get the channel info
 
     @param channel: channel number
-    @return: the channel info
+    @param uart: connection to use, the last one opened by default
+    @return: the ChanInfoFrame
     """
+    uart = get_uart(uart)
     cmd = bytes([0, 0x12]) + channel.to_bytes(1, 'little')
-    send_cps_command(cmd)
-    resp = uart_resp_read()
-    print(ChanInfoFrame(resp))
-    # sys.stdout.buffer.write(resp)
+    send_cps_command(cmd, uart=uart)
+    resp = uart_resp_read(uart)
+    return ChanInfoFrame(resp, uart.verbosity)
 
-def get_freq_err():
+def get_freq_err(uart=None):
     """ Get the frequency error from the Radio
 
+    @param uart: connection to use, the last one opened by default
     @return: frequency error in Hz
     """
-    send_ate_command("AT+DMOCONNECT")
-    send_ate_command("AT+GETFREQERR")
-    resp = atecps_resp_read()
-    resp = resp.split(b'\x00')
-    resp = [x.decode('utf-8') for x in resp]
-    return parse_freq_err_resp(resp[0])
+    dmo_connect(uart=uart)
+    send_ate_command("AT+GETFREQERR", uart=uart)
+    return parse_freq_err_resp(ate_resp_lines(uart)[0])
 
 def parse_freq_err_resp(resp):
     """ Parse the frequency error response
@@ -350,16 +839,14 @@ def parse_freq_err_resp(resp):
     else:
         return 0
 
-def set_freq_err(freqerr):
+def set_freq_err(freqerr, uart=None):
     """ Set the frequency error on the Radio
 
     @param freqerr: frequency error parameter which is (-2500 + 10 * freqerr) in Hz
+    @param uart: connection to use, the last one opened by default
+    @return: the response lines
 
     """
-    send_ate_command("AT+DMOCONNECT")
-    send_ate_command("AT+DMOFREQERR={}".format(freqerr))
-    resp = atecps_resp_read()
-    resp = resp.split(b'\x00')
-    resp = [x.decode('utf-8') for x in resp]
-    for line in resp:
-        print(line)
+    dmo_connect(uart=uart)
+    send_ate_command("AT+DMOFREQERR={}".format(freqerr), uart=uart)
+    return ate_resp_lines(uart)
@@ -0,0 +1,496 @@
+import collections
+import os
+import queue
+import random
+import threading
+import time
+from .escaper import escaper
+from .escaper import unescaper
+from .rdadebug import compute_check
+from .rdadebug import rda_debug_frame
+from .rdadebug import RdaStreamDecoder
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+PAGE_SIZE = 0x1000
+
+# firmware pointers as found on a CO04D
+ATE_CPS_PTR = 0x81c00270
+ATE_CPS_RESP_PTR = 0x81c00264
+UART_RESP_PTR = 0x81c0026c
+ATE_CPS_ADDR = 0x8201ff9c
+ATE_CPS_RESP_ADDR = 0x82020004
+UART_RESP_ADDR = 0x82021000
+
+# debug registers
+REG_CTRL = 0x0
+REG_UART = 0x3
+REG_H2P = 0x5
+
+def chan_info_content(index, rxfreq, txfreq, chantype=0):
+    """ Build the content of a GetChanInfo response
+
+    The layout follows the fields ChanInfoFrame decodes.
+
+    @param index: channel number
+    @param rxfreq: receive frequency in Hz
+    @param txfreq: transmit frequency in Hz
+    @param chantype: channel type, 0 for digital
+    @return: the content bytes
+    """
+    return (index.to_bytes(2, 'little') + bytes([chantype, 0])
+            + rxfreq.to_bytes(4, 'little') + txfreq.to_bytes(4, 'little')
+            + bytes(4) + bytes([1, 1, 0]) + bytes(5))
+
+def cps_response(cmd_type, content, is_ok=True):
+    """ Build a CPS response frame the way CPSFrame reads it
+
+    The frame is AA LEN TYPE TYPE OK ...content... 00 BB CHK where CHK
+    covers LEN through the 00 and the content is zero padded so the
+    frame fills whole words.
+
+    @param cmd_type: the CPS command type
+    @param content: the response content
+    @param is_ok: whether the command succeeded
+    @return: the frame bytes
+    """
+    content += bytes(-(len(content) + 8) % 4)
+    length = len(content) + 8
+    msg = (bytes([0xaa, length]) + cmd_type.to_bytes(2, 'big')
+           + bytes([0x01 if is_ok else 0x00]) + content + bytes([0x00, 0xbb]))
+    return msg + compute_check(msg[1:-1])
+
+
+class SimulatedRadio:
+    """ Simulated A6 debug interface
+
+    This class answers RDA debug frames the way the radio does.  It
+    holds a sparse memory, the debug registers and the ATE/CPS mailbox
+    so the transport code can be exercised without any hardware.
+    Commands handed over with the h2p register are executed once
+    process_delay has passed, until then the semaphore stays set.
+    """
+    def __init__(self, process_delay=0.002, channels=16, block_read=True):
+        """ Initialize the radio
+
+        @param process_delay: time in seconds the firmware takes to run
+        an ATE or CPS command
+        @param channels: number of programmed channels
+        @param block_read: answer block reads, older firmware does not;
+        'reject' answers them with an empty reply instead of ignoring them
+        """
+        self.process_delay = process_delay
+        self.block_read = block_read
+        self.pages = {}
+        self.registers = {REG_CTRL: 0, REG_UART: 0x80, REG_H2P: 0}
+        self.decoder = RdaStreamDecoder()
+        self.frozen = False
+        self.freq_err = 250
+        self.current_channel = 0
+        self.channels = [chan_info_content(i, 438800000 + i * 12500, 438800000 + i * 12500)
+                         for i in range(channels)]
+        self.rssi = [-120] * channels
+        # the RSSI still reads the old channel this long after a switch
+        self.settle_time = 0.0
+        self._switched = (0.0, 0)
+        self.scanlists = [bytes([i, 0]) + bytes(range(1, channels + 1)) for i in range(2)]
+        self.group_calls = [i.to_bytes(2, 'little') + (9000 + i).to_bytes(4, 'little')
+                            for i in range(4)]
+        self.key_funcs = [bytes([i, i + 1]) for i in range(3)]
+        self.chan_names = {}
+        self.commands = []
+        self.frames = 0
+        self._pending = None
+        self.write_mem(ATE_CPS_PTR, ATE_CPS_ADDR.to_bytes(4, 'little'))
+        self.write_mem(ATE_CPS_RESP_PTR, ATE_CPS_RESP_ADDR.to_bytes(4, 'little'))
+        self.write_mem(UART_RESP_PTR, UART_RESP_ADDR.to_bytes(4, 'little'))
+        self.at_handlers = {
+            'DMOCONNECT': lambda arg: '+DMOCONNECT:0',
+            'DMODISCONNECT': lambda arg: '+DMODISCONNECT:0',
+            'DMOGETCHIPID': lambda arg: '+DMOGETCHIPID:0x6a3c1f0d',
+            'DMOGETSOFTVERSION': lambda arg: '+DMOGETSOFTVERSION:V1.0.22',
+            'GETFREQERR': lambda arg: '_OnCmd_GETFREQERR the compesation value[{}]'.format(self.freq_err),
+            'DMOFREQERR': self._at_freq_err,
+            'DMOCHSWITCH': self._at_chswitch,
+            'DMOGETCURRCH': self._at_currch,
+            'DMORDRSSI': self._at_rssi,
+            'DMOGETRXBER': lambda arg: '+DMOGETRXBER:0,0',
+            'DMOSAVEPARAM': lambda arg: '+DMOSAVEPARAM:0',
+        }
+        self.cps_handlers = {
+            0x0011: self._cps_set_chan_info,
+            0x0013: self._cps_set_chan_name,
+            0x0012: lambda args: self._cps_table(self.channels, args),
+            0x001e: lambda args: self._cps_table(self.group_calls, args),
+            0x0026: lambda args: self._cps_table(self.key_funcs, args),
+            0x002a: lambda args: self._cps_table(self.scanlists, args),
+        }
+
+    def read_mem(self, addr, length):
+        """ Read simulated memory, unwritten memory reads as zero
+
+        @param addr: start address
+        @param length: number of bytes
+        @return: the data in bytes
+        """
+        out = bytearray()
+        while length > 0:
+            page = self.pages.get(addr // PAGE_SIZE)
+            offset = addr % PAGE_SIZE
+            size = min(length, PAGE_SIZE - offset)
+            out += page[offset:offset + size] if page else bytes(size)
+            addr += size
+            length -= size
+        return bytes(out)
+
+    def write_mem(self, addr, data):
+        """ Write simulated memory
+
+        @param addr: start address
+        @param data: bytes to write
+        """
+        while data:
+            page = self.pages.setdefault(addr // PAGE_SIZE, bytearray(PAGE_SIZE))
+            offset = addr % PAGE_SIZE
+            size = min(len(data), PAGE_SIZE - offset)
+            page[offset:offset + size] = data[:size]
+            addr += size
+            data = data[size:]
+
+    def receive(self, data, now=None):
+        """ Feed bytes sent by the host to the radio
+
+        @param data: escaped bytes as written to the serial port
+        @param now: arrival time, defaults to the current time
+        @return: the escaped bytes the radio sends back
+        """
+        if now is None:
+            now = time.monotonic()
+        reply = b''
+        for frame in self.decoder.feed(data):
+            self.frames += 1
+            self.poll(now)
+            reply += self.handle(frame, now)
+        return reply
+
+    def handle(self, frame, now):
+        """ Execute one host frame
+
+        Host frames carry the command where replies carry the sequence
+        number, so the command byte is found in frame.seq.
+
+        @param frame: decoded RdaFrame
+        @param now: arrival time
+        @return: the escaped reply, empty for writes
+        """
+        cmd = frame.seq
+        payload = frame.content
+        addr = int.from_bytes(payload[0:4], 'little')
+        if cmd == 0x02:
+            return self._reply(payload[4], self.read_mem(addr, 4))
+        if cmd == 0x03 and self.block_read == 'reject':
+            return self._reply(payload[6], b'')
+        if cmd == 0x03 and self.block_read:
+            length = int.from_bytes(payload[4:6], 'little')
+            return self._reply(payload[6], self.read_mem(addr, length))
+        if cmd == 0x04:
+            return self._reply(payload[4], bytes([self.registers.get(addr, 0)]))
+        if cmd == 0x83:
+            self.write_mem(addr, payload[4:])
+        elif cmd == 0x84:
+            self._write_register(addr, payload[4], now)
+        return b''
+
+    def poll(self, now=None):
+        """ Finish a pending ATE/CPS command once it is due
+
+        @param now: current time
+        """
+        if now is None:
+            now = time.monotonic()
+        if self._pending is not None and now >= self._pending:
+            self._pending = None
+            self._execute()
+            self.registers[REG_H2P] = 0
+
+    def _reply(self, seq, data):
+        return rda_debug_frame(bytes([0xff]), bytes([seq]), data)
+
+    def _write_register(self, addr, value, now):
+        self.registers[addr] = value
+        if addr == REG_CTRL and value == 0x03:
+            self.frozen = True
+            self._pending = None
+        elif addr == REG_H2P and value == 0xa5 and not self.frozen:
+            self._pending = now + self.process_delay
+
+    def _execute(self):
+        msg = self.read_mem(ATE_CPS_ADDR, 0x100)
+        if msg[0] == 0xaa:
+            cmd = msg[2:msg[1] - 2]
+            self.commands.append(cmd)
+            cmd_type = int.from_bytes(cmd[0:2], 'big')
+            handler = self.cps_handlers.get(cmd_type)
+            content = None if handler is None else handler(cmd[2:])
+            if content is None:
+                resp = cps_response(cmd_type, b'', is_ok=False)
+            else:
+                resp = cps_response(cmd_type, content)
+            self.write_mem(UART_RESP_ADDR, resp)
+            return
+        text = msg.split(b'\r')[0].decode('utf-8', 'replace')
+        self.commands.append(text)
+        name, _, arg = text[3:].partition('=')
+        handler = self.at_handlers.get(name)
+        lines = ['OnCmd_{}'.format(name),
+                 'ATE_SendCmdAck: cmd:{} isOk:0x{}'.format(name, 0 if handler is None else 1)]
+        if handler is not None:
+            lines.append(handler(arg))
+        lines.append('ATE pipe. used[HOST]')
+        resp = '\n'.join(lines).encode('utf-8') + b'\x00'
+        self.write_mem(ATE_CPS_RESP_ADDR - 4, len(resp).to_bytes(4, 'little') + resp)
+
+    def _at_freq_err(self, arg):
+        self.freq_err = -2500 + 10 * int(arg)
+        return '+DMOFREQERR:0'
+
+    def _at_chswitch(self, arg):
+        self._switched = (time.monotonic(), self.current_channel)
+        self.current_channel = int(arg) % len(self.channels)
+        return '+DMOCHSWITCH:0'
+
+    def _at_rssi(self, arg):
+        switched, previous = self._switched
+        channel = previous if time.monotonic() - switched < self.settle_time else self.current_channel
+        return '+DMORDRSSI:{}'.format(self.rssi[channel])
+
+    def _at_currch(self, arg):
+        content = self.channels[self.current_channel]
+        return '+DMOGETCURRCH:{},DIG,{},{},0,0,1,2,0,0,0'.format(
+            self.current_channel, int.from_bytes(content[4:8], 'little'),
+            int.from_bytes(content[8:12], 'little'))
+
+    def _cps_set_chan_info(self, args):
+        index = int.from_bytes(args[0:2], 'little')
+        if index > len(self.channels):
+            return None
+        if index == len(self.channels):
+            self.channels.append(bytes(args))
+            self.rssi.append(-120)
+        else:
+            self.channels[index] = bytes(args)
+        return b''
+
+    def _cps_set_chan_name(self, args):
+        if not args or args[0] >= len(self.channels):
+            return None
+        self.chan_names[args[0]] = bytes(args[1:]).rstrip(b'\x00').decode('utf-8', 'replace')
+        return b''
+
+    def _cps_table(self, table, args):
+        # entries past the end of a table do not exist
+        if args and args[0] < len(table):
+            return table[args[0]]
+        return None
+
+
+class LinkModel:
+    """ Impairments of the serial link
+
+    Adds latency and jitter to the replies of the radio and randomly
+    drops bytes or corrupts check bytes so retry paths can be measured.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, drop_rate=0.0, corrupt_rate=0.0, seed=None,
+                 max_baudrate=None):
+        """ Initialize the link model
+
+        @param latency: fixed reply delay in seconds
+        @param jitter: maximum extra random delay in seconds
+        @param drop_rate: probability that a reply loses a byte
+        @param corrupt_rate: probability that a reply has a bad check byte
+        @param seed: random seed for reproducible runs
+        @param max_baudrate: fastest baud rate the adapter carries,
+        every reply at a faster rate has a bad check byte
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.random = random.Random(seed)
+        self.max_baudrate = max_baudrate
+        self.dropped = 0
+        self.corrupted = 0
+
+    def delay(self):
+        """ return the delay for the next reply
+        """
+        if self.jitter:
+            return self.latency + self.random.uniform(0, self.jitter)
+        return self.latency
+
+    def impair(self, reply, baudrate=None):
+        """ Apply random faults to a reply
+
+        @param reply: escaped reply bytes
+        @param baudrate: baud rate of the port
+        @return: the possibly damaged reply
+        """
+        if not reply:
+            return reply
+        too_fast = (self.max_baudrate is not None
+                    and (not baudrate or baudrate > self.max_baudrate))
+        if too_fast or self.corrupt_rate and self.random.random() < self.corrupt_rate:
+            msg = bytearray(unescaper(reply))
+            msg[-1] ^= 0x01
+            reply = escaper(msg)
+            self.corrupted += 1
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            i = self.random.randrange(len(reply))
+            reply = reply[:i] + reply[i + 1:]
+            self.dropped += 1
+        return reply
+
+
+class SimulatedSerial:
+    """ Serial port stand-in connected to a SimulatedRadio
+
+    This class offers the parts of the pyserial interface SerialIO
+    uses.  Bytes travel at the configured baud rate in both directions
+    at once and replies become readable when their last byte would
+    have arrived, so throughput figures resemble a real link.
+    """
+    def __init__(self, radio=None, baudrate=921600, timeout=0.1, link=None):
+        """ Initialize the port
+
+        @param radio: the SimulatedRadio to talk to
+        @param baudrate: baud rate, None for an infinitely fast link
+        @param timeout: read timeout in seconds
+        @param link: LinkModel with the impairments of the link
+        """
+        self.radio = radio if radio is not None else SimulatedRadio()
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.link = link if link is not None else LinkModel()
+        self.is_open = True
+        self._rx = collections.deque()
+        self._tx_free = 0.0
+        self._rx_free = 0.0
+
+    def _wire_time(self, nbytes):
+        if not self.baudrate:
+            return 0.0
+        return nbytes * 10 / self.baudrate
+
+    def write(self, data):
+        """ Send bytes to the radio
+
+        @param data: bytes to send
+        @return: number of bytes written
+        """
+        now = time.monotonic()
+        self._tx_free = max(now, self._tx_free) + self._wire_time(len(data))
+        reply = self.link.impair(self.radio.receive(bytes(data), self._tx_free), self.baudrate)
+        if reply:
+            start = max(self._tx_free + self.link.delay(), self._rx_free)
+            self._rx_free = start + self._wire_time(len(reply))
+            self._rx.append([self._rx_free, reply])
+        return len(data)
+
+    def _arrived(self):
+        now = time.monotonic()
+        return sum(len(data) for due, data in self._rx if due <= now)
+
+    @property
+    def out_waiting(self):
+        """ return the number of bytes not yet sent
+        """
+        if not self.baudrate:
+            return 0
+        return max(0, int((self._tx_free - time.monotonic()) * self.baudrate / 10))
+
+    @property
+    def in_waiting(self):
+        """ return the number of bytes that have arrived
+        """
+        return self._arrived()
+
+    def read(self, size=1):
+        """ Read bytes, waiting up to the timeout for them to arrive
+
+        @param size: number of bytes wanted
+        @return: the bytes read
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        out = bytearray()
+        while len(out) < size:
+            if self._rx and self._rx[0][0] <= time.monotonic():
+                chunk = self._rx[0]
+                take = size - len(out)
+                out += chunk[1][:take]
+                chunk[1] = chunk[1][take:]
+                if not chunk[1]:
+                    self._rx.popleft()
+                continue
+            wake = self._rx[0][0] if self._rx else None
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    break
+                wake = deadline if wake is None else min(wake, deadline)
+            if wake is None:
+                # nothing will ever arrive without a timeout
+                break
+            time.sleep(max(0.0, wake - time.monotonic()))
+        return bytes(out)
+
+    def flush(self):
+        """ Nothing is buffered on the way out
+        """
+        pass
+
+    def reset_input_buffer(self):
+        """ Drop everything received
+        """
+        self._rx.clear()
+
+    def close(self):
+        """ Close the port
+        """
+        self.is_open = False
+
+
+def serve_pty(radio, link=None, ready=None):
+    """ Serve a SimulatedRadio on a pseudo terminal
+
+    The slave end of the pty behaves like the USB serial adapter of a
+    real radio so the command line tools can be pointed at it.  This
+    function does not return until the master end fails.
+
+    @param radio: the SimulatedRadio to serve
+    @param link: LinkModel with the impairments of the link
+    @param ready: callback receiving the path of the slave device
+    """
+    import tty
+    link = link if link is not None else LinkModel()
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    if ready is not None:
+        ready(os.ttyname(slave))
+    replies = queue.Queue()
+
+    def writer():
+        while True:
+            due, reply = replies.get()
+            time.sleep(max(0.0, due - time.monotonic()))
+            os.write(master, reply)
+    threading.Thread(target=writer, daemon=True).start()
+    try:
+        while True:
+            data = os.read(master, 4096)
+            radio.poll()
+            reply = link.impair(radio.receive(data))
+            if reply:
+                replies.put((time.monotonic() + link.delay(), reply))
+    finally:
+        os.close(master)
+        os.close(slave)
@@ -0,0 +1,142 @@
+import collections
+import math
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+def count_frames(msg):
+    """ Count the debug frames in a written message
+
+    @param msg: unescaped frames as written to the radio
+    @return: number of frames
+    """
+    count = 0
+    pos = 0
+    while pos + 4 <= len(msg) and msg[pos] == 0xad:
+        pos += int.from_bytes(msg[pos + 1:pos + 3], 'big') + 4
+        count += 1
+    return count
+
+
+class Histogram:
+    """ Count, sum, extremes and power of two buckets of a quantity
+
+    Bucket n counts the values from 2**(n-1) up to 2**n, which is
+    enough to tell a 1 ms round trip from a 10 ms one.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = collections.Counter()
+
+    def add(self, value):
+        """ Record one value
+
+        @param value: the value, zero or positive
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.buckets[math.frexp(value)[1] if value > 0 else None] += 1
+
+    def quantile(self, q):
+        """ return the upper bound of the bucket holding quantile q
+        """
+        if not self.count:
+            return None
+        seen = 0
+        for exponent in sorted(self.buckets, key=lambda e: -math.inf if e is None else e):
+            seen += self.buckets[exponent]
+            if seen >= q * self.count:
+                return 0.0 if exponent is None else min(math.ldexp(1, exponent), self.max)
+        return self.max
+
+    def as_dict(self):
+        """ return the summary as a dict suitable for JSON
+        """
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.min, 'p50': self.quantile(0.5), 'p90': self.quantile(0.9),
+                'max': self.max}
+
+
+class LinkStats:
+    """ Counters of the traffic on one connection
+
+    Bytes and frames are counted as they are written and read, the
+    decoder counts the frames it received, failed checks, flow control
+    acks and discarded bytes.  Round trip times are kept per request
+    kind and the number of attempts per single word read.
+    """
+    def __init__(self):
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.frames_out = 0
+        self.latency = collections.defaultdict(Histogram)
+        self.attempts = Histogram()
+
+    def sent(self, nbytes, frames):
+        """ Count a written message
+
+        @param nbytes: bytes written
+        @param frames: number of frames in the message
+        """
+        self.bytes_out += nbytes
+        self.frames_out += frames
+
+    def received(self, data):
+        """ Count bytes read
+
+        @param data: bytes read from the port
+        """
+        self.bytes_in += len(data)
+
+    def round_trip(self, kind, seconds):
+        """ Record the time from a request to its reply
+
+        @param kind: request kind such as 'read_word' or 'ate'
+        @param seconds: the round trip time
+        """
+        self.latency[kind].add(seconds)
+
+    def as_dict(self, decoder=None):
+        """ return the counters as a dict suitable for JSON
+
+        @param decoder: RdaStreamDecoder of the connection, whose
+        counters are added
+        """
+        stats = {'bytes_out': self.bytes_out, 'bytes_in': self.bytes_in,
+                 'frames_out': self.frames_out}
+        if decoder is not None:
+            stats.update(frames_in=decoder.frames, check_failures=decoder.check_failures,
+                         acks=decoder.acks, discarded=decoder.discarded)
+        stats['read_attempts'] = self.attempts.as_dict()
+        stats['latency'] = {kind: hist.as_dict() for kind, hist in sorted(self.latency.items())}
+        return stats
+
+
+def format_stats(stats):
+    """ Format the dict of LinkStats.as_dict for people
+
+    @param stats: the dict
+    @return: the text, one line per counter
+    """
+    lines = []
+    for name, value in stats.items():
+        if name == 'latency':
+            for kind, hist in value.items():
+                lines.append('latency {:12s} n {:6d} mean {:8.2f} ms p90 {:8.2f} ms max {:8.2f} ms'.format(
+                    kind, hist['count'], 1000 * hist['mean'], 1000 * hist['p90'], 1000 * hist['max']))
+        elif isinstance(value, dict):
+            if value['count']:
+                lines.append('{:20s} n {:6d} mean {:.2f} max {}'.format(
+                    name, value['count'], value['mean'], value['max']))
+        else:
+            lines.append('{:20s} {}'.format(name, value))
+    return '\n'.join(lines)
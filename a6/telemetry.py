@@ -0,0 +1,183 @@
+import array
+import collections
+import math
+import re
+import time
+from .serialio import COMMAND_TIMEOUT
+from .serialio import dmo_connect
+from .serialio import get_uart
+from .serialio import read_mem_range
+from .serialio import send_ate_command
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+# name: command, fields taken from the numbers of its reply in order
+QUERIES = collections.OrderedDict([
+    ('rssi', ('AT+DMORDRSSI', ('rssi',))),
+    # the meaning of the two numbers is not documented
+    ('ber', ('AT+DMOGETRXBER', ('ber0', 'ber1'))),
+    ('channel', ('AT+DMOGETCURRCH', ('channel',))),
+])
+RING_SIZE = 4096
+# bytes of the reply read along with its length, the firmware logs
+# a few lines around the answer
+REPLY_GUESS = 124
+QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+NUMBER = re.compile(r'-?\d+')
+
+
+def read_ate_reply(uart, guess=REPLY_GUESS):
+    """ Read the response of an ATE command in one pass
+
+    atecps_resp_read reads the length and then the text.  Here the
+    length word and the first guess bytes are read together, so a
+    short reply costs a single pipelined read.
+
+    @param uart: the SerialIO
+    @param guess: bytes of text read along with the length, rounded
+    up to whole words
+    @return: response from the ATE command
+    """
+    addr = uart.ate_cps_resp_length_addr
+    # whole words only, the reads fetch words
+    guess = (guess + 3) // 4 * 4
+    data = read_mem_range(addr, addr + 4 + guess, uart)
+    length = int.from_bytes(data[0:4], 'little')
+    if length > guess:
+        data += read_mem_range(addr + 4 + guess, addr + 4 + (length + 3) // 4 * 4, uart)
+    return data[4:4 + length]
+
+def parse_reply(reply, command, fields):
+    """ Take the numbers out of the answer line of a reply
+
+    @param reply: response bytes holding a line such as +DMORDRSSI:-87
+    @param command: the AT command that was sent
+    @param fields: names of the numbers in order
+    @return: list with a float per field, nan where a number is missing
+    """
+    text = reply.decode('utf-8', 'replace')
+    found = re.search(r'\+{}:([^\n\x00]*)'.format(command[3:]), text)
+    values = [float(n) for n in NUMBER.findall(found.group(1))] if found else []
+    values += [math.nan] * len(fields)
+    return values[:len(fields)]
+
+
+class SampleRing:
+    """ Fixed size ring of numeric samples
+
+    Samples are rows of floats with the time first, kept in one
+    preallocated array so a long run uses constant memory.  Once the
+    ring is full the oldest sample is overwritten.
+    """
+    def __init__(self, fields, size=RING_SIZE):
+        """ Initialize the ring
+
+        @param fields: names of the values of a sample after the time
+        @param size: number of samples kept
+        """
+        self.fields = ('time',) + tuple(fields)
+        self.size = size
+        self.count = 0
+        self.data = array.array('d', [math.nan]) * (size * len(self.fields))
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, values):
+        """ Store a sample
+
+        @param values: time and values in the order of fields
+        """
+        width = len(self.fields)
+        row = self.count % self.size * width
+        self.data[row:row + width] = array.array('d', values)
+        self.count += 1
+
+    def column(self, name):
+        """ return the values of one field from the oldest sample on
+        """
+        width = len(self.fields)
+        index = self.fields.index(name)
+        first = self.count - len(self)
+        return [self.data[(row % self.size) * width + index]
+                for row in range(first, self.count)]
+
+    def summary(self):
+        """ Aggregate the samples held
+
+        @return: dict with the number of samples and the min, max, mean
+        and percentiles of each field, missing values left out
+        """
+        stats = {'samples': len(self)}
+        for name in self.fields[1:]:
+            values = sorted(v for v in self.column(name) if not math.isnan(v))
+            if not values:
+                stats[name] = None
+                continue
+            stats[name] = {'min': values[0], 'max': values[-1],
+                           'mean': sum(values) / len(values)}
+            for key, q in QUANTILES:
+                stats[name][key] = values[min(len(values) - 1, int(q * len(values)))]
+        return stats
+
+
+class Telemetry:
+    """ Receive conditions polled from a radio
+
+    Every sample runs the chosen queries back to back on the ATE
+    mailbox and reads each reply with read_ate_reply.  The session is
+    opened once, so a sample costs one command round trip per query.
+    """
+    def __init__(self, queries=('rssi',), size=RING_SIZE, timeout=COMMAND_TIMEOUT, uart=None):
+        """ Initialize the telemetry
+
+        @param queries: names from QUERIES to poll
+        @param size: samples kept in the ring
+        @param timeout: longest time to wait for each reply in s
+        @param uart: connection to use, the last one opened by default
+        """
+        self.uart = get_uart(uart)
+        self.queries = [QUERIES[name] for name in queries]
+        self.timeout = timeout
+        fields = [field for _, fields in self.queries for field in fields]
+        self.ring = SampleRing(fields, size)
+
+    def sample(self):
+        """ Poll every query once and store the sample
+
+        @return: dict with the time and the value of each field, None
+        for values the radio did not report
+        """
+        dmo_connect(self.timeout, uart=self.uart)
+        values = [time.time()]
+        for command, fields in self.queries:
+            if send_ate_command(command, self.timeout, self.uart):
+                values += parse_reply(read_ate_reply(self.uart), command, fields)
+            else:
+                values += [math.nan] * len(fields)
+        self.ring.append(values)
+        return {name: None if math.isnan(value) else value
+                for name, value in zip(self.ring.fields, values)}
+
+    def run(self, interval=0.0, count=None, duration=None):
+        """ Sample repeatedly
+
+        @param interval: shortest time between samples in s, 0 for as
+        fast as the link allows
+        @param count: number of samples, None for no limit
+        @param duration: time to run in s, None for no limit
+        @return: generator of the sample dicts
+        """
+        start = time.monotonic()
+        taken = 0
+        while count is None or taken < count:
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                return
+            yield self.sample()
+            taken += 1
+            if interval:
+                wait = start + taken * interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+""" Session daemon for AUCTUS A6 based radios
+
+Keep the serial port of a radio open with the UART set up and the
+firmware pointers known, and serve requests on a Unix socket.  The
+other tools use the daemon when one is serving their port, which
+saves the setup on every run and lets several tools share one radio.
+
+"""
+
+from a6 import RadioDaemon
+from a6.daemon import socket_path
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.stats import format_stats
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 session daemon')
+    add_link_arguments(parser)
+    parser.add_argument('-s', '--socket', type=str, default=None,
+                        help='socket path, default a6-<port>.sock in the temp directory')
+    args = parser.parse_args()
+
+    uart = open_link(args, pointers=True)
+    path = args.socket or socket_path(args.port)
+    with RadioDaemon(uart, path) as daemon:
+        eprint("serving {} on {}".format(args.port, path))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+""" Simulated AUCTUS A6 radio
+
+Serve a simulated A6 debug interface on a pseudo terminal so the other
+tools can be run and benchmarked without a radio.  Point them at the
+printed device with -p.
+
+"""
+
+import sys
+from a6 import SimulatedRadio, LinkModel
+from a6.simulator import serve_pty
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 radio simulator')
+    parser.add_argument('--latency', default=0.0, type=float,
+                        help='reply latency in seconds')
+    parser.add_argument('--jitter', default=0.0, type=float,
+                        help='maximum random extra latency in seconds')
+    parser.add_argument('--drop', default=0.0, type=float,
+                        help='probability that a reply loses a byte')
+    parser.add_argument('--corrupt', default=0.0, type=float,
+                        help='probability that a reply has a bad check byte')
+    parser.add_argument('--process-delay', default=0.002, type=float,
+                        help='time the firmware takes to run an ATE/CPS command')
+    parser.add_argument('--seed', default=None, type=int,
+                        help='random seed for reproducible faults')
+    parser.add_argument('--load', nargs=2, action='append', default=[],
+                        metavar=('ADDR', 'FILE'),
+                        help='preload memory at ADDR with the contents of FILE')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+    args = parser.parse_args()
+
+    radio = SimulatedRadio(process_delay=args.process_delay)
+    for addr, path in args.load:
+        with open(path, 'rb') as f:
+            radio.write_mem(int(addr, 0), f.read())
+    link = LinkModel(args.latency, args.jitter, args.drop, args.corrupt, args.seed)
+    try:
+        serve_pty(radio, link, ready=lambda path: print(path, flush=True))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -5,10 +5,18 @@ Allow for communication with AUCTUS A6 radios to their serial
 interface through the debug interface.  Commands can either be "AT"
 commands or "CPS" commands.  Both styles will work.
 
+With --script the commands are read one per line from a file or stdin
+and run in one session, printing one JSON line per command.
+
 """
 
-import time
-from a6 import send_ate_command, send_cps_command, atecps_resp_read, SerialIO
+import json
+import sys
+from a6 import parse_script, run_script
+from a6.script import run_command
+from a6.cli import add_link_arguments, connect_link
+from a6.eprint import eprint
+from a6.stats import format_stats
 
 __author__ = "jhart99"
 __license__ = "MIT"
@@ -17,26 +25,42 @@ __license__ = "MIT"
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Auctus A6 ATECPS commander')
-    parser.add_argument('-p', '--port', default='/dev/ttyUSB0',
-                        type=str, help='serial port')
-    parser.add_argument('-b','--baudrate', default=921600,
-                        type=int, help='baud rate')
-    parser.add_argument('-v','--verbosity', default=0, action='count',
-                        help='print sent and received frames to stderr for debugging')
-    parser.add_argument('-V', '--version', action='version',
-                        version='%(prog)s 0.0.1',
-                        help='display version information and exit')
-    parser.add_argument('command')
+    add_link_arguments(parser, daemon=True)
+    parser.add_argument('-t', '--timeout', default=1.0, type=float,
+                        help='longest time to wait for the radio to reply in seconds')
+    parser.add_argument('-s', '--script', type=str,
+                        help='file with one command per line, - for stdin')
+    parser.add_argument('command', nargs='?')
     args = parser.parse_args()
+    if (args.command is None) == (args.script is None):
+        parser.error('give either a command or --script')
 
-    uart = SerialIO(args.port, args.baudrate, args.verbosity)
+    client, uart = connect_link(args, pointers=True)
 
-    if args.command[0:3] == 'AT+':
-        send_ate_command(args.command)
+    if args.script is not None:
+        script = sys.stdin if args.script == '-' else open(args.script)
+        with script:
+            commands = parse_script(script)
+        if client is not None:
+            results = client.run_script(commands, args.timeout)
+        else:
+            results = run_script(commands, args.timeout, uart)
+        for result in results:
+            print(json.dumps(result), flush=True)
     else:
-        send_cps_command(bytes.fromhex(args.command))
-    time.sleep(0.1)
-    data = atecps_resp_read()
-    data = data.split(b'\x00')
-    for line in data:
-        print(line.decode('utf-8'))
+        if client is not None:
+            result = client.run_command(args.command, args.timeout)
+        else:
+            result = run_command(args.command, args.timeout, uart)
+        if not result['ok']:
+            eprint('radio did not answer {}'.format(args.command))
+        elif args.command[0:3] == 'AT+':
+            for line in result['response']:
+                print(line)
+        else:
+            print(result['response'])
+
+    if args.stats:
+        eprint(format_stats(client.link_stats() if client is not None else uart.link_stats()))
+    if uart is not None:
+        uart.close()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+""" Frame codec microbenchmarks
+
+Measures how many frames per second the escaper, unescaper and
+read_word can process, next to the original implementations so the
+speedup can be seen on any machine.
+
+    $ python3 -m bench.codec
+
+"""
+
+import random
+import timeit
+from a6 import escaper, unescaper, read_word, rda_debug_frame, RdaStreamDecoder
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+def legacy_escaper(msg):
+    """ the original per byte escaper kept for comparison
+    """
+    return bytes(sum([[0x5c, 0xFF ^ x ] if x in [0x11, 0x13, 0x5c] else [x] for x in msg], []))
+
+def legacy_unescaper(msg):
+    """ the original per byte unescaper kept for comparison
+    """
+    out = []
+    escape = False
+    for x in msg:
+        if x == 0x5c:
+            escape = True
+            continue
+        if escape:
+            x = 0x5c ^ x ^ 0xa3
+            escape = False
+        out.append(x)
+    return bytes(out)
+
+def legacy_read_word(addr, seq):
+    """ the original read_word building the whole frame every time
+    """
+    msg = addr.to_bytes(4, 'little') + seq.to_bytes(1, 'big')
+    return rda_debug_frame(bytes([0xff]), bytes([0x02]), msg)
+
+def sample_frames(count=256, size=64, seed=0):
+    """ Make a reproducible set of raw frames to encode
+
+    Roughly one byte in twenty is an escaped character which is a bit
+    worse than real memory dumps.
+
+    @param count: number of frames
+    @param size: payload size of each frame
+    @param seed: random seed
+    @return: list of frames
+    """
+    rng = random.Random(seed)
+    special = [0x11, 0x13, 0x5c]
+    return [bytes(rng.choice(special) if rng.random() < 0.05 else rng.randrange(256)
+                  for _ in range(size)) for _ in range(count)]
+
+def frames_per_second(func, frames, repeat=5):
+    """ Time func over every frame and return the best rate
+
+    @param func: function taking one frame
+    @param frames: frames to process
+    @param repeat: number of timing runs
+    @return: frames per second
+    """
+    def run():
+        for frame in frames:
+            func(frame)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return len(frames) / best
+
+def run(size=64, count=256):
+    """ Run the codec benchmarks
+
+    @param size: payload size of each frame
+    @param count: number of frames per run
+    @return: dict of benchmark name to frames per second
+    """
+    frames = sample_frames(count, size)
+    escaped = [escaper(frame) for frame in frames]
+    words = [read_word(0x82000000 + 4 * i, i % 255 + 1) for i in range(count)]
+    stream = b''.join(words)
+    def decode_stream(chunk):
+        RdaStreamDecoder().feed(chunk)
+    return {
+        'escaper_legacy': frames_per_second(legacy_escaper, frames),
+        'escaper': frames_per_second(escaper, frames),
+        'unescaper_legacy': frames_per_second(legacy_unescaper, escaped),
+        'unescaper': frames_per_second(unescaper, escaped),
+        'read_word_legacy': frames_per_second(
+            lambda i: legacy_read_word(0x82000000 + 4 * i, i % 255 + 1), range(count)),
+        'read_word': frames_per_second(lambda i: read_word(0x82000000 + 4 * i, i % 255 + 1),
+                                       range(count)),
+        'stream_decoder': frames_per_second(decode_stream, [stream]) * count,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 codec benchmark')
+    parser.add_argument('-s', '--size', default=64, type=int,
+                        help='payload bytes per frame')
+    parser.add_argument('-n', '--count', default=256, type=int,
+                        help='frames per timing run')
+    args = parser.parse_args()
+
+    for name, rate in run(args.size, args.count).items():
+        print('{:20s} {:12.0f} frames/s'.format(name, rate))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+""" Transport benchmarks against the simulated radio
+
+Measures memory read and write throughput, ATE/CPS command latency and the
+number of retries needed when the link drops or corrupts replies.
+All of it runs against a6.SimulatedSerial at a realistic baud rate so
+the numbers are reproducible without a radio.
+
+    $ python3 -m bench.transport
+
+"""
+
+import statistics
+import time
+import a6
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+DUMP_BEGIN = 0x82000000
+
+
+def open_simulated(radio=None, link=None, baudrate=921600):
+    """ Open a SerialIO connected to a simulated radio
+
+    @param radio: SimulatedRadio, a new one by default
+    @param link: LinkModel with link impairments
+    @param baudrate: simulated baud rate
+    @return: the SerialIO
+    """
+    return a6.SerialIO(a6.SimulatedSerial(radio, baudrate=baudrate, timeout=0.02, link=link))
+
+def filled_radio(size, seed=0):
+    """ Make a radio with size bytes of known data at DUMP_BEGIN
+
+    @param size: number of bytes
+    @param seed: value mixed into the data
+    @return: the radio and the data
+    """
+    data = bytes((i * 7 + seed) & 0xff for i in range(size))
+    radio = a6.SimulatedRadio()
+    radio.write_mem(DUMP_BEGIN, data)
+    return radio, data
+
+def timed(func, repeat):
+    """ Time repeated calls of func
+
+    @param func: function without arguments
+    @param repeat: number of calls
+    @return: list of durations in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+def bench_read_mem_range(size=0x10000, baudrate=921600):
+    """ Measure read_mem_range throughput
+
+    @param size: bytes to dump
+    @param baudrate: simulated baud rate
+    @return: dict of metrics
+    """
+    radio, data = filled_radio(size)
+    uart = open_simulated(radio, baudrate=baudrate)
+    # word reads only, block reads are measured on their own
+    uart.block_read = False
+    start = time.perf_counter()
+    dump = a6.read_mem_range(DUMP_BEGIN, DUMP_BEGIN + size, uart)
+    elapsed = time.perf_counter() - start
+    if dump != data:
+        raise RuntimeError('read_mem_range returned wrong data')
+    # a read_word request and reply take 11 and 10 bytes on the wire
+    line_rate = baudrate / 10 / 11 if baudrate else 0
+    return {
+        'read_mem_range_words_per_s': size / 4 / elapsed,
+        'read_mem_range_seconds': elapsed,
+        'read_mem_range_line_rate_fraction': size / 4 / elapsed / line_rate if line_rate else 0,
+    }
+
+def bench_read_mem_blocks(size=0x10000, baudrate=921600):
+    """ Measure read_mem_range throughput with block reads
+
+    @param size: bytes to dump
+    @param baudrate: simulated baud rate
+    @return: dict of metrics
+    """
+    radio, data = filled_radio(size)
+    uart = open_simulated(radio, baudrate=baudrate)
+    start = time.perf_counter()
+    dump = a6.read_mem_range(DUMP_BEGIN, DUMP_BEGIN + size, uart)
+    elapsed = time.perf_counter() - start
+    if dump != data or not uart.block_read:
+        raise RuntimeError('read_mem_range did not use block reads')
+    return {
+        'read_mem_blocks_words_per_s': size / 4 / elapsed,
+        'read_mem_blocks_seconds': elapsed,
+    }
+
+def bench_write_mem_range(size=0x10000, baudrate=921600):
+    """ Measure write_mem_range throughput including the readback
+
+    @param size: bytes to write
+    @param baudrate: simulated baud rate
+    @return: dict of metrics
+    """
+    radio = a6.SimulatedRadio()
+    data = bytes((i * 5 + 3) & 0xff for i in range(size))
+    uart = open_simulated(radio, baudrate=baudrate)
+    start = time.perf_counter()
+    a6.write_mem_range(DUMP_BEGIN, data, verify=False, uart=uart)
+    while uart.out_waiting:
+        time.sleep(0.001)
+    written = time.perf_counter() - start
+    a6.write_mem_range(DUMP_BEGIN, data, uart=uart)
+    verified = time.perf_counter() - start - written
+    if radio.read_mem(DUMP_BEGIN, size) != data:
+        raise RuntimeError('write_mem_range wrote wrong data')
+    return {
+        'write_mem_range_bytes_per_s': size / written,
+        'write_mem_range_verified_bytes_per_s': size / verified,
+    }
+
+def bench_commands(repeat=5, baudrate=921600):
+    """ Measure end to end latency of ATE and CPS commands
+
+    @param repeat: number of commands of each kind
+    @param baudrate: simulated baud rate
+    @return: dict of metrics
+    """
+    uart = open_simulated(baudrate=baudrate)
+    a6.send_uart_setup(uart)
+    freq_err = timed(lambda: a6.get_freq_err(uart), repeat)
+    chan_info = timed(lambda: a6.get_chan_info(1, uart), repeat)
+    return {
+        'get_freq_err_seconds': statistics.median(freq_err),
+        'get_chan_info_seconds': statistics.median(chan_info),
+    }
+
+def bench_retries(size=0x4000, rate=0.02, baudrate=921600, seed=1):
+    """ Count the retries needed to dump memory over a faulty link
+
+    @param size: bytes to dump
+    @param rate: probability of both dropped bytes and bad checks
+    @param baudrate: simulated baud rate
+    @param seed: random seed for the faults
+    @return: dict of metrics
+    """
+    radio, data = filled_radio(size)
+    link = a6.LinkModel(drop_rate=rate, corrupt_rate=rate, seed=seed)
+    uart = open_simulated(radio, link, baudrate)
+    uart.block_read = False
+    start = time.perf_counter()
+    dump = a6.read_mem_range(DUMP_BEGIN, DUMP_BEGIN + size, uart)
+    elapsed = time.perf_counter() - start
+    if dump != data:
+        raise RuntimeError('read_mem_range returned wrong data over a faulty link')
+    return {
+        'faulty_read_retries': radio.frames - size // 4,
+        'faulty_read_faults': link.dropped + link.corrupted,
+        'faulty_read_check_failures': uart.decoder.check_failures,
+        'faulty_read_words_per_s': size / 4 / elapsed,
+    }
+
+def run(size=0x10000, repeat=5, baudrate=921600):
+    """ Run all transport benchmarks
+
+    @param size: bytes to dump in the throughput benchmark
+    @param repeat: number of commands in the latency benchmarks
+    @param baudrate: simulated baud rate
+    @return: dict of metric name to value
+    """
+    results = {}
+    results.update(bench_read_mem_range(size, baudrate))
+    results.update(bench_read_mem_blocks(size, baudrate))
+    results.update(bench_write_mem_range(size, baudrate))
+    results.update(bench_commands(repeat, baudrate))
+    results.update(bench_retries(baudrate=baudrate))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 transport benchmark')
+    parser.add_argument('-s', '--size', default=0x10000, type=lambda x: int(x, 0),
+                        help='bytes to dump, default 0x10000')
+    parser.add_argument('-n', '--repeat', default=5, type=int,
+                        help='commands per latency measurement')
+    parser.add_argument('-b', '--baudrate', default=921600, type=int,
+                        help='simulated baud rate')
+    args = parser.parse_args()
+
+    for name, value in run(args.size, args.repeat, args.baudrate).items():
+        print('{:36s} {:14.4f}'.format(name, value))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" Benchmark runner for the A6 transport stack
+
+Runs the codec and transport benchmarks against the simulated radio,
+prints the results and stores them as JSON.  Given the JSON of an
+earlier run it reports every metric that got worse by more than the
+tolerance and exits non-zero, so releases can be checked for
+regressions.
+
+"""
+
+import datetime
+import json
+import platform
+import subprocess
+import sys
+from bench import codec, transport
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+# metrics where a smaller value is better, everything else is a rate
+LOWER_IS_BETTER = ('_seconds', '_retries', '_faults', '_check_failures')
+
+
+def lower_is_better(name):
+    """ return True if a smaller value of the metric is an improvement
+    """
+    return name.endswith(LOWER_IS_BETTER)
+
+def git_revision():
+    """ return the current git revision or None outside a checkout
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """ Find the metrics that regressed against a baseline
+
+    @param results: dict of metric name to value
+    @param baseline: dict of metric name to value from an earlier run
+    @param tolerance: allowed relative change, 0.1 for 10%
+    @return: list of (name, baseline value, value)
+    """
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (value - old) / old
+        if lower_is_better(name):
+            change = -change
+        if change < -tolerance:
+            regressions.append((name, old, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 benchmark runner')
+    parser.add_argument('-s', '--size', default=0x10000, type=lambda x: int(x, 0),
+                        help='bytes to dump, default 0x10000')
+    parser.add_argument('-n', '--repeat', default=5, type=int,
+                        help='commands per latency measurement')
+    parser.add_argument('-b', '--baudrate', default=921600, type=int,
+                        help='simulated baud rate')
+    parser.add_argument('-o', '--output', default=None, type=str,
+                        help='write the results as JSON to this file')
+    parser.add_argument('-c', '--compare', default=None, type=str,
+                        help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('-t', '--tolerance', default=0.1, type=float,
+                        help='allowed relative regression, default 0.1')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+    args = parser.parse_args()
+
+    results = {}
+    for name, rate in codec.run().items():
+        results['codec_{}_frames_per_s'.format(name)] = rate
+    results.update(transport.run(args.size, args.repeat, args.baudrate))
+
+    for name, value in results.items():
+        print('{:40s} {:14.4f}'.format(name, value))
+
+    if args.output:
+        report = {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'parameters': {'size': args.size, 'repeat': args.repeat,
+                           'baudrate': args.baudrate},
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new in regressions:
+            print('regression {}: {:.4f} -> {:.4f}'.format(name, old, new), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -7,7 +7,10 @@ commands or "CPS" commands.  Both styles will work.
 
 """
 
-from a6 import get_chan_info, SerialIO
+from a6 import get_chan_info
+from a6.cli import add_link_arguments, connect_link
+from a6.eprint import eprint
+from a6.stats import format_stats
 
 __author__ = "jhart99"
 __license__ = "MIT"
@@ -16,18 +19,17 @@ __license__ = "MIT"
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Auctus A6 ATECPS commander')
-    parser.add_argument('-p', '--port', default='/dev/ttyUSB0',
-                        type=str, help='serial port')
-    parser.add_argument('-b','--baudrate', default=921600,
-                        type=int, help='baud rate')
-    parser.add_argument('-v','--verbosity', default=0, action='count',
-                        help='print sent and received frames to stderr for debugging')
-    parser.add_argument('-V', '--version', action='version',
-                        version='%(prog)s 0.0.1',
-                        help='display version information and exit')
+    add_link_arguments(parser, daemon=True)
     parser.add_argument('channel', type=int, help='channel number')
     args = parser.parse_args()
 
+    client, uart = connect_link(args, pointers=True)
+    if client is not None:
+        print(client.get_chan_info(args.channel))
+    else:
+        print(get_chan_info(args.channel, uart))
 
-    uart = SerialIO(args.port, args.baudrate, args.verbosity)
-    get_chan_info(args.channel)
+    if args.stats:
+        eprint(format_stats(client.link_stats() if client is not None else uart.link_stats()))
+    if uart is not None:
+        uart.close()
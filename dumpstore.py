@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""  Dump store tool for AUCTUS A6 based radios
+
+Inspect and combine dump stores, the address-tagged containers written
+by radiodump-ng --store.  Raw dumps from earlier runs can be imported
+with the address they were read from.
+
+"""
+
+import json
+import sys
+from a6.dumpstore import DumpStore, merge_stores
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 dump store')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+    parser.add_argument('store', help='dump store file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list the segments as JSON lines')
+    commands.add_parser('verify', help='check the hash of every segment')
+    read = commands.add_parser('read', help='write a range to stdout')
+    read.add_argument('begin', type=lambda x: int(x,0), help='begin address')
+    read.add_argument('end', type=lambda x: int(x,0), help='end address')
+    read.add_argument('-x', '--hex', action='store_true', help='write hex instead of raw bytes')
+    add = commands.add_parser('add', help='import a raw dump')
+    add.add_argument('input', help='raw dump file')
+    add.add_argument('begin', type=lambda x: int(x,0), help='address the dump starts at')
+    add.add_argument('--label', default='', help='name of the range like ram or rom')
+    merge = commands.add_parser('merge', help='merge stores into this one, keeping its segments, '
+                           'later stores win where they overlap')
+    merge.add_argument('sources', nargs='+', help='dump stores to merge')
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        merge_stores(args.store, args.sources).close()
+        sys.exit(0)
+    with DumpStore(args.store) as store:
+        if args.command == 'list':
+            for segment in store.segments:
+                print(json.dumps(segment.as_dict()))
+        elif args.command == 'verify':
+            bad = store.verify()
+            for segment in bad:
+                print(json.dumps(segment.as_dict()))
+            sys.exit(1 if bad else 0)
+        elif args.command == 'read':
+            data = store.read(args.begin, args.end - args.begin)
+            if args.hex:
+                print(data.hex())
+            else:
+                sys.stdout.buffer.write(data)
+        elif args.command == 'add':
+            with open(args.input, 'rb') as f:
+                print(json.dumps(store.add(args.begin, f.read(), args.label).as_dict()))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""  Codeplug export for AUCTUS based radios
+
+Read every channel, scan list, group call and key function from an
+AUCTUS A6 radio in one session and write them as JSON lines or CSV.
+
+"""
+
+import sys
+from a6 import export_codeplug
+from a6.codeplug import SECTIONS
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.stats import format_stats
+
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 codeplug export')
+    parser.add_argument('-o', '--output', type=str,
+                        help='output file, default stdout')
+    parser.add_argument('-f', '--format', default='jsonl', choices=['jsonl', 'csv'],
+                        help='output format default jsonl')
+    parser.add_argument('-s', '--section', action='append', choices=list(SECTIONS),
+                        help='section to export, may be repeated, default all')
+    add_link_arguments(parser)
+    args = parser.parse_args()
+
+    uart = open_link(args, pointers=True)
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    with out:
+        count = export_codeplug(out, args.format, args.section, uart=uart)
+    if args.verbosity > 0:
+        eprint("exported {} records".format(count))
+
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+""" Fleet runner for AUCTUS A6 based radios
+
+Run the same job on many radios at once, each on its own serial port.
+Jobs are memory dumps, frequency offset fixes, AT command scripts and
+channel uploads.
+One JSON line with the result is printed per radio at the end.
+
+"""
+
+import json
+import sys
+from a6.baudrate import baudrate_arg
+from a6.codeplug import load_codeplug
+from a6.fleet import run_fleet
+from a6.eprint import eprint
+from a6.pointercache import default_path
+from a6.stats import format_stats
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 fleet runner')
+    parser.add_argument('-p', '--port', action='append', required=True,
+                        type=str, help='serial port, repeat for every radio')
+    parser.add_argument('-b','--baudrate', default=921600,
+                        type=baudrate_arg,
+                        help='baud rate, or auto for the fastest one that works')
+    parser.add_argument('-v','--verbosity', default=0, action='count',
+                        help='print sent and received frames to stderr for debugging')
+    parser.add_argument('-j', '--workers', default=None, type=int,
+                        help='radios worked on at once, all by default')
+    parser.add_argument('--stats', action='store_true',
+                        help='print the link statistics of every radio to stderr')
+    parser.add_argument('--processes', action='store_true',
+                        help='use worker processes instead of threads')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+    jobs = parser.add_subparsers(dest='job', required=True)
+    dump = jobs.add_parser('dump', help='dump a memory range from every radio')
+    dump.add_argument('--begin', type=lambda x: int(x,0), default=0x82000000,
+                      help='begin address default 0x82000000')
+    dump.add_argument('--end', type=lambda x: int(x,0), default=0x8200ff00,
+                      help='end address default 0x8200ff00')
+    dump.add_argument('-o', '--output', default='dump-{name}.bin',
+                      help='output file, {name} is replaced by the port name')
+    freqfix = jobs.add_parser('freqfix', help='fix the frequency offset of every radio')
+    freqfix.add_argument('target', type=int,
+                         help='the programmed frequency in the radios in Hz')
+    freqfix.add_argument('current', type=int, nargs='+',
+                         help='the measured frequency of each radio in Hz in port order')
+    at = jobs.add_parser('at', help='run AT or CPS commands on every radio')
+    at.add_argument('-t', '--timeout', default=1.0, type=float,
+                    help='longest time to wait for each reply in seconds')
+    at.add_argument('commands', nargs='+', help='commands to run in order')
+    upload = jobs.add_parser('upload', help='write changed channels to every radio')
+    upload.add_argument('input', help='codeplug in JSON lines as written by exportcodeplug')
+    upload.add_argument('-c', '--checksums', default=None,
+                        help='file caching the channel checksums of each radio, '
+                        '{name} is replaced by the port name')
+    upload.add_argument('--no-verify', action='store_true',
+                        help='do not read the written channels back')
+    args = parser.parse_args()
+
+    common = {'baudrate': args.baudrate, 'verbosity': args.verbosity,
+              'pointers': default_path()}
+    per_port = None
+    if args.job == 'dump':
+        common.update(begin=args.begin, end=args.end, output=args.output)
+    elif args.job == 'freqfix':
+        if len(args.current) != len(args.port):
+            parser.error('give one measured frequency per port')
+        common.update(target=args.target)
+        per_port = {port: {'current': current} for port, current in zip(args.port, args.current)}
+    elif args.job == 'upload':
+        with open(args.input) as f:
+            common.update(target=load_codeplug(f))
+        common.update(checksums=args.checksums, verify=not args.no_verify)
+    else:
+        common.update(commands=args.commands, timeout=args.timeout)
+
+    results = run_fleet(args.port, args.job, args.workers, args.processes, per_port, **common)
+    for result in results:
+        print(json.dumps(result.as_dict()))
+        if args.stats and result.stats is not None:
+            eprint(result.port)
+            eprint(format_stats(result.stats))
+    if not all(result.ok for result in results):
+        sys.exit(1)
@@ -12,7 +12,10 @@ outside what my poor MMDVM board could tolerate.
 
 """
 
-from a6 import SerialIO, get_freq_err, set_freq_err
+from a6 import get_freq_err, set_freq_err
+from a6.cli import add_link_arguments, connect_link
+from a6.eprint import eprint
+from a6.stats import format_stats
 
 __author__ = "jhart99"
 __license__ = "MIT"
@@ -21,26 +24,29 @@ __license__ = "MIT"
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Auctus A6 Frequency Error Fixer')
-    parser.add_argument('-p', '--port', default='/dev/ttyUSB0',
-                        type=str, help='serial port')
-    parser.add_argument('-b','--baudrate', default=921600,
-                        type=int, help='baud rate')
-    parser.add_argument('-v','--verbosity', default=0, action='count',
-                        help='print sent and received frames to stderr for debugging')
-    parser.add_argument('-V', '--version', action='version',
-                        version='%(prog)s 0.0.1',
-                        help='display version information and exit')
+    add_link_arguments(parser, daemon=True)
     parser.add_argument('current', type=int,
                         help='the measured frequency the radio is currently transmitting in Hz')
     parser.add_argument('target', type=int,
                         help='the programmed frequency in the radio in Hz')
     args = parser.parse_args()
 
-    uart = SerialIO(args.port, args.baudrate, args.verbosity)
+    client, uart = connect_link(args, pointers=True)
+    if client is not None:
+        get_err, set_err = client.get_freq_err, client.set_freq_err
+    else:
+        get_err = lambda: get_freq_err(uart)
+        set_err = lambda freqerr: set_freq_err(freqerr, uart)
 
     delta = args.target - args.current
-    curerr = get_freq_err()
+    curerr = get_err()
     target = curerr + delta
     if abs(target) > 2500:
         raise ValueError("Desired offset exceeds maximum of 2500 Hz")
-    set_freq_err(int((target + 2500)/10))
\ No newline at end of file
+    for line in set_err(int((target + 2500)/10)):
+        print(line)
+
+    if args.stats:
+        eprint(format_stats(client.link_stats() if client is not None else uart.link_stats()))
+    if uart is not None:
+        uart.close()
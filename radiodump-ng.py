@@ -9,7 +9,11 @@ commands or "CPS" commands.  Both styles will work.
 
 import serial
 import sys
-from a6 import read_mem_range, SerialIO
+from a6 import dump_to_file, read_mem_range
+from a6.cli import add_link_arguments, connect_link
+from a6.dumpstore import DumpStore
+from a6.eprint import eprint
+from a6.stats import format_stats
 
 
 __author__ = "jhart99"
@@ -25,17 +29,40 @@ if __name__ == "__main__":
     parser.add_argument('--end', type=lambda x: int(x,0),
                         help='end address default 0x8200ff00',
                         default=0x8200ff00)
-    parser.add_argument('-p', '--port', default='/dev/ttyUSB0',
-                        type=str, help='serial port')
-    parser.add_argument('-b','--baudrate', default=921600,
-                        type=int, help='baud rate')
-    parser.add_argument('-v','--verbosity', default=0, action='count',
-                        help='print sent and received frames to stderr for debugging')
-    parser.add_argument('-V', '--version', action='version',
-                        version='%(prog)s 0.0.1',
-                        help='display version information and exit')
+    parser.add_argument('-o', '--output', type=str,
+                        help='write to a file instead of stdout, an interrupted '
+                        'dump to the same file resumes where it stopped')
+    parser.add_argument('--restart', action='store_true',
+                        help='with --output, start over instead of resuming')
+    parser.add_argument('--store', type=str,
+                        help='add the range to this dump store, created if needed')
+    parser.add_argument('--label', default='', type=str,
+                        help='with --store, name of the range like ram or rom')
+    add_link_arguments(parser, daemon=True)
     args = parser.parse_args()
 
-    uart = SerialIO(args.port, args.baudrate, args.verbosity)
-    data = read_mem_range(args.begin, args.end)
-    sys.stdout.buffer.write(data)
+    client, uart = connect_link(args)
+    if client is not None:
+        read = client.read_mem_range
+    else:
+        read = lambda begin, end: read_mem_range(begin, end, uart)
+    if args.output:
+        def progress(done, total):
+            if args.verbosity > 0:
+                eprint("dumped {}/{} words".format(done, total))
+        dump_to_file(args.begin, args.end, args.output, restart=args.restart,
+                     progress=progress, read=read)
+        if args.store:
+            with open(args.output, 'rb') as f, DumpStore(args.store) as store:
+                store.add(args.begin, f.read(), args.label)
+    elif args.store:
+        with DumpStore(args.store) as store:
+            store.add(args.begin, read(args.begin, args.end), args.label)
+    else:
+        data = read(args.begin, args.end)
+        sys.stdout.buffer.write(data)
+
+    if args.stats:
+        eprint(format_stats(client.link_stats() if client is not None else uart.link_stats()))
+    if uart is not None:
+        uart.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""  Memory upload for AUCTUS based radios
+
+Write a file into the memory of an AUCTUS A6 radio, usually one frozen
+with rebootandfreeze, and read it back to check it.  Chunks that did
+not arrive intact are written again.
+
+"""
+
+import time
+from a6 import write_mem_range
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.serialio import WRITE_CHUNK
+from a6.stats import format_stats
+
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 memory upload')
+    parser.add_argument('--begin', type=lambda x: int(x,0), required=True,
+                        help='address to write the file to')
+    parser.add_argument('input', type=str, help='file to write')
+    parser.add_argument('--chunk', type=int, default=WRITE_CHUNK,
+                        help='most bytes per write frame default {}'.format(WRITE_CHUNK))
+    parser.add_argument('--no-verify', action='store_true',
+                        help='do not read the memory back')
+    add_link_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.input, 'rb') as f:
+        data = f.read()
+    uart = open_link(args)
+    start = time.monotonic()
+    rewritten = write_mem_range(args.begin, data, args.chunk, not args.no_verify, uart=uart)
+    elapsed = time.monotonic() - start
+    eprint("wrote {} bytes in {:.2f} s, {} chunks written again".format(
+        len(data), elapsed, rewritten))
+
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()
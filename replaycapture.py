@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""  Capture replay for AUCTUS based radios
+
+Rebuild the session recorded by the --capture option of the other
+tools without the radio: every ATE or CPS command with its response
+and time to reply, and the link statistics of the capture.
+
+"""
+
+import json
+from a6.capture import Replay, read_capture
+from a6.eprint import eprint
+from a6.stats import format_stats
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 capture replay')
+    parser.add_argument('--frames', action='store_true',
+                        help='also print every frame with its time')
+    parser.add_argument('-V', '--version', action='version',
+                        version='%(prog)s 0.0.1',
+                        help='display version information and exit')
+    parser.add_argument('capture', help='capture file')
+    args = parser.parse_args()
+
+    replay = Replay()
+    for stamp, direction, data in read_capture(args.capture):
+        frames = len(replay.frames)
+        commands = replay.feed(stamp, direction, data)
+        if args.frames:
+            for frame in replay.frames[frames:]:
+                print('{:12.6f} {} {:02x} {:x}'.format(*frame))
+        for command in commands:
+            print(json.dumps(command))
+    for command in replay.finish():
+        print(json.dumps(command))
+    eprint(format_stats(replay.link_stats()))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""  Channel activity scanner for AUCTUS A6 based radios
+
+Sweep a list of channels with AT+DMOCHSWITCH and AT+DMORDRSSI and
+report how often each one was active.  The dwell on each channel is
+measured first and then adapted while scanning.
+
+"""
+
+import json
+import sys
+from a6 import send_uart_setup
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.scanner import MAX_DWELL, ChannelScanner, parse_channels
+from a6.stats import format_stats
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 channel scanner')
+    add_link_arguments(parser)
+    parser.add_argument('-c', '--channels', default='0-15', type=parse_channels,
+                        help='channels to sweep like 0-7,9, default 0-15')
+    parser.add_argument('-t', '--threshold', default=-100.0, type=float,
+                        help='RSSI in dBm from which a channel is active, default -100')
+    parser.add_argument('-n', '--sweeps', default=None, type=int,
+                        help='number of sweeps, default until interrupted')
+    parser.add_argument('--max-dwell', default=MAX_DWELL, type=float,
+                        help='longest dwell per channel in seconds, default {}'.format(MAX_DWELL))
+    parser.add_argument('--each', action='store_true',
+                        help='write the readings of every sweep')
+    args = parser.parse_args()
+
+    uart = open_link(args)
+    if not send_uart_setup(uart):
+        raise IOError('radio did not answer the UART setup')
+    scanner = ChannelScanner(args.channels, args.threshold, max_dwell=args.max_dwell, uart=uart)
+    eprint('dwell {:.1f} ms'.format(1000 * scanner.calibrate()))
+    try:
+        while args.sweeps is None or scanner.sweeps < args.sweeps:
+            readings = scanner.sweep()
+            if args.each:
+                print(json.dumps({'sweep': scanner.sweeps, 'dwell': scanner.dwell,
+                                  'rssi': {str(k): v for k, v in readings.items()}}))
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    for activity in scanner.summary():
+        print(json.dumps(activity))
+
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""  Receive telemetry for AUCTUS A6 based radios
+
+Poll the RSSI, and optionally the bit error rate and current channel,
+as fast as the link allows and write timestamped samples or rolling
+aggregates of the last samples as JSON lines.
+
+"""
+
+import json
+import sys
+import time
+from a6 import send_uart_setup
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.stats import format_stats
+from a6.telemetry import RING_SIZE, Telemetry
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 receive telemetry')
+    add_link_arguments(parser)
+    parser.add_argument('--ber', action='store_true',
+                        help='also poll the bit error rate')
+    parser.add_argument('--channel', action='store_true',
+                        help='also poll the current channel')
+    parser.add_argument('-i', '--interval', default=0.0, type=float,
+                        help='shortest time between samples in seconds, default as fast as possible')
+    parser.add_argument('-n', '--count', default=None, type=int,
+                        help='number of samples, default no limit')
+    parser.add_argument('-d', '--duration', default=None, type=float,
+                        help='time to run in seconds, default no limit')
+    parser.add_argument('-a', '--aggregate', default=None, type=float, metavar='SECONDS',
+                        help='write min, max, mean and percentiles of the last samples '
+                        'this often instead of every sample')
+    parser.add_argument('--size', default=RING_SIZE, type=int,
+                        help='samples kept for the aggregates, default {}'.format(RING_SIZE))
+    parser.add_argument('-o', '--output', default=None,
+                        help='output file, default stdout')
+    args = parser.parse_args()
+
+    uart = open_link(args)
+    if not send_uart_setup(uart):
+        raise IOError('radio did not answer the UART setup')
+    queries = ['rssi'] + ['ber'] * args.ber + ['channel'] * args.channel
+    telemetry = Telemetry(queries, args.size, uart=uart)
+    out = open(args.output, 'a') if args.output else sys.stdout
+
+    def emit(record):
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+
+    last = time.monotonic()
+    try:
+        for sample in telemetry.run(args.interval, args.count, args.duration):
+            if args.aggregate is None:
+                emit(sample)
+            elif time.monotonic() - last >= args.aggregate:
+                last = time.monotonic()
+                emit(dict(time=sample['time'], **telemetry.ring.summary()))
+    except KeyboardInterrupt:
+        pass
+    if args.aggregate is not None:
+        emit(dict(time=time.time(), **telemetry.ring.summary()))
+
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()
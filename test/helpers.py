@@ -0,0 +1,23 @@
+import a6
+from a6.serialio import SerialIO
+
+
+def simulated_uart(radio=None, link=None, baudrate=None, timeout=0.02, **kwargs):
+    """ open a SerialIO on a simulated radio
+
+    @param radio: the SimulatedRadio, a new one by default
+    @param link: LinkModel of the simulated cable
+    @param baudrate: simulated baud rate, None for no wire time
+    @param timeout: read timeout of the simulated port in s
+    @param kwargs: passed on to SerialIO
+    """
+    port = a6.SimulatedSerial(radio, baudrate=baudrate, timeout=timeout, link=link)
+    return SerialIO(port, **kwargs)
+
+def simulated_async(radio=None, link=None, **kwargs):
+    """ open an AsyncSerialIO on a simulated radio
+
+    @param kwargs: passed on to AsyncSerialIO
+    """
+    port = a6.SimulatedSerial(radio, baudrate=None, timeout=0.01, link=link)
+    return a6.AsyncSerialIO(port, timeout=0.05, **kwargs)
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import a6
+from .helpers import simulated_async
+
+
+class TestAsyncSerialIO(unittest.TestCase):
+    def test_read_mem_range(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 4
+        radio.write_mem(0x82000000, data)
+        link = a6.LinkModel(drop_rate=0.05, corrupt_rate=0.05, seed=3)
+
+        async def run():
+            async with simulated_async(radio, link) as uart:
+                return await uart.read_mem_range(0x82000000, 0x82000400)
+        self.assertEqual(asyncio.run(run()), data)
+
+    def test_concurrent_requests(self):
+        radio = a6.SimulatedRadio()
+        radio.write_mem(0x82000000, bytes.fromhex('01020304'))
+        radio.write_mem(0x82000100, bytes.fromhex('05060708'))
+
+        async def run():
+            async with simulated_async(radio) as uart:
+                return await asyncio.gather(
+                    uart.fetch_memory_address(0x82000000),
+                    uart.read_register(3),
+                    uart.fetch_memory_address(0x82000100))
+        self.assertEqual(asyncio.run(run()),
+                         [bytes.fromhex('01020304'), 0x80, bytes.fromhex('05060708')])
+
+    def test_commands(self):
+        radio = a6.SimulatedRadio()
+        radio.freq_err = -860
+
+        async def run():
+            async with simulated_async(radio) as uart:
+                return await asyncio.gather(uart.get_freq_err(), uart.get_chan_info(2))
+        freq_err, chan_info = asyncio.run(run())
+        self.assertEqual(freq_err, -860)
+        self.assertEqual(chan_info.index, 2)
+        self.assertEqual(chan_info.rxFreq, 438825000)
+
+    def test_wrong_length_is_bounded(self):
+        async def run():
+            async with simulated_async(retries=3) as uart:
+                short = mock.Mock(content=b'\x00')
+                with mock.patch.object(uart, '_request', mock.AsyncMock(return_value=short)) as request:
+                    with self.assertRaises(a6.ReadTimeout):
+                        await uart.fetch_memory_address(0x82000000)
+                    return request.await_count
+        self.assertEqual(asyncio.run(run()), 3)
+
+    def test_command_without_reply(self):
+        async def run():
+            async with simulated_async() as uart:
+                with mock.patch.object(uart, 'submit_command', mock.AsyncMock(return_value=False)):
+                    with self.assertRaises(a6.CommandTimeout):
+                        await uart.send_ate_command('AT+DMOCONNECT')
+                    with self.assertRaises(a6.CommandTimeout):
+                        await uart.send_cps_command(bytes([0, 0x12, 0]))
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import concurrent.futures
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import a6
+from a6.baudrate import AutoBaud, baudrate_arg
+from a6.serialio import SerialIO
+
+
+class TestAutoBaud(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(self.path)
+        patcher = mock.patch('a6.baudrate.adapter_key', lambda port: 'adapter')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def open(self, link, **kwargs):
+        port = a6.SimulatedSerial(a6.SimulatedRadio(), timeout=0.02, link=link)
+        return SerialIO(port, autobaud=AutoBaud(self.path, window=32, **kwargs)), port
+
+    def test_baudrate_arg(self):
+        self.assertEqual(baudrate_arg('auto'), 'auto')
+        self.assertEqual(baudrate_arg('460800'), 460800)
+
+    def test_picks_fastest_clean_rate(self):
+        uart, port = self.open(a6.LinkModel(max_baudrate=230400))
+        self.assertEqual(uart.baudrate, 230400)
+        self.assertEqual(AutoBaud(self.path).saved('port')[0], 230400)
+        # the saved rate is tried first next time
+        port.link.max_baudrate = None
+        uart, port = self.open(port.link)
+        self.assertEqual(uart.baudrate, 230400)
+
+    def test_reprobes_faster_rates(self):
+        uart, port = self.open(a6.LinkModel(max_baudrate=230400))
+        port.link.max_baudrate = None
+        uart, port = self.open(port.link, reprobe=0)
+        self.assertEqual(uart.baudrate, 921600)
+        self.assertEqual(AutoBaud(self.path).saved('port')[0], 921600)
+
+    def test_old_file(self):
+        with open(self.path, 'w') as f:
+            f.write('{"adapter": 460800}')
+        self.assertEqual(AutoBaud(self.path).saved('port'), (460800, 0))
+        uart, port = self.open(a6.LinkModel())
+        self.assertEqual(uart.baudrate, 921600)
+
+    def test_steps_down_when_errors_rise(self):
+        link = a6.LinkModel()
+        uart, port = self.open(link)
+        self.assertEqual(uart.baudrate, 921600)
+        data = a6.read_mem_burst(0x82000000, 0x82000100, uart=uart)
+        link.max_baudrate = 460800
+        self.assertEqual(a6.read_mem_burst(0x82000000, 0x82000100, uart=uart), data)
+        self.assertEqual(uart.baudrate, 460800)
+        # the fallback holds for this session, the fastest rate that
+        # passed stays saved
+        self.assertEqual(AutoBaud(self.path).saved('port')[0], 921600)
+
+    def test_concurrent_save(self):
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda rate: AutoBaud(self.path).save('port', rate), range(64)))
+        self.assertIn(AutoBaud(self.path).saved('port')[0], range(64))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)).count(os.path.basename(self.path)), 1)
+        self.assertFalse([name for name in os.listdir(os.path.dirname(self.path))
+                          if name.startswith(os.path.basename(self.path) + '.')])
+
+    def test_no_rate_answers(self):
+        with self.assertRaises(IOError):
+            self.open(a6.LinkModel(drop_rate=1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import a6
+from .helpers import simulated_uart
+
+
+class TestReadCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = a6.ReadCache(max_words=4)
+        self.cache.add_region(0x80000000, 0x80001000, static=True)
+        self.cache.add_region(0x82000000, 0x82001000)
+
+    def test_regions(self):
+        self.cache.store(0x80000ff8, bytes(range(16)))
+        self.assertEqual(self.cache.get(0x80000ffc), bytes([4, 5, 6, 7]))
+        self.assertIsNone(self.cache.get(0x80001000))
+        self.assertIsNone(self.cache.lookup(0x80000ff8, 0x80001008))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 0))
+
+    def test_lru(self):
+        for addr in range(0x80000000, 0x80000010, 4):
+            self.cache.store(addr, bytes(4))
+        self.cache.get(0x80000000)
+        self.cache.store(0x80000010, bytes(4))
+        self.assertIsNotNone(self.cache.get(0x80000000))
+        self.assertIsNone(self.cache.get(0x80000004))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_observe(self):
+        self.cache.store(0x80000000, bytes(8))
+        self.cache.store(0x82000000, bytes(8))
+        self.cache.observe(a6.write_block(0x80000002, b'\x11\x13'))
+        self.assertEqual(list(self.cache.words), [0x80000004, 0x82000000, 0x82000004])
+        self.cache.observe(a6.h2p_command(0xa5) + a6.read_word(0x82000000))
+        self.assertEqual(list(self.cache.words), [0x80000004])
+        self.cache.observe(a6.reboot_and_freeze())
+        self.assertEqual(len(self.cache.words), 0)
+        self.assertEqual(self.cache.invalidations, 4)
+
+
+class TestSerialIOCache(unittest.TestCase):
+    def test_pointers_cached(self):
+        radio = a6.SimulatedRadio()
+        uart = simulated_uart(radio)
+        self.assertTrue(a6.send_uart_setup(uart))
+        a6.get_freq_err(uart)
+        a6.get_freq_err(uart)
+        self.assertGreater(uart.cache.hits, 0)
+        # only the two ATE pointers ever went to the wire
+        self.assertEqual(uart.cache.misses, 2)
+        uart.write(a6.reboot_and_freeze())
+        self.assertEqual(len(uart.cache.words), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
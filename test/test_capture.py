@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import a6
+from a6.capture import RX, TX, Capture, read_capture, replay_capture
+from a6.serialio import SerialIO
+
+
+class TestCapture(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.a6cap')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_roundtrip(self):
+        with Capture(self.path) as capture:
+            capture.record(TX, b'\xad\x00')
+            capture.record(RX, b'\x11\x13')
+        records = list(read_capture(self.path))
+        self.assertEqual([(d, data) for _, d, data in records],
+                         [(TX, b'\xad\x00'), (RX, b'\x11\x13')])
+        self.assertLessEqual(records[0][0], records[1][0])
+
+    def test_full_buffer_drops(self):
+        capture = Capture(self.path, max_chunks=0)
+        capture.record(TX, b'\x00')
+        capture.close()
+        self.assertEqual(capture.dropped, 1)
+        self.assertEqual(list(read_capture(self.path)), [])
+
+    def test_truncated(self):
+        with Capture(self.path) as capture:
+            capture.record(TX, b'\x01\x02\x03')
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        self.assertEqual(list(read_capture(self.path)), [])
+
+    def test_replay_session(self):
+        radio = a6.SimulatedRadio()
+        capture = Capture(self.path)
+        uart = SerialIO(a6.SimulatedSerial(radio, baudrate=None, timeout=0.02),
+                        capture=capture)
+        a6.read_mem_burst(0x82000000, 0x82000040, uart=uart)
+        a6.get_freq_err(uart)
+        a6.get_chan_info(1, uart)
+        capture.close()
+        replay = replay_capture(self.path)
+        kinds = [command['kind'] for command in replay.commands]
+        self.assertEqual(kinds, ['ate', 'ate', 'cps'])
+        self.assertEqual(replay.commands[1]['command'], 'AT+GETFREQERR')
+        self.assertIsNotNone(replay.commands[1]['duration'])
+        self.assertIn('index 1', replay.commands[2]['response'])
+        stats = replay.link_stats()
+        self.assertEqual(stats['frames_out'], radio.frames)
+        self.assertGreaterEqual(stats['latency']['read_word']['count'], 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
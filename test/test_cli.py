@@ -0,0 +1,35 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+import a6
+from a6.capture import read_capture
+from a6.cli import add_link_arguments, open_link
+
+
+class TestCli(unittest.TestCase):
+    def test_link_arguments(self):
+        parser = argparse.ArgumentParser()
+        add_link_arguments(parser)
+        self.assertIsNone(parser.parse_args([]).baudrate)
+        args = parser.parse_args(['-b', 'auto', '-vv'])
+        self.assertEqual((args.port, args.baudrate, args.verbosity), ('/dev/ttyUSB0', 'auto', 2))
+        self.assertFalse(hasattr(args, 'direct'))
+        add_link_arguments(argparse.ArgumentParser(), daemon=True)
+
+    def test_close_writes_capture(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'link.a6cap')
+            args = argparse.Namespace(port=a6.SimulatedSerial(baudrate=None, timeout=0.02),
+                                      baudrate=921600, verbosity=0, capture=path)
+            uart = open_link(args)
+            self.assertIsNone(uart.pointers)
+            a6.read_mem_range(0x81c00260, 0x81c00270, uart)
+            uart.close()
+            self.assertTrue(uart.capture.file.closed)
+            self.assertTrue(list(read_capture(path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import unittest
+from unittest import mock
+
+import a6
+from a6.codeplug import get_cps_entry
+from a6.codeplug import load_codeplug
+from a6.codeplug import set_chan_name
+from a6.simulator import chan_info_content
+from .helpers import simulated_uart
+
+
+class TestCodeplug(unittest.TestCase):
+    def test_missing_entry(self):
+        uart = simulated_uart(a6.SimulatedRadio(channels=2))
+        self.assertIsNone(get_cps_entry(0x12, 2, uart=uart))
+        self.assertEqual(get_cps_entry(0x12, 1, a6.a6commands.ChanInfoFrame, uart).rxFreq, 438812500)
+
+    def test_no_reply(self):
+        uart = simulated_uart(a6.SimulatedRadio(channels=2))
+        with mock.patch('a6.codeplug.send_cps_command', return_value=False) as send:
+            with self.assertRaises(a6.CommandTimeout):
+                get_cps_entry(0x12, 0, uart=uart)
+            with self.assertRaises(a6.CommandTimeout):
+                set_chan_name(0, 'quiet', uart=uart)
+        self.assertEqual(send.call_count, 2 * a6.codeplug.CPS_RETRIES)
+
+    def test_export_jsonl(self):
+        radio = a6.SimulatedRadio(channels=4)
+        out = io.StringIO()
+        self.assertEqual(a6.export_codeplug(out, gap=2, uart=simulated_uart(radio)), 4 + 2 + 4 + 3)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[3]['txfreq'], 438837500)
+        self.assertEqual(records[4], {'section': 'scanlists', 'index': 0,
+                                      'content': radio.scanlists[0].hex() + '0000'})
+        self.assertEqual([record['section'] for record in records[-3:]], ['keys'] * 3)
+
+    def test_export_csv(self):
+        radio = a6.SimulatedRadio(channels=3)
+        out = io.StringIO()
+        a6.export_codeplug(out, 'csv', ['channels'], gap=1, uart=simulated_uart(radio))
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['index'] for row in rows], ['0', '1', '2'])
+        self.assertEqual(rows[2]['rxfreq'], '438825000')
+
+    def test_upload_changed_channels(self):
+        radio = a6.SimulatedRadio(channels=4)
+        out = io.StringIO()
+        a6.export_codeplug(out, sections=['channels'], gap=1, uart=simulated_uart(radio))
+        target = load_codeplug(io.StringIO(out.getvalue()))
+        content = chan_info_content(2, 446006250, 446006250)
+        target[2]['content'] = content.hex()
+        current = {}
+        written = a6.upload_channels(target, current, gap=1, uart=simulated_uart(radio))
+        self.assertEqual(written, [2])
+        self.assertEqual(radio.channels[2], content)
+        sets = [cmd for cmd in radio.commands if cmd[0:2] == bytes([0, 0x11])]
+        self.assertEqual(len(sets), 1)
+        # with the checksums known nothing is read or written again
+        radio.commands.clear()
+        self.assertEqual(a6.upload_channels(target, current, uart=simulated_uart(radio)), [])
+        self.assertEqual(radio.commands, [])
+
+    def test_set_chan_name(self):
+        radio = a6.SimulatedRadio(channels=2)
+        self.assertTrue(a6.set_chan_name(1, 'Repeater', simulated_uart(radio)))
+        self.assertEqual(radio.chan_names, {1: 'Repeater'})
+
+
+if __name__ == '__main__':
+    unittest.main()
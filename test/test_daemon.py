@@ -0,0 +1,71 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import a6
+from a6.cli import connect_link
+from a6.serialio import SerialIO
+from .helpers import simulated_uart
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.radio = a6.SimulatedRadio(channels=4)
+        self.radio.write_mem(0x82000000, bytes(range(64)))
+        uart = simulated_uart(self.radio)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'a6.sock')
+        self.daemon = a6.RadioDaemon(uart, self.path)
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.tmp.cleanup()
+
+    def test_requests(self):
+        with a6.connect_daemon(path=self.path) as client:
+            self.assertEqual(client.read_mem_range(0x82000000, 0x82000040), bytes(range(64)))
+            self.assertEqual(client.get_chan_info(2).rxFreq, 438825000)
+            self.assertEqual(client.get_freq_err(), 250)
+            results = client.run_script(['AT+DMOCONNECT', 'AT+DMOGETCHIPID'])
+            self.assertIn('+DMOGETCHIPID:0x6a3c1f0d', results[1]['response'][0])
+            with self.assertRaises(IOError):
+                client.call('nothing')
+        # the session is set up once for every client
+        self.assertEqual(self.radio.commands.count('AT+DMOCONNECT'), 1)
+
+    def test_chan_info_error(self):
+        with a6.connect_daemon(path=self.path) as client:
+            failed = {'command': '001209', 'ok': False, 'response': ''}
+            with mock.patch.object(client, 'run_command', return_value=failed):
+                with self.assertRaises(IOError):
+                    client.get_chan_info(9)
+
+    def test_no_daemon(self):
+        self.assertIsNone(a6.connect_daemon(path=self.path + '.missing'))
+        with mock.patch.object(a6.RadioClient, 'close', autospec=True,
+                               side_effect=a6.RadioClient.close) as close:
+            with self.assertRaises(RuntimeError):
+                a6.RadioDaemon(SerialIO(a6.SimulatedSerial(baudrate=None)), self.path, setup=False)
+        self.assertEqual(close.call_count, 1)
+
+    def test_link_options_ignored(self):
+        args = argparse.Namespace(port='radio', direct=False, baudrate=460800, verbosity=0,
+                                  capture='link.a6cap', stats=False)
+        err = io.StringIO()
+        with mock.patch('a6.cli.connect_daemon', lambda port: a6.connect_daemon(path=self.path)):
+            with contextlib.redirect_stderr(err):
+                client, uart = connect_link(args)
+        client.close()
+        self.assertIsNone(uart)
+        self.assertIn('ignoring -b --capture', err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
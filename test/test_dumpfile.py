@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+import a6
+from .helpers import simulated_uart
+
+
+class TestDumpFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'dump.bin')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing(self):
+        with a6.DumpFile(self.path, 0x82000000, 0x82000100) as dump:
+            self.assertEqual(dump.missing(), [(0x82000000, 0x82000100)])
+            dump.store(0x82000010, bytes(8))
+            dump.store(0x820000fc, bytes(4))
+            self.assertEqual(dump.missing(), [(0x82000000, 0x82000010), (0x82000018, 0x820000fc)])
+            self.assertEqual(dump.words_done, 3)
+        with a6.DumpFile(self.path, 0x82000000, 0x82000100) as dump:
+            self.assertEqual(dump.words_done, 3)
+        self.assertEqual(os.path.getsize(self.path), 0x100)
+
+    def test_other_range(self):
+        a6.DumpFile(self.path, 0x82000000, 0x82000100).close()
+        with self.assertRaises(ValueError):
+            a6.DumpFile(self.path, 0x82000000, 0x82000200)
+
+    def test_resume(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 16
+        radio.write_mem(0x82000000, data)
+        uart = simulated_uart(radio)
+        with a6.DumpFile(self.path, 0x82000000, 0x82001000) as dump:
+            dump.store(0x82000000, data[:0x800])
+        self.assertEqual(a6.dump_to_file(0x82000000, 0x82001000, self.path, uart=uart), 0x800)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(a6.dump_to_file(0x82000000, 0x82001000, self.path, uart=uart), 0)
+        self.assertEqual(a6.dump_to_file(0x82000000, 0x82001000, self.path, restart=True, uart=uart), 0x1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
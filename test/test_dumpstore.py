@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import a6
+from a6.dumpstore import DumpStore, merge_stores
+from .helpers import simulated_uart
+
+
+class TestDumpStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'dumps.a6d')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup(self):
+        with DumpStore(self.path) as store:
+            store.add(0x82000000, bytes(range(16)), 'ram')
+            store.add(0x81c00260, bytes(range(0x20)), 'pointers')
+        with DumpStore(self.path) as store:
+            self.assertEqual([s.label for s in store.segments], ['ram', 'pointers'])
+            self.assertEqual(store.read(0x82000004, 4), bytes([4, 5, 6, 7]))
+            self.assertEqual(store.word(0x81c00264), 0x07060504)
+            self.assertFalse(store.covers(0x8200000c, 8))
+            with self.assertRaises(KeyError):
+                store.read(0x82000010, 1)
+            self.assertEqual(store.verify(), [])
+
+    def test_overlap_and_merge(self):
+        first = os.path.join(self.tmp.name, 'first.a6d')
+        second = os.path.join(self.tmp.name, 'second.a6d')
+        with DumpStore(first) as store:
+            store.add(0x82000000, b'\x11' * 16, 'ram')
+        with DumpStore(second) as store:
+            store.add(0x82000008, b'\x22' * 16, 'ram')
+            store.add(0x82000020, b'\x33' * 4, 'ram')
+        with merge_stores(self.path, [first, second]) as merged:
+            self.assertEqual(merged.ranges(), [(0x82000000, 0x82000018), (0x82000020, 0x82000024)])
+            self.assertEqual(len(merged.segments), 2)
+            self.assertEqual(merged.read(0x82000000, 24), b'\x11' * 8 + b'\x22' * 16)
+            self.assertEqual(merged.segments[0].label, 'ram')
+
+    def test_merge_keeps_target(self):
+        other = os.path.join(self.tmp.name, 'other.a6d')
+        with DumpStore(self.path) as store:
+            store.add(0x81c00260, b'\x44' * 32, 'ptr')
+            store.add(0x82000000, b'\x11' * 8, 'ram')
+        with DumpStore(other) as store:
+            store.add(0x82000004, b'\x22' * 8, 'ram')
+        with merge_stores(self.path, [other]) as merged:
+            self.assertEqual([s.label for s in merged.segments], ['ptr', 'ram'])
+            self.assertEqual(merged.read(0x81c00260, 32), b'\x44' * 32)
+            self.assertEqual(merged.read(0x82000000, 12), b'\x11' * 4 + b'\x22' * 8)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['dumps.a6d', 'other.a6d'])
+
+    def test_corruption_detected(self):
+        with DumpStore(self.path) as store:
+            segment = store.add(0x82000000, bytes(64))
+        with open(self.path, 'r+b') as f:
+            f.seek(segment.offset)
+            f.write(b'\x01')
+        with DumpStore(self.path) as store:
+            self.assertEqual([s.begin for s in store.verify()], [0x82000000])
+
+    def test_dump_to_store(self):
+        radio = a6.SimulatedRadio()
+        radio.write_mem(0x82000100, bytes(range(256)))
+        uart = simulated_uart(radio)
+        with DumpStore(self.path) as store:
+            store.add(0x82000100, a6.read_mem_range(0x82000100, 0x82000200, uart), 'ram')
+            self.assertEqual(store.read(0x820001f0, 16), bytes(range(0xf0, 0x100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+import a6
+
+
+class TestFleet(unittest.TestCase):
+    def test_freq_fix(self):
+        radios = [a6.SimulatedRadio(), a6.SimulatedRadio()]
+        ports = [a6.SimulatedSerial(radio, baudrate=None, timeout=0.02) for radio in radios]
+        per_port = {ports[0]: {'current': 438800500}, ports[1]: {'current': 438799800}}
+        results = a6.run_fleet(ports, 'freqfix', per_port=per_port, target=438800000)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([radio.freq_err for radio in radios], [-250, 450])
+
+    def test_failure_is_reported(self):
+        radio = a6.SimulatedRadio()
+        radio.frozen = True
+        ports = [a6.SimulatedSerial(radio, baudrate=None, timeout=0.02),
+                 a6.SimulatedSerial(baudrate=None, timeout=0.02)]
+        results = a6.run_fleet(ports, 'at', commands=['AT+DMOCONNECT'], timeout=0.05)
+        self.assertEqual([result.ok for result in results], [False, True])
+        self.assertIn('CommandTimeout', results[0].error)
+        self.assertIn('+DMOCONNECT:0', results[1].result[0]['response'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import concurrent.futures
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import a6
+from a6.cache import POINTER_TABLE
+from a6.simulator import ATE_CPS_PTR, ATE_CPS_RESP_PTR
+from .helpers import simulated_uart
+
+
+class TestPointerCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pointers = a6.PointerCache(os.path.join(self.tmp.name, 'pointers.json'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_saved_and_preloaded(self):
+        radio = a6.SimulatedRadio()
+        self.assertEqual(a6.get_freq_err(simulated_uart(radio, pointers=self.pointers)), 250)
+        table = radio.read_mem(POINTER_TABLE[0], POINTER_TABLE[1] - POINTER_TABLE[0])
+        key = '{:08x}'.format(a6.simulator.ATE_CPS_ADDR)
+        self.assertEqual(self.pointers.load()['firmware'], {key: table.hex()})
+        # a reconnect reads the mailbox pointer and nothing else of the table
+        radio.commands.clear()
+        uart = simulated_uart(radio, pointers=self.pointers)
+        self.assertTrue(a6.send_ate_command('AT+DMOCONNECT', uart=uart))
+        self.assertEqual(uart.preloaded, table)
+        self.assertEqual(radio.commands, ['AT+DMOCONNECT'])
+        self.assertEqual(uart.cache.misses, 1)
+
+    def test_cps_sends_no_at_commands(self):
+        radio = a6.SimulatedRadio()
+        a6.get_chan_info(0, uart=simulated_uart(radio, pointers=self.pointers))
+        self.assertFalse([cmd for cmd in radio.commands if isinstance(cmd, str)])
+        self.assertEqual(len(self.pointers.load()['firmware']), 1)
+
+    def test_new_firmware_is_discovered(self):
+        a6.get_freq_err(simulated_uart(a6.SimulatedRadio(), pointers=self.pointers))
+        # other firmware with the command mailbox somewhere else
+        radio = a6.SimulatedRadio()
+        radio.write_mem(ATE_CPS_PTR, (0x82030000).to_bytes(4, 'little'))
+        uart = simulated_uart(radio, pointers=self.pointers)
+        with mock.patch.object(a6.simulator, 'ATE_CPS_ADDR', 0x82030000):
+            self.assertTrue(a6.send_ate_command('AT+DMOCONNECT', timeout=0.05, uart=uart))
+        self.assertIsNone(uart.preloaded)
+        self.assertEqual(radio.commands, ['AT+DMOCONNECT'])
+        self.assertIn('82030000', self.pointers.load()['firmware'])
+
+    def test_stale_table_is_found_again(self):
+        radio = a6.SimulatedRadio()
+        a6.get_freq_err(simulated_uart(radio, pointers=self.pointers))
+        # a saved table whose response pointer is wrong
+        data = self.pointers.load()
+        key, table = data['firmware'].popitem()
+        table = bytearray.fromhex(table)
+        offset = ATE_CPS_RESP_PTR - POINTER_TABLE[0]
+        table[offset:offset + 4] = (0x82040000).to_bytes(4, 'little')
+        a6.cachefile.write_json(self.pointers.path, {'firmware': {key: table.hex()}})
+        uart = simulated_uart(radio, pointers=self.pointers)
+        self.assertTrue(a6.send_ate_command('AT+DMOCONNECT', timeout=0.05, uart=uart))
+        self.assertEqual(uart.ate_cps_resp_addr, a6.simulator.ATE_CPS_RESP_ADDR)
+        table = radio.read_mem(POINTER_TABLE[0], POINTER_TABLE[1] - POINTER_TABLE[0])
+        self.assertEqual(self.pointers.load()['firmware'], {key: table.hex()})
+
+    def test_concurrent_remember(self):
+        path = self.pointers.path
+
+        def remember(_):
+            uart = simulated_uart(a6.SimulatedRadio(), pointers=a6.PointerCache(path))
+            return a6.pointercache.PointerCache(path).remember(uart)
+
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            keys = list(pool.map(remember, range(8)))
+        self.assertEqual(len(set(keys)), 1)
+        self.assertEqual(os.listdir(self.tmp.name), ['pointers.json'])
+
+    def test_fleet_shares_cache(self):
+        path = self.pointers.path
+        ports = [a6.SimulatedSerial(baudrate=None, timeout=0.02) for _ in range(8)]
+        results = a6.run_fleet(ports, 'at', commands=['AT+DMOGETCHIPID'], pointers=path)
+        self.assertTrue(all(result.ok for result in results), [r.error for r in results])
+        self.assertEqual(len(self.pointers.load()['firmware']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
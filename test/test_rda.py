@@ -1,15 +1,14 @@
 import unittest
 
-import rda
 import a6
 
 class TestEscaper(unittest.TestCase):
     def test_escaper(self):
-        self.assertEqual(rda.escaper(b''), bytes())
-        self.assertEqual(rda.escaper(bytes([0x00])), bytes([0x00]))
-        self.assertEqual(rda.escaper(bytes([0x11])), bytes([0x5C,0xEE]))
-        self.assertEqual(rda.escaper(bytes([0x13])), bytes([0x5C,0xEC]))
-        self.assertEqual(rda.escaper(bytes([0x5C])), bytes([0x5C,0xA3]))
+        self.assertEqual(a6.escaper(b''), bytes())
+        self.assertEqual(a6.escaper(bytes([0x00])), bytes([0x00]))
+        self.assertEqual(a6.escaper(bytes([0x11])), bytes([0x5C,0xEE]))
+        self.assertEqual(a6.escaper(bytes([0x13])), bytes([0x5C,0xEC]))
+        self.assertEqual(a6.escaper(bytes([0x5C])), bytes([0x5C,0xA3]))
 
 
     def test_unescaper(self):
@@ -18,6 +17,14 @@ class TestEscaper(unittest.TestCase):
         self.assertEqual(a6.unescaper(bytes([0x5C, 0xEE])), bytes([0x11]))
         self.assertEqual(a6.unescaper(bytes([0x5C, 0xEC])), bytes([0x13]))
         self.assertEqual(a6.unescaper(bytes([0x5C, 0xA3])), bytes([0x5C]))
+        self.assertEqual(a6.unescaper(bytes([0x5C, 0x00])), bytes([0xFF]))
+        self.assertEqual(a6.unescaper(bytes([0x00, 0x5C])), bytes([0x00]))
+
+    def test_round_trip(self):
+        msg = bytes(range(256)) * 2
+        self.assertEqual(a6.unescaper(a6.escaper(msg)), msg)
+        self.assertNotIn(0x11, a6.escaper(msg))
+        self.assertNotIn(0x13, a6.escaper(msg))
 
 class TestRdaDebugFrame(unittest.TestCase):
     def test_compute_check(self):
@@ -35,12 +42,71 @@ class TestRdaDebugFrame(unittest.TestCase):
         self.assertEqual(a6.rda_debug_frame(bytes([0xFF]), bytes([0x02]), bytes([0x10,0x00,0x00,0x82,0x01])),
                          bytes([0xad,0x00,0x07,0xff,0x02,0x10,0x00,0x00,0x82,0x01, 0x6e]))
 
+    def test_read_block(self):
+        self.assertEqual(a6.read_block(0x82000010, 256, 1), bytes([0xad,0x00,0x09,0xff,0x03,0x10,0x00,0x00,0x82,0x00,0x01,0x01, 0x6e]))
+
     def test_read_word(self):
         self.assertEqual(a6.read_word(0x82000010, 1), bytes([0xad,0x00,0x07,0xff,0x02,0x10,0x00,0x00,0x82,0x01, 0x6e]))
 
+    def test_templates(self):
+        for addr in (0x82000010, 0x8211135c, 0x13115c11, 0xffffffff, 0):
+            for seq in (1, 0x11, 0x13, 0x5c, 0xff):
+                msg = addr.to_bytes(4, 'little') + bytes([seq])
+                self.assertEqual(a6.read_word(addr, seq), a6.rda_debug_frame(b'\xff', b'\x02', msg))
+                self.assertEqual(a6.read_register_int8(addr, seq),
+                                 a6.rda_debug_frame(b'\xff', b'\x04', msg))
+                self.assertEqual(a6.write_register_int8(addr, seq),
+                                 a6.rda_debug_frame(b'\xff', b'\x84', msg))
+                self.assertEqual(a6.read_block(addr, 0x1311, seq),
+                                 a6.rda_debug_frame(b'\xff', b'\x03', msg[:4] + b'\x11\x13' + msg[4:]))
+
     def test_write_block(self):
         self.assertEqual(a6.write_block(0x82000010, bytes.fromhex('aabbccdd')), bytes.fromhex('ad000aff8310000082aabbccddee'))
 
+class TestRdaStreamDecoder(unittest.TestCase):
+    def test_split_chunks(self):
+        frame = a6.rda_debug_frame(bytes([0xff]), bytes([0x07]), bytes([0x11, 0x13, 0x5c, 0x00]))
+        decoder = a6.RdaStreamDecoder()
+        frames = []
+        for i in range(len(frame)):
+            frames += decoder.feed(frame[i:i + 1])
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].seq, 0x07)
+        self.assertEqual(frames[0].content, bytes([0x11, 0x13, 0x5c, 0x00]))
+
+    def test_several_frames_and_acks(self):
+        first = a6.rda_debug_frame(bytes([0xff]), bytes([0x01]), bytes([0x80]))
+        second = a6.rda_debug_frame(bytes([0xff]), bytes([0x02]), bytes([0xaa, 0xbb, 0xcc, 0xdd]))
+        decoder = a6.RdaStreamDecoder()
+        frames = decoder.feed(b'\x00' + first + b'\x11\x13' + second)
+        self.assertEqual([f.seq for f in frames], [1, 2])
+        self.assertEqual(decoder.acks, 1)
+        self.assertEqual(decoder.discarded, 1)
+
+    def test_resync_after_check_failure(self):
+        bad = bytearray(a6.rda_debug_frame(bytes([0xff]), bytes([0x01]), bytes([0x80])))
+        bad[-1] ^= 0x01
+        good = a6.rda_debug_frame(bytes([0xff]), bytes([0x02]), bytes([0x80]))
+        decoder = a6.RdaStreamDecoder()
+        frames = decoder.feed(bytes(bad) + good)
+        self.assertEqual([f.seq for f in frames], [2])
+        self.assertEqual(decoder.check_failures, 1)
+
+    def test_lost_byte_swallowing_next_header(self):
+        first = bytearray(a6.rda_debug_frame(bytes([0xff]), bytes([0x01]), bytes([0x98, 0x9f, 0xa6, 0xac])))
+        second = a6.rda_debug_frame(bytes([0xff]), bytes([0x02]), bytes([0x98, 0x9f, 0xa6, 0x08]))
+        del first[8]
+        decoder = a6.RdaStreamDecoder()
+        self.assertEqual(decoder.feed(bytes(first) + second[:1]), [])
+        frames = decoder.feed(second[1:])
+        self.assertEqual([f.seq for f in frames], [2])
+
+    def test_check_byte_is_header(self):
+        content = bytes([0x01, 0x02, 0x03, 0xad ^ 0xff ^ 0x07 ^ 0x01 ^ 0x02 ^ 0x03])
+        frame = a6.rda_debug_frame(bytes([0xff]), bytes([0x07]), content)
+        self.assertEqual(frame[-1], 0xad)
+        frames = a6.RdaStreamDecoder().feed(frame)
+        self.assertEqual([f.content for f in frames], [content])
 
 class TestA6Commands(unittest.TestCase):
     def test_h2p_command(self):
@@ -54,10 +120,10 @@ class TestA6Commands(unittest.TestCase):
         self.assertEqual(a6.read_uart_to_host(), bytes.fromhex('ad0007ff040300000001f9'))
 
     def test_ate_command(self):
-        self.assertEqual(a6.ate_command('AT+DMOCONNECT', 0x8201ff9c), bytes.fromhex('ad0016ff839cff01820000b7'))
+        self.assertEqual(a6.ate_command('AT+DMOCONNECT', 0x8201ff9c), bytes.fromhex('ad0016ff839cff018241542b444d4f434f4e4e4543540d0000b7'))
 
     def test_cps_command(self):
-        self.assertEqual(a6.cps_command(bytes.fromhex('002b'), 0x8201ff9c), bytes.fromhex('ad0007ff040300000001f9'))
+        self.assertEqual(a6.cps_command(bytes.fromhex('002b'), 0x8201ff9c), bytes.fromhex('ad000eff839cff0182aa06002b2dbb00008d'))
 
 class TestATCommands(unittest.TestCase):
     def test_get_freqerr(self):
@@ -0,0 +1,51 @@
+import time
+import unittest
+from unittest import mock
+
+import a6
+from a6.scanner import ChannelScanner, parse_channels
+from .helpers import simulated_uart
+
+
+class TestScanner(unittest.TestCase):
+    def test_parse_channels(self):
+        self.assertEqual(parse_channels('0-3,7'), [0, 1, 2, 3, 7])
+
+    def test_sweep(self):
+        radio = a6.SimulatedRadio()
+        radio.rssi[5] = -70
+        uart = simulated_uart(radio, baudrate=921600, timeout=0.05)
+        scanner = ChannelScanner(range(16), uart=uart)
+        start = time.monotonic()
+        readings = scanner.sweep()
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(readings[5], -70)
+        self.assertEqual(readings[4], -120)
+        summary = scanner.summary()
+        self.assertEqual((summary[5]['active'], summary[4]['active']), (1, 0))
+        self.assertEqual(radio.commands.count('AT+DMOCONNECT'), 1)
+
+    def test_dwell_adapts_to_settle_time(self):
+        radio = a6.SimulatedRadio()
+        radio.settle_time = 0.02
+        radio.rssi[1] = -60
+        uart = simulated_uart(radio, baudrate=921600, timeout=0.05)
+        scanner = ChannelScanner([0, 1], uart=uart)
+        self.assertGreater(scanner.calibrate(), 0.01)
+        scanner.dwell = 0.0
+        for _ in range(8):
+            scanner.sweep()
+        self.assertGreater(scanner.dwell, 0.01)
+        self.assertEqual(scanner.sweep(), {0: -120, 1: -60})
+
+
+    def test_unanswered_command(self):
+        scanner = ChannelScanner([0, 1], uart=simulated_uart())
+        scanner._prepare()
+        with mock.patch('a6.scanner.submit_command', return_value=False):
+            with self.assertRaises(a6.CommandTimeout):
+                scanner.hop(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import io
+import unittest
+from unittest import mock
+
+import a6
+from a6.script import run_command
+from .helpers import simulated_uart
+
+
+class TestScript(unittest.TestCase):
+    def test_parse_script(self):
+        script = io.StringIO('AT+DMOCONNECT\n\n# comment\nAT+DMOGETCHIPID  # chip\n001200\n')
+        self.assertEqual(a6.parse_script(script), ['AT+DMOCONNECT', 'AT+DMOGETCHIPID', '001200'])
+
+    def test_one_connect_and_deferred_save(self):
+        radio = a6.SimulatedRadio()
+        uart = simulated_uart(radio)
+        commands = ['AT+DMOCONNECT', 'AT+DMOFREQERR=200', 'AT+DMOSAVEPARAM',
+                    'AT+DMOCONNECT', '001201', 'AT+DMOGETCHIPID']
+        results = list(a6.run_script(commands, uart=uart))
+        self.assertEqual(radio.commands[0:2], ['AT+DMOCONNECT', 'AT+DMOFREQERR=200'])
+        self.assertEqual(radio.commands[-2:], ['AT+DMOGETCHIPID', 'AT+DMOSAVEPARAM'])
+        self.assertEqual(radio.commands.count('AT+DMOCONNECT'), 1)
+        self.assertEqual(results[2]['response'], [])
+        self.assertEqual(results[3]['response'][0:2], 'aa')
+        self.assertIn('+DMOSAVEPARAM:0', results[-1]['response'][0])
+        self.assertEqual(radio.freq_err, -500)
+        # the session stays open for later calls on the same connection
+        self.assertEqual(a6.get_freq_err(uart), -500)
+        self.assertEqual(radio.commands.count('AT+DMOCONNECT'), 1)
+
+
+    def test_no_reply_reads_nothing(self):
+        uart = simulated_uart()
+        self.assertTrue(run_command('001201', uart=uart)['ok'])
+        with mock.patch('a6.script.send_cps_command', return_value=False), \
+                mock.patch('a6.script.uart_resp_read') as read:
+            result = run_command('001202', uart=uart)
+        self.assertEqual(result, {'command': '001202', 'ok': False, 'response': None})
+        read.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
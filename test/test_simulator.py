@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+import unittest
+
+import a6
+from a6.serialio import SerialIO
+from .helpers import simulated_uart
+
+
+class TestSimulatedRadio(unittest.TestCase):
+    def test_read_word(self):
+        radio = a6.SimulatedRadio()
+        radio.write_mem(0x82000010, bytes.fromhex('aabbccdd'))
+        reply = radio.receive(a6.read_word(0x82000010, 7))
+        frame = a6.RdaFrame(reply)
+        self.assertEqual(frame.seq, 7)
+        self.assertEqual(frame.content, bytes.fromhex('aabbccdd'))
+
+    def test_write_block(self):
+        radio = a6.SimulatedRadio()
+        self.assertEqual(radio.receive(a6.write_block(0x82000ffe, bytes.fromhex('11131415'))), b'')
+        self.assertEqual(radio.read_mem(0x82000ffc, 8), bytes.fromhex('000011131415' '0000'))
+
+    def test_knock(self):
+        frame = a6.RdaFrame(a6.SimulatedRadio().receive(a6.read_uart_to_host()))
+        self.assertEqual(frame.seq, 1)
+        self.assertEqual(frame.content, b'\x80')
+
+    def test_h2p_semaphore(self):
+        radio = a6.SimulatedRadio(process_delay=1.0)
+        radio.receive(a6.ate_command('AT+DMOCONNECT', a6.simulator.ATE_CPS_ADDR), 0.0)
+        radio.receive(a6.h2p_command(0xa5), 0.0)
+        self.assertEqual(a6.RdaFrame(radio.receive(a6.read_register_int8(5), 0.5)).content, b'\xa5')
+        self.assertEqual(a6.RdaFrame(radio.receive(a6.read_register_int8(5), 1.0)).content, b'\x00')
+        self.assertEqual(radio.commands, ['AT+DMOCONNECT'])
+
+
+class TestSerialIOSimulated(unittest.TestCase):
+    def test_uart_setup(self):
+        uart = simulated_uart()
+        self.assertTrue(a6.send_uart_setup(uart))
+
+    def test_write_mem_range(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 4 + b'\x11\x13\x5c'
+        write_mem = radio.write_mem
+        lost = []
+        def flaky_write(addr, chunk):
+            # the first frame to 0x82000200 never arrives
+            if addr == 0x82000200 and not lost:
+                lost.append(addr)
+                return
+            write_mem(addr, chunk)
+        radio.write_mem = flaky_write
+        uart = simulated_uart(radio)
+        self.assertEqual(a6.write_mem_range(0x82000002, data, 256, uart=uart), 1)
+        self.assertEqual(radio.read_mem(0x82000002, len(data)), data)
+
+    def test_read_mem_range(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 16
+        radio.write_mem(0x82000000, data)
+        uart = simulated_uart(radio)
+        self.assertEqual(a6.read_mem_range(0x82000000, 0x82001000, uart), data)
+
+    def test_read_mem_range_with_faults(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 4
+        radio.write_mem(0x82000000, data)
+        link = a6.LinkModel(drop_rate=0.05, corrupt_rate=0.05, seed=1)
+        uart = simulated_uart(radio, link)
+        self.assertEqual(a6.read_mem_range(0x82000000, 0x82000400, uart), data)
+        self.assertGreater(link.dropped + link.corrupted, 0)
+
+    def test_read_mem_range_blocks(self):
+        radio = a6.SimulatedRadio()
+        data = bytes(range(256)) * 8 + b'\x01\x02'
+        radio.write_mem(0x82000000, data)
+        uart = simulated_uart(radio)
+        self.assertEqual(a6.read_mem_range(0x82000000, 0x82000802, uart), data + b'\x00\x00')
+        self.assertTrue(uart.block_read)
+
+    def test_read_mem_range_block_fallback(self):
+        radio = a6.SimulatedRadio(block_read=False)
+        data = bytes(range(256)) * 4
+        radio.write_mem(0x82000000, data)
+        uart = simulated_uart(radio)
+        self.assertEqual(a6.read_mem_range(0x82000000, 0x82000400, uart), data)
+        self.assertFalse(uart.block_read)
+
+    def test_read_mem_range_block_rejected(self):
+        radio = a6.SimulatedRadio(block_read='reject')
+        data = bytes(range(256)) * 4
+        radio.write_mem(0x82000000, data)
+        uart = simulated_uart(radio)
+        start = time.monotonic()
+        self.assertEqual(a6.read_mem_range(0x82000000, 0x82000400, uart), data)
+        self.assertFalse(uart.block_read)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertLess(radio.frames, 300)
+
+    def test_pointers(self):
+        uart = simulated_uart()
+        self.assertEqual(uart.ate_cps_addr, a6.simulator.ATE_CPS_ADDR)
+        self.assertEqual(uart.ate_cps_resp_addr, a6.simulator.ATE_CPS_RESP_ADDR)
+        self.assertEqual(uart.uart_resp_addr, a6.simulator.UART_RESP_ADDR)
+
+    def test_get_freq_err(self):
+        radio = a6.SimulatedRadio()
+        radio.freq_err = -860
+        uart = simulated_uart(radio)
+        self.assertEqual(a6.get_freq_err(uart), -860)
+        self.assertEqual(radio.commands, ['AT+DMOCONNECT', 'AT+GETFREQERR'])
+
+    def test_command_completion(self):
+        radio = a6.SimulatedRadio(process_delay=0.05)
+        uart = simulated_uart(radio)
+        self.assertTrue(a6.send_ate_command('AT+DMOCONNECT', uart=uart))
+        self.assertEqual(radio.registers[5], 0)
+        self.assertIn(b'+DMOCONNECT:0', a6.atecps_resp_read(uart))
+
+    def test_command_timeout(self):
+        radio = a6.SimulatedRadio()
+        radio.frozen = True
+        uart = simulated_uart(radio)
+        with self.assertRaises(a6.CommandTimeout):
+            a6.send_ate_command('AT+DMOCONNECT', timeout=0.05, uart=uart)
+
+    def test_dead_radio_read(self):
+        uart = simulated_uart(link=a6.LinkModel(drop_rate=1.0))
+        start = time.monotonic()
+        with self.assertRaises(a6.ReadTimeout):
+            a6.fetch_memory_address(0x82000000, retries=3, uart=uart)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_wrong_length_read(self):
+        radio = a6.SimulatedRadio()
+        uart = simulated_uart(radio)
+        radio.read_mem = lambda addr, length: bytes(2)
+        with self.assertRaises(a6.ReadTimeout):
+            a6.read_mem_burst(0x82000000, 0x82000040, retries=3, uart=uart)
+        self.assertLessEqual(radio.frames, 16 * 4)
+
+    @unittest.skipUnless(hasattr(os, 'openpty'), 'needs a pty')
+    def test_receive_wakes_on_data(self):
+        master, slave = os.openpty()
+        uart = SerialIO(os.ttyname(slave), timeout=1.0)
+        try:
+            self.assertEqual(uart.receive(0.01), b'')
+            timer = threading.Timer(0.05, os.write, (master, b'\xad\x00'))
+            start = time.monotonic()
+            timer.start()
+            self.assertEqual(uart.receive(), b'\xad\x00')
+            self.assertLess(time.monotonic() - start, 0.5)
+        finally:
+            uart.close()
+            os.close(master)
+            os.close(slave)
+
+    def test_separate_connections(self):
+        first = a6.SimulatedRadio()
+        second = a6.SimulatedRadio()
+        first.freq_err = 100
+        second.freq_err = -200
+        uart1 = simulated_uart(first)
+        uart2 = simulated_uart(second)
+        self.assertEqual(a6.get_freq_err(uart1), 100)
+        self.assertEqual(a6.get_freq_err(uart2), -200)
+        self.assertIs(a6.SerialIO.default, uart2)
+
+
+if __name__ == '__main__':
+    unittest.main()
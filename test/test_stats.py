@@ -0,0 +1,47 @@
+import unittest
+
+import a6
+from a6.escaper import unescaper
+from a6.stats import Histogram, count_frames, format_stats
+from .helpers import simulated_uart
+
+
+class TestLinkStats(unittest.TestCase):
+    def test_count_frames(self):
+        msg = a6.read_word(0x82000000, 0x11) + a6.write_block(0x82000000, b'\x5c' * 8)
+        self.assertEqual(count_frames(unescaper(msg + a6.h2p_command(0xa5))), 3)
+
+    def test_histogram(self):
+        hist = Histogram()
+        for value in (0.001, 0.001, 0.002, 0.1):
+            hist.add(value)
+        summary = hist.as_dict()
+        self.assertEqual((summary['count'], summary['min'], summary['max']), (4, 0.001, 0.1))
+        self.assertLessEqual(summary['p50'], 0.002)
+        self.assertEqual(summary['p90'], 0.1)
+
+    def test_serialio_counters(self):
+        radio = a6.SimulatedRadio()
+        uart = simulated_uart(radio)
+        a6.read_mem_burst(0x82000000, 0x82000100, uart=uart)
+        a6.fetch_memory_address(0x82000200, uart=uart)
+        a6.get_freq_err(uart)
+        stats = uart.link_stats()
+        self.assertEqual(stats['frames_out'], radio.frames)
+        self.assertEqual(stats['frames_in'], uart.decoder.frames)
+        self.assertGreater(stats['bytes_in'], 0)
+        self.assertGreaterEqual(stats['latency']['read_word']['count'], 64 + 1)
+        self.assertEqual(stats['latency']['ate']['count'], 2)
+        self.assertGreaterEqual(stats['read_attempts']['count'], 1)
+        self.assertIn('latency ate', format_stats(stats))
+
+    def test_joined_write_counters(self):
+        radio = a6.SimulatedRadio()
+        uart = simulated_uart(radio)
+        a6.write_mem_range(0x82000000, b'\x5c' * 1024, chunk=256, verify=False, uart=uart)
+        uart.flush()
+        self.assertEqual(uart.link_stats()['frames_out'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import math
+import unittest
+
+import a6
+from a6.telemetry import SampleRing, Telemetry, parse_reply, read_ate_reply
+from .helpers import simulated_uart
+
+
+class TestTelemetry(unittest.TestCase):
+    def test_parse_reply(self):
+        reply = b'OnCmd_DMORDRSSI\n+DMORDRSSI:-87\nATE pipe. used[HOST]\x00'
+        self.assertEqual(parse_reply(reply, 'AT+DMORDRSSI', ('rssi',)), [-87.0])
+        values = parse_reply(b'+DMOGETRXBER:3', 'AT+DMOGETRXBER', ('ber0', 'ber1'))
+        self.assertEqual(values[0], 3.0)
+        self.assertTrue(math.isnan(values[1]))
+
+    def test_ring(self):
+        ring = SampleRing(('rssi',), size=4)
+        for i in range(6):
+            ring.append((i, -100 - i))
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.column('time'), [2.0, 3.0, 4.0, 5.0])
+        summary = ring.summary()
+        self.assertEqual(summary['samples'], 4)
+        self.assertEqual((summary['rssi']['min'], summary['rssi']['max']), (-105, -102))
+        self.assertEqual(summary['rssi']['mean'], -103.5)
+
+    def test_long_reply(self):
+        uart = simulated_uart(a6.SimulatedRadio())
+        a6.send_ate_command('AT+DMOGETCURRCH', uart=uart)
+        self.assertEqual(read_ate_reply(uart, guess=4), a6.atecps_resp_read(uart))
+
+    def test_unaligned_guess(self):
+        uart = simulated_uart(a6.SimulatedRadio())
+        a6.send_ate_command('AT+DMOGETCURRCH', uart=uart)
+        expected = a6.atecps_resp_read(uart)
+        for guess in (1, 6, 7, len(expected) - 1):
+            self.assertEqual(read_ate_reply(uart, guess=guess), expected)
+
+    def test_samples(self):
+        radio = a6.SimulatedRadio()
+        radio.rssi[0] = -93
+        telemetry = Telemetry(('rssi', 'ber', 'channel'), size=8, uart=simulated_uart(radio))
+        samples = list(telemetry.run(count=3))
+        self.assertEqual(len(samples), 3)
+        self.assertEqual(samples[-1]['rssi'], -93)
+        self.assertEqual((samples[-1]['ber0'], samples[-1]['channel']), (0, 0))
+        self.assertEqual(radio.commands.count('AT+DMOCONNECT'), 1)
+        self.assertEqual(telemetry.ring.summary()['rssi']['p50'], -93)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""  Codeplug upload for AUCTUS based radios
+
+Write the channels of a codeplug exported by exportcodeplug to an
+AUCTUS A6 radio.  Only channels that differ from the radio are sent
+and only those are read back to verify them.
+
+"""
+
+from a6 import upload_channels
+from a6.codeplug import load_codeplug, read_checksums, write_checksums
+from a6.cli import add_link_arguments, open_link
+from a6.eprint import eprint
+from a6.stats import format_stats
+
+
+__author__ = "jhart99"
+__license__ = "MIT"
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Auctus A6 codeplug upload')
+    parser.add_argument('input', type=str,
+                        help='codeplug in JSON lines as written by exportcodeplug')
+    parser.add_argument('-c', '--checksums', type=str,
+                        help='file caching the channel checksums of the radio, '
+                        'the radio is read when it does not exist')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='do not read the written channels back')
+    add_link_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        target = load_codeplug(f)
+    current = read_checksums(args.checksums) if args.checksums else {}
+    uart = open_link(args, pointers=True)
+    written = upload_channels(target, current, not args.no_verify, uart=uart)
+    if args.checksums:
+        write_checksums(args.checksums, current)
+    print("wrote {} channels {}".format(len(written), written))
+
+    if args.stats:
+        eprint(format_stats(uart.link_stats()))
+    uart.close()